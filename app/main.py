@@ -1,16 +1,128 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from services.ingestion import ingest_document
-from services.chunking import chunk_text
-from services.summarizer import summarize_chunks
-from services.section_summarizer import summarize_section
-from services.executive_summarizer import generate_executive_summary
-from services.semantic_section_builder import build_semantic_sections
-from services.document_assembler import assemble_document
-from services.meaning_evaluator import compute_meaning_coverage
-
+import os
+import json
 import time
+import uuid
+from typing import List
+from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from services.summarization_pipeline import run_summarization_pipeline
+from services.response_encoder import render_response, apply_detail
+from services.ingestion import validate_upload_name, read_upload
+from services.admission import get_admission_controller, RequestSizeLimitMiddleware
+from services.job_queue import JobQueue
+from services.job_worker import start_workers, stop_workers
+from services.batch_summarizer import summarize_batch
+from services.concurrency import get_shared_executor, shutdown_shared_executor
+from services.tracing import span, parse_traceparent, shutdown_tracing, SPAN_KIND_SERVER
+from logger import log_context
+from services.checkpoint_store import get_checkpoint_store
+from services.bedrock_service import llm_circuit
+from services.llm_backends import get_llm_backend
+from services.profiling import parse_profile_level, profile_path, purge_profiles
+from services.vector_index import get_vector_index, KINDS
+from services.bedrock_service import get_embedding
+from services.chunk_broker import get_chunk_broker
+from services.chunk_worker import start_chunk_workers
 
 app = FastAPI()
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=settings.MAX_REQUEST_BYTES)
+
+job_queue = JobQueue()
+job_workers = {}
+chunk_workers = {}
+
+
+@app.on_event("startup")
+def start_job_workers():
+    job_workers["processes"], job_workers["stop_event"] = start_workers()
+
+
+@app.on_event("startup")
+def start_chunk_worker_processes():
+    if settings.CHUNK_BROKER_ENABLED:
+        chunk_workers["processes"], chunk_workers["stop_event"] = start_chunk_workers()
+
+
+@app.on_event("startup")
+def start_shared_executor():
+    get_shared_executor()
+
+
+@app.on_event("startup")
+def purge_checkpoints():
+    get_checkpoint_store().purge_expired()
+
+
+@app.on_event("startup")
+def purge_old_profiles():
+    purge_profiles()
+
+
+@app.on_event("startup")
+def load_vector_index():
+    if settings.VECTOR_INDEX_ENABLED:
+        get_vector_index().load()
+
+
+@app.on_event("startup")
+def warm_llm_backends():
+
+    # Load local backends now, not on the first call of an outage
+    for name in {settings.LLM_BACKEND, settings.LLM_FALLBACK_BACKEND}:
+        if name:
+            get_llm_backend(name)
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    if job_workers.get("processes"):
+        stop_workers(job_workers["processes"], job_workers["stop_event"])
+
+
+@app.on_event("shutdown")
+def stop_chunk_worker_processes():
+    if chunk_workers.get("processes"):
+        stop_workers(chunk_workers["processes"], chunk_workers["stop_event"])
+
+
+@app.on_event("shutdown")
+def stop_shared_executor():
+    shutdown_shared_executor()
+
+
+@app.on_event("shutdown")
+def flush_traces():
+    shutdown_tracing()
+
+
+@app.middleware("http")
+async def tag_requests(request: Request, call_next):
+
+    # Every log line of the request carries its id; callers may supply one
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+
+    with log_context(request_id=request_id):
+        response = await call_next(request)
+
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+
+    # Root span per request; continues the caller's trace when one is sent
+    with span(f"{request.method} {request.url.path}", {
+        "http.method": request.method,
+        "http.target": request.url.path
+    }, kind=SPAN_KIND_SERVER, parent=parse_traceparent(request.headers.get("traceparent"))) as request_span:
+
+        response = await call_next(request)
+        request_span.set_attribute("http.status_code", response.status_code)
+
+        return response
 
 
 @app.get("/")
@@ -18,112 +130,247 @@ def health_check():
     return {"message": "API is healthy and running!"}
 
 
+@app.get("/executor")
+def executor_stats():
+    return get_shared_executor().stats()
+
+
+@app.get("/admission")
+def admission_state():
+    return get_admission_controller().state()
+
+
+@app.get("/chunk-broker")
+def chunk_broker_stats():
+    return {"enabled": settings.CHUNK_BROKER_ENABLED, **get_chunk_broker().stats()}
+
+
+@app.get("/llm")
+def llm_state():
+    return {
+        "backend": settings.LLM_BACKEND,
+        "job_backend": settings.JOB_LLM_BACKEND or settings.LLM_BACKEND,
+        "fallback_backend": settings.LLM_FALLBACK_BACKEND or None,
+        "circuit": llm_circuit.state()
+    }
+
+
 @app.post("/summarize")
 async def summarize(
+    request: Request,
     file: UploadFile = File(...),
-    mode: str = Form("academic")
+    mode: str = Form("academic"),
+    skip: str = Form(""),
+    detail: str = Form("full"),
+    run_id: str = Form(""),
+    backend: str = Form("")
 ):
 
-    if mode not in ["academic", "research"]:
-        mode = "academic"
+    # Optional stages to skip, e.g. "meaning" or "meaning,executive"
+    skip_stages = [s.strip() for s in skip.split(",") if s.strip()]
+
+    # detail: "executive" (TL;DR + key points), "sections", or "full"
+    # run_id: resume a previous run (performance.checkpoint.run_id)
+    # backend: "extractive" for a fast local summary without Bedrock
+    # X-Profile header / ?profile=: "1", "memory" or "cprofile" adds performance.profile
+    profile = parse_profile_level(
+        request.headers.get("x-profile") or request.query_params.get("profile")
+    )
+
+    response = await run_in_threadpool(
+        run_summarization_pipeline,
+        file,
+        mode,
+        skip_stages,
+        detail,
+        run_id=run_id.strip() or None,
+        backend=backend.strip() or None,
+        profile=profile
+    )
 
-    document_mode = mode
+    return render_response(response, request.headers.get("accept-encoding"))
 
-    total_start = time.time()
+# SEARCH
 
-    # INGESTION
-    ingestion_start = time.time()
-    document_data = ingest_document(file)
-    ingestion_time = round(time.time() - ingestion_start, 2)
+@app.get("/search")
+def search(q: str, k: int = 10, kind: str = "section"):
 
-    # CHUNKING
-    chunking_start = time.time()
-    chunks = chunk_text(document_data["text"])
-    chunking_time = round(time.time() - chunking_start, 2)
+    # Most similar sections (or chunks) across every summarized document
+    if not settings.VECTOR_INDEX_ENABLED:
+        raise HTTPException(status_code=404, detail="Vector index disabled")
 
-    # CHUNK SUMMARIZATION
-    chunk_start = time.time()
-    chunk_summaries = summarize_chunks(
-        chunks,
-        mode=document_mode
-    )
-    chunk_time = round(time.time() - chunk_start, 2)
-
-    # SEMANTIC SECTION BUILDING
-    section_build_start = time.time()
-    semantic_sections = build_semantic_sections(chunk_summaries)
-    section_build_time = round(time.time() - section_build_start, 2)
-
-    # SECTION SUMMARIZATION
-    section_start = time.time()
-    section_summaries = []
-
-    for section in semantic_sections:
-        section_summary = summarize_section(
-            section["section_chunks"],
-            section["section_id"]
-        )
-
-        section_summary["covered_chunk_ids"] = section["covered_chunk_ids"]
-        section_summaries.append(section_summary)
-
-    section_time = round(time.time() - section_start, 2)
-
-    # EXECUTIVE SUMMARY
-    executive_start = time.time()
-
-    try:
-        executive_summary = generate_executive_summary(
-            section_summaries,
-            mode=document_mode
-        )
-
-        executive_summary.setdefault(
-            "tldr",
-            "Executive TLDR generation failed."
-        )
-
-    except Exception as e:
-        print("⚠️ Executive generation failed:", str(e))
-        executive_summary = {
-            "executive_summary": "Executive summary failed.",
-            "key_points": [],
-            "risks_action_items": [],
-            "tldr": "Executive TLDR unavailable."
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+
+    k = max(1, min(k, settings.VECTOR_SEARCH_MAX_K))
+    index = get_vector_index()
+
+    start = time.perf_counter()
+    query_vector = get_embedding(q)
+    embedded = time.perf_counter()
+    results = index.search(query_vector, k=k, kind=kind)
+    searched = time.perf_counter()
+
+    return {
+        "query": q,
+        "kind": kind,
+        "results": results,
+        "latency_ms": {
+            "embed": round((embedded - start) * 1000, 2),
+            "search": round((searched - embedded) * 1000, 3),
+            "total": round((searched - start) * 1000, 2)
         }
+    }
+
+
+@app.get("/index")
+def index_stats():
+    return get_vector_index().stats()
+
+
+@app.delete("/index/documents/{document_id}")
+def delete_indexed_document(document_id: str):
+
+    deleted = get_vector_index().delete_document(document_id)
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Document not indexed")
+
+    return {"document_id": document_id, "deleted_vectors": deleted}
+
+# PROFILES
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+
+    path = profile_path(profile_id, "json")
+
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@app.get("/profiles/{profile_id}/cprofile")
+def get_cprofile(profile_id: str):
+
+    path = profile_path(profile_id, "prof")
+
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="cProfile dump not found")
+
+    # Open with: python -m pstats <file>, or snakeviz
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+# BATCH
+
+@app.post("/summarize/batch")
+async def summarize_many(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    mode: str = Form("academic"),
+    weighting: str = Form("round_robin"),
+    detail: str = Form("executive"),
+    backend: str = Form("")
+):
 
-    executive_time = round(time.time() - executive_start, 2)
+    for upload in files:
+        validate_upload_name(upload.filename)
 
-    # FINAL ASSEMBLY
-    final_output = assemble_document(
-        executive_output=executive_summary,
-        section_outputs=section_summaries,
-        chunk_outputs=chunk_summaries,
-        total_chunks=len(chunks)
+    response = await run_in_threadpool(
+        summarize_batch,
+        files,
+        mode,
+        weighting,
+        detail,
+        backend.strip() or None
     )
 
-    # MEANING COVERAGE
-    meaning_score = compute_meaning_coverage(
-        section_summaries,
-        executive_summary.get("executive_summary", "")
+    return render_response(response, request.headers.get("accept-encoding"))
+
+# ASYNC JOBS
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    mode: str = Form("academic"),
+    skip: str = Form("")
+):
+
+    validate_upload_name(file.filename)
+    data = await run_in_threadpool(read_upload, file)
+
+    job_id = await run_in_threadpool(
+        job_queue.enqueue,
+        file.filename.strip(),
+        data,
+        mode,
+        skip
     )
 
-    total_time = round(time.time() - total_start, 2)
+    return {"job_id": job_id, "status": "queued"}
 
-    # RESPONSE
-    response = final_output.model_dump()
 
-    response["performance"] = {
-        "ingestion_time_sec": ingestion_time,
-        "chunking_time_sec": chunking_time,
-        "chunk_summarization_time_sec": chunk_time,
-        "section_build_time_sec": section_build_time,
-        "section_summarization_time_sec": section_time,
-        "executive_time_sec": executive_time,
-        "total_time_sec": total_time
-    }
+@app.get("/jobs")
+def job_queue_stats():
+    return job_queue.stats()
 
-    response["document_summary"]["meaning_coverage_score"] = meaning_score
-    response["document_summary"]["mode_used"] = document_mode
 
-    return response
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+
+    job = job_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(
+    request: Request,
+    job_id: str,
+    offset: int = 0,
+    limit: int = 50,
+    detail: str = "full"
+):
+
+    job = job_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    if job["status"] == "failed":
+        raise HTTPException(status_code=422, detail=f"Job failed: {job['error']}")
+
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    result = job_queue.get_result(job_id)
+
+    # Expired or purged since the status check
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    result = apply_detail(result, detail)
+    summary = result["document_summary"]
+
+    # Chunk results are paginated; everything else is returned whole
+    if "chunk_summaries" in summary:
+        offset = max(offset, 0)
+        limit = max(min(limit, 500), 0)
+        chunks = summary["chunk_summaries"]
+
+        summary["chunk_summaries"] = chunks[offset:offset + limit]
+        result["chunk_pagination"] = {
+            "offset": offset,
+            "limit": limit,
+            "total": len(chunks)
+        }
+
+    return render_response(result, request.headers.get("accept-encoding"))
@@ -0,0 +1,208 @@
+"""
+Chunk classification benchmark.
+
+Runs the chunk heuristics (low-information, table, groundedness) over
+synthetic chunks three ways:
+
+    rescan       the previous implementations, each re-splitting and
+                 re-lowercasing the chunk text
+    extract      ChunkFeatures extracted once per chunk, then every heuristic
+                 reads it (extraction cost included)
+    precomputed  features already collected by the chunker, so only the
+                 classification itself is timed
+
+and checks that all three agree on every chunk.
+
+    python -m benchmarks.bench_chunk_features --chunks 10000
+"""
+
+import re
+import time
+import random
+import argparse
+from services.chunk_features import extract_features
+from services.summarizer import is_low_information_chunk, looks_like_table, is_grounded
+
+WORDS = (
+    "revenue margin forecast pipeline customer retention analysis quarterly "
+    "methodology baseline variance regression dataset evaluation accuracy "
+    "the of and to in for with on by that this from results model"
+).split()
+
+# PREVIOUS IMPLEMENTATIONS
+
+def rescan_looks_like_table(text):
+
+    lines = text.splitlines()
+
+    if len(lines) < 3:
+        return False
+
+    numeric_lines = 0
+    structured_lines = 0
+
+    for line in lines:
+        tokens = line.strip().split()
+
+        if len(tokens) >= 3:
+            structured_lines += 1
+
+        if re.search(r"\d", line):
+            numeric_lines += 1
+
+    return structured_lines >= len(lines) * 0.6 and numeric_lines >= 2
+
+
+def rescan_is_low_information(text):
+
+    if not text or not text.strip():
+        return True
+
+    if rescan_looks_like_table(text):
+        return False
+
+    if len(text.split()) < 40:
+        return True
+
+    if re.search(r"\[\d+\]", text) and len(text.split()) < 80:
+        return True
+
+    lines = text.splitlines()
+    short_lines = sum(1 for l in lines if len(l.split()) < 5)
+
+    return short_lines > len(lines) * 0.65
+
+
+def rescan_is_grounded(summary, source_text, mode):
+
+    summary_lower = summary.lower()
+    source_lower = source_text.lower()
+    summary_words = summary_lower.split()
+
+    phrases = [" ".join(summary_words[i:i+3]) for i in range(len(summary_words) - 2)]
+    phrase_matches = [p for p in phrases if p in source_lower]
+    phrase_ratio = len(phrase_matches) / len(phrases) if phrases else 0
+
+    keywords = [w for w in re.findall(r"[a-zA-Z]+", summary_lower) if len(w) > 6]
+    keyword_matches = [w for w in keywords if w in source_lower]
+    keyword_ratio = len(keyword_matches) / len(keywords) if keywords else 0
+
+    if mode == "research":
+        return phrase_ratio >= 0.08
+
+    return phrase_ratio >= 0.04 or (keyword_ratio >= 0.30 and len(keyword_matches) >= 3)
+
+# SYNTHETIC CHUNKS
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_chunk(rng):
+
+    kind = rng.random()
+
+    if kind < 0.15:
+        rows = [
+            " ".join(f"{rng.randint(1, 999)}.{rng.randint(0, 9)}%" for _ in range(5))
+            for _ in range(rng.randint(4, 12))
+        ]
+        return "Table 3 quarterly results\n" + "\n".join(rows)
+
+    if kind < 0.3:
+        refs = [f"[{i}] {sentence(rng, 6)}" for i in range(1, rng.randint(3, 10))]
+        return "\n".join(refs)
+
+    paragraphs = [
+        " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 6)))
+        for _ in range(rng.randint(1, 4))
+    ]
+    return "\n\n".join(paragraphs)
+
+
+def make_summary(rng, chunk):
+
+    words = chunk.split()
+
+    if len(words) > 12 and rng.random() < 0.7:
+        start = rng.randrange(len(words) - 12)
+        return " ".join(words[start:start + 12])
+
+    return sentence(rng, 14)
+
+# MEASUREMENT
+
+def classify_rescan(chunk, summary):
+
+    return (
+        rescan_is_low_information(chunk),
+        rescan_looks_like_table(chunk),
+        rescan_is_grounded(summary, chunk, "research"),
+        rescan_is_grounded(summary, chunk, "academic")
+    )
+
+
+def classify_features(chunk, summary, features):
+
+    return (
+        is_low_information_chunk(chunk, features),
+        looks_like_table(chunk, features),
+        is_grounded(summary, chunk, "research", features),
+        is_grounded(summary, chunk, "academic", features)
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunks = [make_chunk(rng) for _ in range(args.chunks)]
+    summaries = [make_summary(rng, c) for c in chunks]
+
+    start = time.perf_counter()
+    expected = [classify_rescan(c, s) for c, s in zip(chunks, summaries)]
+    rescan_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extracted = [
+        classify_features(c, s, extract_features(c))
+        for c, s in zip(chunks, summaries)
+    ]
+    extract_sec = time.perf_counter() - start
+
+    features = [extract_features(c) for c in chunks]
+
+    start = time.perf_counter()
+    precomputed = [
+        classify_features(c, s, f)
+        for c, s, f in zip(chunks, summaries, features)
+    ]
+    precomputed_sec = time.perf_counter() - start
+
+    header = f"{'variant':>12} {'chunks/s':>10} {'us/chunk':>9} {'agree':>6}"
+    print(header)
+    print("-" * len(header))
+
+    for name, seconds, results in (
+        ("rescan", rescan_sec, expected),
+        ("extract", extract_sec, extracted),
+        ("precomputed", precomputed_sec, precomputed),
+    ):
+        agree = "yes" if results == expected else "NO"
+
+        print(
+            f"{name:>12} {args.chunks / seconds:>10.0f} "
+            f"{seconds / args.chunks * 1e6:>9.1f} {agree:>6}"
+        )
+
+    low_info = sum(r[0] for r in expected)
+    tables = sum(r[1] for r in expected)
+    print(f"\n{args.chunks} chunks: {low_info} low-information, {tables} tables")
+
+
+if __name__ == "__main__":
+    main()
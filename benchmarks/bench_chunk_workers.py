@@ -0,0 +1,183 @@
+"""
+Chunk worker scaling benchmark.
+
+Summarizes the same synthetic chunks through the chunk broker with 1..N
+chunk worker processes, against a fake Bedrock client (fixed latency per
+call plus some GIL-holding CPU work per response), and compares with the
+in-process thread pool. Checks that every run returns every chunk, in
+order, and counts redelivered tasks.
+
+    python -m benchmarks.bench_chunk_workers --workers 1 2 4 8 --chunks 400
+"""
+
+import io
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from config import settings
+import services.chunk_broker as chunk_broker
+from services.chunk_worker import chunk_worker_loop
+from services.job_worker import stop_workers
+from services.model_router import track_routing
+from services.summarizer import summarize_chunks
+
+WORDS = (
+    "revenue margin forecast pipeline customer retention analysis quarterly "
+    "methodology baseline variance regression dataset evaluation accuracy "
+    "the of and to in for with on by that this from results model"
+).split()
+
+# FAKE BEDROCK
+
+class FakeBedrockClient:
+    """
+    Answers chunk prompts with a summary copied from the chunk (so it
+    passes the groundedness check) after `latency` seconds, burning
+    `cpu_ms` of Python CPU per call like response handling would.
+    """
+
+    def __init__(self, latency: float, cpu_ms: float):
+        self.latency = latency
+        self.cpu_ms = cpu_ms
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None):
+
+        time.sleep(self.latency)
+
+        end = time.thread_time() + self.cpu_ms / 1000
+        while time.thread_time() < end:
+            pass
+
+        prompt = json.loads(body)["prompt"]
+        words = prompt.split('"""')[1].split()
+        generation = json.dumps({
+            "summary": " ".join(words[:40]),
+            "key_points": [" ".join(words[:8])],
+            "key_risks_action_items": []
+        })
+
+        return {"body": io.BytesIO(json.dumps({
+            "generation": generation,
+            "prompt_token_count": len(prompt.split()),
+            "generation_token_count": 60
+        }).encode())}
+
+
+def install_fake(latency: float, cpu_ms: float):
+
+    import services.bedrock_service as bedrock_service
+    bedrock_service.client = FakeBedrockClient(latency, cpu_ms)
+
+
+def fake_worker(stop_event, db_path, threads, latency, cpu_ms):
+    install_fake(latency, cpu_ms)
+    chunk_worker_loop(stop_event, db_path, threads)
+
+# RUNS
+
+def make_chunks(rng, count):
+
+    return [
+        " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 20))).capitalize() + f" {i}."
+            for _ in range(rng.randint(8, 14))
+        )
+        for i in range(count)
+    ]
+
+
+def run(chunks, mode):
+
+    start = time.perf_counter()
+
+    with track_routing(mode) as routing:
+        results = summarize_chunks(chunks, mode=mode)
+
+    elapsed = time.perf_counter() - start
+    in_order = all(r is not None and r["chunk_id"] == i for i, r in enumerate(results, start=1))
+    complete = in_order and all(r["summary"] for r in results)
+
+    return elapsed, complete, routing.summary()["tiers"]
+
+
+def run_brokered(chunks, workers, args):
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="chunk-broker-"), "broker.db")
+    broker = chunk_broker._broker = chunk_broker.ChunkBroker(db_path)
+
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    processes = [
+        context.Process(
+            target=fake_worker,
+            args=(stop_event, db_path, args.threads, args.latency, args.cpu_ms),
+            daemon=True
+        )
+        for _ in range(workers)
+    ]
+
+    for process in processes:
+        process.start()
+
+    # Time the work, not process start-up
+    while broker.live_workers() < workers:
+        time.sleep(0.05)
+
+    try:
+        elapsed, complete, _ = run(chunks, args.mode)
+    finally:
+        stop_workers(processes, stop_event)
+
+    return elapsed, complete, broker.stats()["redelivered"]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker process")
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake Bedrock seconds per call")
+    parser.add_argument("--cpu-ms", type=float, default=20.0, help="CPU per call that holds the GIL")
+    parser.add_argument("--mode", default="academic")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    chunks = make_chunks(random.Random(args.seed), args.chunks)
+    install_fake(args.latency, args.cpu_ms)
+
+    print(
+        f"{args.chunks} chunks, fake Bedrock {args.latency * 1000:.0f} ms + "
+        f"{args.cpu_ms:.0f} ms CPU per call, {args.threads} threads per worker\n"
+    )
+
+    header = f"{'run':>14} {'sec':>7} {'chunks/s':>9} {'vs first':>8} {'redelivered':>12} {'complete':>9}"
+    print(header)
+    print("-" * len(header))
+
+    settings.CHUNK_BROKER_ENABLED = False
+    elapsed, complete, _ = run(chunks, args.mode)
+    print(
+        f"{'in-process/' + str(settings.MAX_WORKERS):>14} {elapsed:>7.2f} {args.chunks / elapsed:>9.1f} "
+        f"{'':>8} {'':>12} {'yes' if complete else 'NO':>9}"
+    )
+
+    settings.CHUNK_BROKER_ENABLED = True
+    baseline = None
+
+    for workers in args.workers:
+        elapsed, complete, redelivered = run_brokered(chunks, workers, args)
+        baseline = baseline or elapsed
+
+        print(
+            f"{'workers/' + str(workers):>14} {elapsed:>7.2f} {args.chunks / elapsed:>9.1f} "
+            f"{baseline / elapsed:>7.2f}x {redelivered:>12} {'yes' if complete else 'NO':>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
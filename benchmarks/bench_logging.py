@@ -0,0 +1,113 @@
+"""
+Logging overhead benchmark.
+
+Emits the per-chunk log lines of `_process_single_chunk` from many threads
+and compares the old synchronous FileHandler against the queue-based JSON
+setup in logger.py, with and without per-chunk sampling. The baseline row
+(no handler) is the floor to subtract from the others.
+
+    python -m benchmarks.bench_logging --threads 32 --chunks 20000
+"""
+
+import os
+import time
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from logger import (
+    JsonFormatter,
+    build_queue_logging,
+    parse_sample_rates,
+    log_context
+)
+
+
+def emit_chunk(log: logging.Logger, idx: int, total: int):
+
+    with log_context(request_id="bench", chunk_id=idx):
+        log.info(f"Processing chunk {idx}/{total} (mode=academic)")
+        log.info(f"Chunk {idx} identified as low-information. Keeping (academic mode).")
+        log.info(f"Chunk {idx} summary accepted")
+
+        if idx % 10 == 0:
+            log.warning(f"Chunk {idx} summary failed groundedness check. Keeping (academic mode).")
+
+
+def build_logger(variant: str, path: str):
+
+    log = logging.getLogger(f"bench.{variant}")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    log.handlers.clear()
+
+    file_handler = logging.FileHandler(path)
+    listener = None
+
+    if variant == "baseline":
+        # Same calls with nothing attached: thread pool + record creation cost
+        log.addHandler(logging.NullHandler())
+
+    elif variant == "sync_text":
+        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+        log.addHandler(file_handler)
+
+    else:
+        file_handler.setFormatter(JsonFormatter())
+        rates = parse_sample_rates("DEBUG=0.01,INFO=0.1") if variant == "queue_json_sampled" else {}
+        queue_handler, listener = build_queue_logging(file_handler, rates)
+        log.addHandler(queue_handler)
+        listener.start()
+
+    return log, file_handler, listener
+
+
+def measure(variant: str, threads: int, chunks: int, workdir: str):
+
+    path = os.path.join(workdir, f"{variant}.log")
+    log, file_handler, listener = build_logger(variant, path)
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: emit_chunk(log, i, chunks), range(1, chunks + 1)))
+
+    caller_sec = time.perf_counter() - start
+
+    # Drain: time until every queued record is on disk
+    if listener is not None:
+        listener.stop()
+
+    total_sec = time.perf_counter() - start
+    file_handler.close()
+
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f)
+
+    return caller_sec, total_sec, lines
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--chunks", type=int, default=20000)
+    args = parser.parse_args()
+
+    header = f"{'variant':>20} {'us/chunk':>9} {'caller_s':>9} {'drained_s':>10} {'lines':>8}"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for variant in ("baseline", "sync_text", "queue_json", "queue_json_sampled"):
+
+            caller_sec, total_sec, lines = measure(variant, args.threads, args.chunks, workdir)
+
+            print(
+                f"{variant:>20} {caller_sec / args.chunks * 1e6:>9.1f} "
+                f"{caller_sec:>9.3f} {total_sec:>10.3f} {lines:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
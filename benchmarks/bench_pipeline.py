@@ -0,0 +1,233 @@
+"""
+End-to-end pipeline benchmark on recorded Bedrock traffic.
+
+Runs every document of a corpus through POST /summarize (in process,
+through FastAPI's TestClient) with Bedrock served from a cassette, and
+reports per-stage timing distributions. Record the cassette once against
+real Bedrock, then replay it offline after each change and compare with
+the report of the previous run:
+
+    python -m benchmarks.bench_pipeline corpus/ --record
+    python -m benchmarks.bench_pipeline corpus/ --repeat 3 --output before.json
+    python -m benchmarks.bench_pipeline corpus/ --repeat 3 --baseline before.json
+
+Exits with status 1 when a stage's p50 regressed by more than --threshold
+percent against the baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np # type: ignore
+from config import settings
+from services.bedrock_cassette import use_cassette
+from services.bedrock_service import clear_embedding_cache
+from services.offline_batch import discover_documents
+
+CONTENT_TYPES = {"pdf": "application/pdf", "txt": "text/plain"}
+
+# Changes smaller than this are noise, whatever the percentage
+MIN_REGRESSION_SEC = 0.005
+
+
+def summarize(client, path, args):
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    extension = path.rsplit(".", 1)[-1].lower()
+
+    start = time.perf_counter()
+    response = client.post(
+        "/summarize",
+        files={"file": (os.path.basename(path), data, CONTENT_TYPES.get(extension, "application/octet-stream"))},
+        data={"mode": args.mode, "detail": args.detail}
+    )
+    elapsed = time.perf_counter() - start
+
+    if response.status_code != 200:
+        return {"document": path, "status": response.status_code, "error": response.text[:200]}
+
+    performance = response.json()["performance"]
+
+    return {
+        "document": path,
+        "status": 200,
+        "request_sec": elapsed,
+        "total_sec": performance["total_time_sec"],
+        "stages": {
+            name: timing["duration_sec"]
+            for name, timing in performance["stages"].items()
+            if not timing.get("skipped") and not timing.get("provided")
+        },
+        "critical_path": performance["critical_path"]
+    }
+
+
+def distribution(values):
+
+    values = np.asarray(values, dtype=float)
+
+    return {
+        "n": int(len(values)),
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p95": round(float(np.percentile(values, 95)), 4),
+        "max": round(float(values.max()), 4)
+    }
+
+
+def build_report(runs, args):
+
+    from services.summarization_pipeline import SUMMARIZATION_PIPELINE
+
+    ok = [r for r in runs if r["status"] == 200]
+    stages = {}
+
+    for name in SUMMARIZATION_PIPELINE.nodes:
+        values = [r["stages"][name] for r in ok if name in r["stages"]]
+
+        if values:
+            stages[name] = distribution(values)
+
+    if ok:
+        stages["total"] = distribution([r["total_sec"] for r in ok])
+        stages["request"] = distribution([r["request_sec"] for r in ok])
+
+    critical = {}
+    for r in ok:
+        for name in r["critical_path"]:
+            critical[name] = critical.get(name, 0) + 1
+
+    return {
+        "cassette": args.cassette,
+        "time_scale": args.time_scale,
+        "mode": args.mode,
+        "runs": len(runs),
+        "failed": len(runs) - len(ok),
+        "stages": stages,
+        "on_critical_path": {name: round(count / len(ok), 2) for name, count in critical.items()} if ok else {}
+    }
+
+
+def print_report(report, baseline=None, threshold=10.0):
+
+    header = f"{'stage':>18} {'n':>4} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8} {'crit%':>6}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+
+    for name, d in report["stages"].items():
+        crit = report["on_critical_path"].get(name)
+        line = (
+            f"{name:>18} {d['n']:>4} {d['mean']:>8.3f} {d['p50']:>8.3f} {d['p95']:>8.3f} "
+            f"{d['max']:>8.3f} {(f'{crit * 100:.0f}' if crit is not None else ''):>6}"
+        )
+
+        before = (baseline or {}).get("stages", {}).get(name)
+
+        if before and before["p50"] > 0:
+            change = (d["p50"] - before["p50"]) / before["p50"] * 100
+            regressed = change > threshold and d["p50"] - before["p50"] > MIN_REGRESSION_SEC
+            line += f" {change:>+11.1f}%" + ("  REGRESSION" if regressed else "")
+
+            if regressed:
+                regressions.append(name)
+
+        print(line)
+
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="Corpus directories, files or glob patterns")
+    parser.add_argument("--cassette", default=settings.BEDROCK_CASSETTE_PATH)
+    parser.add_argument("--record", action="store_true", help="Call real Bedrock and record the cassette")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Replay latency multiplier (0 = instant)")
+    parser.add_argument("--on-miss", choices=["error", "nearest"], default="error")
+    parser.add_argument("--mode", choices=["academic", "research"], default="academic")
+    parser.add_argument("--detail", default="executive")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1, help="Documents in flight at once")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="Report JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 regression threshold, percent")
+    args = parser.parse_args()
+
+    documents = discover_documents(args.sources)
+
+    if not documents:
+        parser.error("no PDF / TXT documents found")
+
+    # Keep the benchmark's checkpoints and index out of the real ones
+    scratch = tempfile.mkdtemp(prefix="bench-pipeline-")
+    settings.CHECKPOINT_DB_PATH = os.path.join(scratch, "checkpoints.db")
+    settings.VECTOR_INDEX_DB_PATH = os.path.join(scratch, "vectors.db")
+
+    cassette = use_cassette(
+        "record" if args.record else "replay",
+        args.cassette,
+        time_scale=args.time_scale,
+        on_miss=args.on_miss
+    )
+
+    from fastapi.testclient import TestClient  # type: ignore
+    from app.main import app
+
+    client = TestClient(app)
+    runs = []
+
+    print(f"{len(documents)} documents x {args.repeat}, {'recording' if args.record else 'replaying'} {args.cassette}\n")
+
+    for _ in range(args.repeat):
+        # Every round starts cold, as a fresh document would
+        clear_embedding_cache()
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            runs.extend(pool.map(lambda path: summarize(client, path, args), documents))
+
+    for run in runs:
+        if run["status"] != 200:
+            print(f"FAILED {run['document']}: {run['status']} {run['error']}")
+
+    report = build_report(runs, args)
+
+    if args.record:
+        report["recorded_calls"] = cassette.recorded
+    else:
+        report["replay"] = dict(cassette.stats)
+
+    baseline = None
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = print_report(report, baseline, args.threshold)
+
+    print(f"\n{report['runs']} runs, {report['failed']} failed; seconds per stage", end="")
+    print(f"; replay {report['replay']}" if "replay" in report else f"; {report['recorded_calls']} calls recorded")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"Regressed (p50 > +{args.threshold}%): {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
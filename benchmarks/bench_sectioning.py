@@ -0,0 +1,104 @@
+"""
+Sectioning engine benchmark.
+
+Compares the agglomerative (cosine / average linkage) engine against the
+TextTiling engine on synthetic, document-ordered chunk embeddings.
+
+    python -m benchmarks.bench_sectioning --sizes 100 1000 10000
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np # type: ignore
+from sklearn.metrics import adjusted_rand_score # type: ignore
+from services.semantic_section_builder import assign_section_labels
+
+
+def synthetic_embeddings(n: int, dim: int, avg_section_len: int, seed: int = 0):
+
+    rng = np.random.default_rng(seed)
+
+    labels = []
+    section = 0
+
+    while len(labels) < n:
+        length = max(1, int(rng.poisson(avg_section_len)))
+        labels.extend([section] * length)
+        section += 1
+
+    labels = np.array(labels[:n])
+
+    topics = rng.normal(size=(labels.max() + 1, dim)).astype(np.float32)
+    noise = rng.normal(scale=1.5, size=(n, dim)).astype(np.float32)
+
+    embeddings = topics[labels] + noise
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    return embeddings, labels
+
+
+def measure(engine: str, embeddings, threshold: float):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    labels = assign_section_labels(embeddings, threshold, engine=engine)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return labels, elapsed, peak / (1024 * 1024)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--section-len", type=int, default=12)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument(
+        "--max-agglomerative",
+        type=int,
+        default=10000,
+        help="Skip the agglomerative engine above this many chunks"
+    )
+    args = parser.parse_args()
+
+    header = f"{'n':>7} {'engine':>14} {'time_s':>9} {'peak_mb':>9} {'sections':>9} {'ari_vs_aggl':>12} {'ari_vs_truth':>13}"
+    print(header)
+    print("-" * len(header))
+
+    for n in args.sizes:
+
+        embeddings, truth = synthetic_embeddings(n, args.dim, args.section_len)
+
+        reference = None
+
+        for engine in ("agglomerative", "texttiling"):
+
+            if engine == "agglomerative" and n > args.max_agglomerative:
+                print(f"{n:>7} {engine:>14} {'skipped':>9}")
+                continue
+
+            labels, elapsed, peak_mb = measure(engine, embeddings, args.threshold)
+
+            if engine == "agglomerative":
+                reference = labels
+
+            agreement = (
+                f"{adjusted_rand_score(reference, labels):.3f}"
+                if reference is not None else "n/a"
+            )
+
+            print(
+                f"{n:>7} {engine:>14} {elapsed:>9.3f} {peak_mb:>9.1f} "
+                f"{len(set(labels)):>9} {agreement:>12} "
+                f"{adjusted_rand_score(truth, labels):>13.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
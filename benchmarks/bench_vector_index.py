@@ -0,0 +1,106 @@
+"""
+Vector index benchmark.
+
+Builds the exact (flat) and IVF indexes over synthetic clustered unit
+vectors and reports build time, query latency, recall@k of IVF against
+the exact results (per nprobe), and incremental insert / delete cost.
+
+    python -m benchmarks.bench_vector_index --vectors 100000 --dim 256
+"""
+
+import time
+import argparse
+import numpy as np # type: ignore
+from services.vector_index import FlatIndex, IVFIndex
+
+
+def make_vectors(rng, n, dim, topics):
+
+    # Topic centres plus noise, like embeddings of documents on a few subjects
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, topics, n)] + 1.2 * rng.standard_normal((n, dim)).astype(np.float32)
+
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(index, queries, k):
+
+    latencies = []
+    results = []
+
+    for query in queries:
+        start = time.perf_counter()
+        results.append([item_id for item_id, _ in index.search(query, k)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return results, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def recall(results, expected):
+    return np.mean([len(set(r) & set(e)) / len(e) for r, e in zip(results, expected)])
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(rng, args.vectors + args.queries, args.dim, args.topics)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    ids = [f"v{i}" for i in range(args.vectors)]
+
+    start = time.perf_counter()
+    flat = FlatIndex(args.dim)
+    flat.add(ids, vectors)
+    flat_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ivf = IVFIndex(args.dim)
+    ivf.add(ids, vectors)
+    ivf_build = time.perf_counter() - start
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"build: flat {flat_build:.2f}s, ivf {ivf_build:.2f}s ({ivf.stats()['lists']} lists)\n")
+
+    expected, p50, p95 = time_queries(flat, queries, args.k)
+
+    header = f"{'index':>12} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}"
+    print(header)
+    print("-" * len(header))
+    print(f"{'flat':>12} {p50:>8.3f} {p95:>8.3f} {1.0:>7.3f}")
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        results, p50, p95 = time_queries(ivf, queries, args.k)
+        print(f"{'ivf/' + str(nprobe):>12} {p50:>8.3f} {p95:>8.3f} {recall(results, expected):>7.3f}")
+
+    # Incremental updates: one document's worth of vectors at a time
+    batch = make_vectors(rng, 1000, args.dim, args.topics)
+
+    for name, index in (("flat", flat), ("ivf", ivf)):
+        start = time.perf_counter()
+        for i in range(0, len(batch), 20):
+            index.add([f"new{j}" for j in range(i, i + 20)], batch[i:i + 20])
+        insert_ms = (time.perf_counter() - start) * 1000 / 50
+
+        start = time.perf_counter()
+        for i in range(0, len(batch), 20):
+            index.remove([f"new{j}" for j in range(i, i + 20)])
+        delete_ms = (time.perf_counter() - start) * 1000 / 50
+
+        print(f"\n{name}: insert {insert_ms:.3f} ms / 20 vectors, delete {delete_ms:.3f} ms / 20 vectors", end="")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
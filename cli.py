@@ -0,0 +1,58 @@
+"""
+Offline batch summarization, without the API server.
+
+Summarizes every PDF / TXT under the given directories or glob patterns
+and appends one JSON record per document to the output file. Rerunning
+with the same output skips documents that already succeeded.
+
+    python cli.py docs/ "reports/**/*.pdf" --output summaries.jsonl --mode research
+"""
+
+import sys
+import argparse
+from services.offline_batch import run_offline_batch
+from services.concurrency import shutdown_shared_executor
+from services.tracing import shutdown_tracing
+
+
+def main() -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="Directories, files or glob patterns")
+    parser.add_argument("--output", "-o", default="summaries.jsonl")
+    parser.add_argument("--mode", choices=["academic", "research"], default="academic")
+    parser.add_argument("--detail", default="executive", help="Response detail level (as in /summarize)")
+    parser.add_argument("--prepare-workers", type=int, default=None, help="Ingestion / chunking processes")
+    parser.add_argument("--max-documents", type=int, default=None, help="Documents summarized at once")
+    parser.add_argument("--backend", default=None, help="LLM backend: bedrock or extractive (default LLM_BACKEND)")
+    args = parser.parse_args()
+
+    try:
+        stats = run_offline_batch(
+            args.sources,
+            args.output,
+            mode=args.mode,
+            detail=args.detail,
+            prepare_workers=args.prepare_workers,
+            max_documents=args.max_documents,
+            backend=args.backend
+        )
+    finally:
+        shutdown_shared_executor()
+        shutdown_tracing()
+
+    print(
+        f"{stats['documents_found']} found, {stats['skipped']} skipped, "
+        f"{stats['succeeded']} succeeded, {stats['failed']} failed "
+        f"({stats['prepare_failed']} during ingestion/chunking)"
+    )
+    print(
+        f"{stats['total_time_sec']}s total, {stats['documents_per_min']} docs/min, "
+        f"{stats['tokens_per_min']} LLM tokens/min, {stats['chunks']} chunks"
+    )
+
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
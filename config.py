@@ -20,11 +20,41 @@ class Settings:
         "meta.llama3-8b-instruct-v1:0"
     )
 
+    # Model router tiers; each stage's fast-path model defaults to a tier.
+    # Tiering is opt-in: the strong tier is LLM_MODEL_ID until set, e.g.
+    # LLM_STRONG_MODEL_ID=meta.llama3-70b-instruct-v1:0 (escalations and
+    # the executive call then use it; EXEC_MODEL_ID overrides the latter)
+    LLM_FAST_MODEL_ID: str = os.getenv("LLM_FAST_MODEL_ID", LLM_MODEL_ID)
+    LLM_STRONG_MODEL_ID: str = os.getenv("LLM_STRONG_MODEL_ID", LLM_MODEL_ID)
+
+    CHUNK_MODEL_ID: str = os.getenv("CHUNK_MODEL_ID", LLM_FAST_MODEL_ID)
+    SECTION_MODEL_ID: str = os.getenv("SECTION_MODEL_ID", LLM_FAST_MODEL_ID)
+    EXEC_MODEL_ID: str = os.getenv("EXEC_MODEL_ID", LLM_STRONG_MODEL_ID)
+
     EMBED_MODEL_ID: str = os.getenv(
         "EMBED_MODEL_ID",
         "amazon.titan-embed-text-v2:0"
     )
 
+    # "bedrock" (Titan via EMBED_MODEL_ID) or "local" (offline CPU hashing)
+    EMBED_BACKEND: str = os.getenv("EMBED_BACKEND", "bedrock")
+    EMBED_LOCAL_DIM: int = int(os.getenv("EMBED_LOCAL_DIM", 256))
+    EMBED_CACHE_SIZE: int = int(os.getenv("EMBED_CACHE_SIZE", 4096))
+
+    # "bedrock" or "extractive" (local CPU, no model); jobs can differ
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "bedrock")
+    JOB_LLM_BACKEND: str = os.getenv("JOB_LLM_BACKEND", "")
+
+    # Used when Bedrock is unavailable (circuit open / retries spent); "" = none
+    LLM_FALLBACK_BACKEND: str = os.getenv("LLM_FALLBACK_BACKEND", "extractive")
+
+    # Bedrock record / replay: "record" saves every call to the cassette,
+    # "replay" serves them back (latency x time scale) without network
+    BEDROCK_CASSETTE_MODE: str = os.getenv("BEDROCK_CASSETTE_MODE", "")
+    BEDROCK_CASSETTE_PATH: str = os.getenv("BEDROCK_CASSETTE_PATH", "cassettes/bedrock.jsonl")
+    BEDROCK_REPLAY_TIME_SCALE: float = float(os.getenv("BEDROCK_REPLAY_TIME_SCALE", 1.0))
+    BEDROCK_CASSETTE_ON_MISS: str = os.getenv("BEDROCK_CASSETTE_ON_MISS", "error")  # or "nearest"
+
     # ==========================
     # Generation Parameters
     # ==========================
@@ -32,6 +62,21 @@ class Settings:
     MAX_GEN_LEN_SECTION: int = int(os.getenv("MAX_GEN_LEN_SECTION", 400))
     MAX_GEN_LEN_EXEC: int = int(os.getenv("MAX_GEN_LEN_EXEC", 700))
 
+    # Max tokens of chunk input per section call before map-reduce kicks in
+    SECTION_INPUT_TOKEN_BUDGET: int = int(os.getenv("SECTION_INPUT_TOKEN_BUDGET", 3000))
+
+    # Max tokens of the executive prompt: instructions plus packed sections
+    EXEC_INPUT_TOKEN_BUDGET: int = int(os.getenv("EXEC_INPUT_TOKEN_BUDGET", 4000))
+
+    # Output limit = prompt tokens x ratio, between the floor and MAX_GEN_LEN_*
+    ROUTER_GEN_LEN_RATIO: float = float(os.getenv("ROUTER_GEN_LEN_RATIO", 0.35))
+    ROUTER_MIN_GEN_LEN: int = int(os.getenv("ROUTER_MIN_GEN_LEN", 192))
+
+    # Prompts above these sizes (or in these modes) skip the fast tier
+    ROUTER_CHUNK_STRONG_TOKENS: int = int(os.getenv("ROUTER_CHUNK_STRONG_TOKENS", 1200))
+    ROUTER_SECTION_STRONG_TOKENS: int = int(os.getenv("ROUTER_SECTION_STRONG_TOKENS", 3500))
+    ROUTER_STRONG_MODES: str = os.getenv("ROUTER_STRONG_MODES", "")
+
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", 0.0))
     TOP_P: float = float(os.getenv("TOP_P", 0.9))
 
@@ -42,6 +87,11 @@ class Settings:
     MAX_RETRIES_EMBED: int = int(os.getenv("MAX_RETRIES_EMBED", 2))
     BASE_DELAY: float = float(os.getenv("BASE_DELAY", 0.8))
 
+    # Consecutive failed Bedrock LLM attempts that open the circuit, and
+    # how long it stays open before a single probe call is let through
+    LLM_CIRCUIT_FAILURES: int = int(os.getenv("LLM_CIRCUIT_FAILURES", 5))
+    LLM_CIRCUIT_RESET_SEC: float = float(os.getenv("LLM_CIRCUIT_RESET_SEC", 30))
+
     # ==========================
     # Clustering
     # ==========================
@@ -57,15 +107,121 @@ class Settings:
         os.getenv("MIN_CHUNKS_FOR_CLUSTERING", 3)
     )
 
+    # "agglomerative" (cosine tree, O(n^2)) or "texttiling" (contiguous, ~O(n))
+    SECTIONING_ENGINE: str = os.getenv("SECTIONING_ENGINE", "agglomerative")
+
+    TEXTTILING_WINDOW: int = int(os.getenv("TEXTTILING_WINDOW", 3))
+
     # ==========================
     # Concurrency
     # ==========================
     MAX_WORKERS: int = int(os.getenv("MAX_WORKERS", 4))
 
+    # Process-wide cap on concurrent Bedrock calls across all requests
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+
+    # Threads that run pipeline stage nodes (shared by all requests)
+    PIPELINE_STAGE_WORKERS: int = int(os.getenv("PIPELINE_STAGE_WORKERS", 32))
+
+    # Embed strong chunk summaries while the chunk stage is still running
+    PIPELINED_EMBEDDING: bool = os.getenv("PIPELINED_EMBEDDING", "true").lower() == "true"
+
+    # ==========================
+    # Admission Control
+    # ==========================
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+    # Whole request body (batch uploads carry several files)
+    MAX_REQUEST_BYTES: int = int(os.getenv("MAX_REQUEST_BYTES", 200 * 1024 * 1024))
+    MAX_PDF_PAGES: int = int(os.getenv("MAX_PDF_PAGES", 500))
+
+    # Estimated LLM + embedding tokens allowed in flight at once
+    ADMISSION_TOKEN_BUDGET: int = int(os.getenv("ADMISSION_TOKEN_BUDGET", 1_000_000))
+    ADMISSION_MAX_QUEUED: int = int(os.getenv("ADMISSION_MAX_QUEUED", 16))
+    ADMISSION_MAX_WAIT_SEC: float = float(os.getenv("ADMISSION_MAX_WAIT_SEC", 30))
+    ADMISSION_DEFAULT_RETRY_SEC: int = int(os.getenv("ADMISSION_DEFAULT_RETRY_SEC", 30))
+
+    # ==========================
+    # Batch Summarization
+    # ==========================
+    BATCH_MAX_DOCUMENTS: int = int(os.getenv("BATCH_MAX_DOCUMENTS", 16))
+    # Processes for offline ingestion + chunking (0 = CPU count)
+    OFFLINE_PREPARE_WORKERS: int = int(os.getenv("OFFLINE_PREPARE_WORKERS", 0))
+
+    # ==========================
+    # Async Jobs
+    # ==========================
+    JOB_DB_PATH: str = os.getenv("JOB_DB_PATH", "jobs/jobs.db")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))
+    JOB_RESULT_TTL_SEC: int = int(os.getenv("JOB_RESULT_TTL_SEC", 86400))
+    JOB_POLL_INTERVAL_SEC: float = float(os.getenv("JOB_POLL_INTERVAL_SEC", 0.5))
+    # Workers renew a running job's lease every heartbeat; a job whose
+    # lease ran out (dead worker) is queued again
+    JOB_LEASE_SEC: int = int(os.getenv("JOB_LEASE_SEC", 60))
+    JOB_HEARTBEAT_SEC: float = float(os.getenv("JOB_HEARTBEAT_SEC", 10))
+
+    # ==========================
+    # Chunk broker (distributed chunk summarization)
+    # ==========================
+    # Chunks go to worker processes through a SQLite broker instead of
+    # this process's threads; workers: python -m services.chunk_worker
+    CHUNK_BROKER_ENABLED: bool = os.getenv("CHUNK_BROKER_ENABLED", "false").lower() == "true"
+    CHUNK_BROKER_DB_PATH: str = os.getenv("CHUNK_BROKER_DB_PATH", "jobs/chunk_broker.db")
+    CHUNK_WORKERS: int = int(os.getenv("CHUNK_WORKERS", 2))  # started by the API; 0 = external only
+    CHUNK_WORKER_THREADS: int = int(os.getenv("CHUNK_WORKER_THREADS", 4))
+    CHUNK_LEASE_SEC: int = int(os.getenv("CHUNK_LEASE_SEC", 30))
+    CHUNK_MAX_ATTEMPTS: int = int(os.getenv("CHUNK_MAX_ATTEMPTS", 3))
+    CHUNK_WORKER_HEARTBEAT_SEC: float = float(os.getenv("CHUNK_WORKER_HEARTBEAT_SEC", 2))
+    CHUNK_BROKER_POLL_SEC: float = float(os.getenv("CHUNK_BROKER_POLL_SEC", 0.05))
+    CHUNK_RESULT_TTL_SEC: int = int(os.getenv("CHUNK_RESULT_TTL_SEC", 3600))
+
+    # ==========================
+    # Checkpoints
+    # ==========================
+    # Per-run intermediate results, so retried runs skip finished work
+    CHECKPOINT_ENABLED: bool = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+    CHECKPOINT_DB_PATH: str = os.getenv("CHECKPOINT_DB_PATH", "checkpoints/checkpoints.db")
+    CHECKPOINT_TTL_SEC: int = int(os.getenv("CHECKPOINT_TTL_SEC", 86400))
+
+    # ==========================
+    # Tracing
+    # ==========================
+    # "file" (OTLP/JSON lines), "otlp" (HTTP collector) or "none"
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "file")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+    TRACE_FILE_PATH: str = os.getenv("TRACE_FILE_PATH", "logs/traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "genai-document-summarizer")
+    TRACE_MAX_QUEUE: int = int(os.getenv("TRACE_MAX_QUEUE", 8192))
+    TRACE_EXPORT_BATCH_SIZE: int = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", 512))
+    TRACE_EXPORT_INTERVAL_SEC: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SEC", 2.0))
+
+    # ==========================
+    # Vector index (cross-document /search)
+    # ==========================
+    VECTOR_INDEX_ENABLED: bool = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+    VECTOR_INDEX_DB_PATH: str = os.getenv("VECTOR_INDEX_DB_PATH", "index/vectors.db")
+
+    # Exact search up to this many vectors per kind, IVF above
+    VECTOR_INDEX_IVF_THRESHOLD: int = int(os.getenv("VECTOR_INDEX_IVF_THRESHOLD", 20000))
+    VECTOR_INDEX_NLIST: int = int(os.getenv("VECTOR_INDEX_NLIST", 0))  # 0 = sqrt(vectors)
+    VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", 8))
+    VECTOR_SEARCH_MAX_K: int = int(os.getenv("VECTOR_SEARCH_MAX_K", 50))
+
+    # ==========================
+    # Profiling (opt-in per request: X-Profile header / ?profile=)
+    # ==========================
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_TOP_ALLOCATIONS: int = int(os.getenv("PROFILE_TOP_ALLOCATIONS", 10))
+    PROFILE_TTL_SEC: int = int(os.getenv("PROFILE_TTL_SEC", 86400))
+
     # ==========================
     # Logging
     # ==========================
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # Share of per-chunk records kept, by level; WARNING and above always kept
+    LOG_CHUNK_SAMPLE_RATES: str = os.getenv("LOG_CHUNK_SAMPLE_RATES", "DEBUG=0.01,INFO=0.1")
+
 
 settings = Settings()
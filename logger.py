@@ -1,14 +1,151 @@
-import logging
 import os
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import contextvars
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from typing import Dict
 from config import settings
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Fields stamped on every record logged from the current context
+_log_context = contextvars.ContextVar("log_context", default={})
+
+# CONTEXT
+
+@contextmanager
+def log_context(**fields):
+    """
+    Adds fields (request_id, chunk_id, ...) to every log line emitted in
+    this context, including from stage and executor threads.
+    """
+
+    token = _log_context.set({**_log_context.get(), **fields})
+
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def log_field(name: str):
+    return _log_context.get().get(name)
+
+# RECORD HANDLING
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """
+    "DEBUG=0.05,INFO=0.1" -> {10: 0.05, 20: 0.1}
+    """
+
+    rates = {}
+
+    for part in (spec or "").split(","):
+        level, _, rate = part.partition("=")
+        levelno = logging.getLevelName(level.strip().upper())
+
+        if isinstance(levelno, int) and rate.strip():
+            rates[levelno] = max(0.0, min(1.0, float(rate)))
+
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """
+    Runs on the logging thread, before the record is queued: stamps the
+    caller's log context on it and samples per-chunk records (those logged
+    inside a chunk_id context) by level. Dropped records never reach the
+    queue.
+    """
+
+    def __init__(self, sample_rates: Dict[int, float] = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+
+        fields = _log_context.get()
+
+        if "chunk_id" in fields:
+            rate = self.sample_rates.get(record.levelno, 1.0)
+
+            if rate < 1.0 and random.random() >= rate:
+                return False
+
+        record.context = fields
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+
+        entry.update({
+            k: v for k, v in getattr(record, "context", {}).items()
+            if v is not None
+        })
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode("utf-8")
+
+        return json.dumps(entry, default=str)
+
+
+def build_queue_logging(handler: logging.Handler, sample_rates: Dict[int, float] = None):
+    """
+    Puts `handler` behind a queue: callers only filter and enqueue, and a
+    listener thread does the formatting and file I/O.
+    """
+
+    log_queue = queue.SimpleQueue()
+
+    # Only merges msg % args; the listener's handler does the real formatting
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler.addFilter(ContextFilter(sample_rates))
+
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    return queue_handler, listener
+
+# SETUP
+
+_file_handler = logging.FileHandler(os.path.join(LOG_DIR, "app.log"))
+_file_handler.setFormatter(JsonFormatter())
+
+_queue_handler, _listener = build_queue_logging(
+    _file_handler,
+    parse_sample_rates(settings.LOG_CHUNK_SAMPLE_RATES)
+)
+
 logging.basicConfig(
-    filename=os.path.join(LOG_DIR, "app.log"),
     level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+    handlers=[_queue_handler]
 )
 
+_listener.start()
+atexit.register(_listener.stop)
+
 logger = logging.getLogger("GenAI_Pipeline")
@@ -1,18 +1,39 @@
-def build_formatted_input(section_summaries):
+def format_executive_section(section):
 
-    formatted = ""
-
-    for section in section_summaries:
-        formatted += f"""
+    # Blocks missing from a degraded section are left out entirely
+    formatted = f"""
 SECTION {section['section_id']}
-SUMMARY:
+"""
+
+    if "section_summary" in section:
+        formatted += f"""SUMMARY:
 {section['section_summary']}
 
-KEY POINTS:
-{', '.join(section.get('section_key_points', []))}
+"""
+
+    if "section_key_points" in section:
+        formatted += f"""KEY POINTS:
+{', '.join(section['section_key_points'])}
+
+"""
+
+    if "section_risks_action_items" in section:
+        formatted += f"""RISKS:
+{', '.join(section['section_risks_action_items'])}
+"""
+
+    return formatted
+
+
+def build_formatted_input(section_summaries, omitted_count=0):
 
-RISKS:
-{', '.join(section.get('section_risks_action_items', []))}
+    formatted = "".join(
+        format_executive_section(section) for section in section_summaries
+    )
+
+    if omitted_count:
+        formatted += f"""
+NOTE: {omitted_count} lower-priority section(s) omitted to fit the input budget.
 """
 
     return formatted
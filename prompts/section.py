@@ -1,15 +1,19 @@
-def build_section_prompt(section_chunks, section_id):
-
-    formatted_input = ""
+def format_section_chunk(chunk):
 
-    for chunk in section_chunks:
-        formatted_input += f"""
+    return f"""
 CHUNK {chunk['chunk_id']}
 Summary: {chunk.get('summary', '')}
 Key Points: {', '.join(chunk.get('key_points', []))}
 Risks: {', '.join(chunk.get('key_risks_action_items', []))}
 """
 
+
+def build_section_prompt(section_chunks, section_id):
+
+    formatted_input = "".join(
+        format_section_chunk(chunk) for chunk in section_chunks
+    )
+
     prompt = f"""Respond with ONLY valid JSON. Start with {{ end with }}.
 
 {{
@@ -0,0 +1,318 @@
+import math
+import time
+import itertools
+import threading
+from collections import deque
+from typing import Dict, List
+from fastapi import HTTPException  # type: ignore
+from config import settings
+from logger import logger
+from services.chunking import count_tokens
+from services.chunk_features import ChunkFeatures
+
+# Instruction / JSON template tokens wrapped around each chunk
+CHUNK_PROMPT_OVERHEAD = 250
+
+# Chunks per section assumed before clustering has run
+CHUNKS_PER_SECTION_ESTIMATE = 4
+
+# COST ESTIMATE
+
+def estimate_request_tokens(chunks: List[str], features: List[ChunkFeatures] = None) -> Dict:
+    """
+    Upper-end token cost of summarizing these chunks, from the chunk sizes
+    and the MAX_GEN_LEN_* caps. Section inputs are the chunk summaries plus
+    roughly one extra reduce pass. The chunker's token counts are used when
+    `features` is given.
+    """
+
+    n = len(chunks)
+    sections = max(1, math.ceil(n / CHUNKS_PER_SECTION_ESTIMATE))
+
+    if features:
+        chunk_tokens = sum(f.token_count for f in features)
+    else:
+        chunk_tokens = sum(count_tokens(c) for c in chunks)
+
+    chunk_input = chunk_tokens + n * CHUNK_PROMPT_OVERHEAD
+    chunk_output = n * settings.MAX_GEN_LEN_CHUNK
+    section_input = 2 * chunk_output
+    section_output = sections * settings.MAX_GEN_LEN_SECTION
+    executive = min(settings.EXEC_INPUT_TOKEN_BUDGET, section_output) + settings.MAX_GEN_LEN_EXEC
+
+    llm_tokens = chunk_input + chunk_output + section_input + section_output + executive
+    embedding_tokens = chunk_output + section_output + settings.MAX_GEN_LEN_EXEC
+
+    return {
+        "llm_tokens": llm_tokens,
+        "embedding_tokens": embedding_tokens,
+        "total_tokens": llm_tokens + embedding_tokens
+    }
+
+# ADMISSION CONTROLLER
+
+class AdmissionController:
+    """
+    Keeps the estimated tokens of in-flight requests under a budget. A
+    request that fits (with nobody queued ahead of it) runs immediately;
+    otherwise it waits in FIFO order for up to ADMISSION_MAX_WAIT_SEC, and
+    is rejected with 429 + Retry-After when the wait queue is full or the
+    wait times out. A request larger than the whole budget is admitted
+    once it can run alone.
+
+    Patient requests (batch documents) wait in the same FIFO without a
+    timeout and are never rejected; they do not count toward
+    ADMISSION_MAX_QUEUED, so a large batch cannot fill the queue for
+    interactive requests.
+    """
+
+    def __init__(self, token_budget: int = None, max_queued: int = None, max_wait_sec: float = None):
+
+        self.token_budget = token_budget or settings.ADMISSION_TOKEN_BUDGET
+        self.max_queued = settings.ADMISSION_MAX_QUEUED if max_queued is None else max_queued
+        self.max_wait_sec = settings.ADMISSION_MAX_WAIT_SEC if max_wait_sec is None else max_wait_sec
+
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._in_flight = {}
+        self._waiting = deque()
+        self._waiting_tokens = {}
+        self._waiting_patient = set()
+
+        # EWMA of tokens completed per second, for Retry-After
+        self._throughput = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _in_flight_tokens(self) -> int:
+        return sum(t["tokens"] for t in self._in_flight.values())
+
+    def _fits(self, tokens: int) -> bool:
+        return self._in_flight_tokens() + tokens <= self.token_budget
+
+    def acquire(self, estimated_tokens: int, patient: bool = False) -> Dict:
+
+        ticket = {
+            "id": next(self._ids),
+            "estimated_tokens": estimated_tokens,
+            "tokens": min(estimated_tokens, self.token_budget),
+            "queued_sec": 0.0
+        }
+
+        with self._cond:
+
+            if not self._waiting and self._fits(ticket["tokens"]):
+                return self._admit(ticket)
+
+            if not patient and len(self._waiting) - len(self._waiting_patient) >= self.max_queued:
+                self._reject(ticket, "admission queue full")
+
+            self.queued += 1
+            self._waiting.append(ticket["id"])
+            self._waiting_tokens[ticket["id"]] = ticket["tokens"]
+            if patient:
+                self._waiting_patient.add(ticket["id"])
+            start = time.monotonic()
+            deadline = None if patient else start + self.max_wait_sec
+
+            while not (self._waiting[0] == ticket["id"] and self._fits(ticket["tokens"])):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket["id"])
+                    del self._waiting_tokens[ticket["id"]]
+                    self._cond.notify_all()
+                    self._reject(ticket, f"token budget busy for {self.max_wait_sec}s")
+
+                self._cond.wait(remaining)
+
+            self._waiting.popleft()
+            del self._waiting_tokens[ticket["id"]]
+            self._waiting_patient.discard(ticket["id"])
+            ticket["queued_sec"] = round(time.monotonic() - start, 3)
+
+            # The next request in line may fit as well
+            self._cond.notify_all()
+
+            return self._admit(ticket)
+
+    def _admit(self, ticket: Dict) -> Dict:
+
+        ticket["admitted_at"] = time.monotonic()
+        self._in_flight[ticket["id"]] = ticket
+        self.admitted += 1
+
+        return ticket
+
+    def _reject(self, ticket: Dict, reason: str):
+
+        self.rejected += 1
+        retry_after = self.retry_after(ticket["tokens"])
+
+        logger.warning(
+            f"Rejected request of ~{ticket['estimated_tokens']} tokens: {reason} "
+            f"(retry after {retry_after}s)"
+        )
+
+        raise HTTPException(
+            status_code=429,
+            detail=f"Server busy ({reason}). Estimated cost {ticket['estimated_tokens']} tokens.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def release(self, ticket: Dict):
+
+        with self._cond:
+            if self._in_flight.pop(ticket["id"], None) is None:
+                return
+
+            elapsed = time.monotonic() - ticket["admitted_at"]
+
+            if elapsed > 0:
+                rate = ticket["tokens"] / elapsed
+                self._throughput = rate if self._throughput is None else 0.8 * self._throughput + 0.2 * rate
+
+            self._cond.notify_all()
+
+    def retry_after(self, tokens: int) -> int:
+        """
+        Seconds until the backlog ahead of a request of `tokens` should have
+        drained, at the observed completion rate.
+        """
+
+        backlog = (
+            self._in_flight_tokens()
+            + sum(self._waiting_tokens.values())
+            + tokens
+            - self.token_budget
+        )
+
+        if not self._throughput or backlog <= 0:
+            return settings.ADMISSION_DEFAULT_RETRY_SEC
+
+        return int(min(600, max(1, math.ceil(backlog / self._throughput))))
+
+    def state(self) -> Dict:
+
+        with self._cond:
+            in_flight = self._in_flight_tokens()
+
+            return {
+                "token_budget": self.token_budget,
+                "in_flight_tokens": in_flight,
+                "in_flight_requests": len(self._in_flight),
+                "available_tokens": max(0, self.token_budget - in_flight),
+                "queued_requests": len(self._waiting),
+                "queued_patient_requests": len(self._waiting_patient),
+                "queued_tokens": sum(self._waiting_tokens.values()),
+                "max_queued": self.max_queued,
+                "max_wait_sec": self.max_wait_sec,
+                "throughput_tokens_per_sec": round(self._throughput or 0.0, 1),
+                "admitted_total": self.admitted,
+                "queued_total": self.queued,
+                "rejected_total": self.rejected
+            }
+
+
+class RequestAdmission:
+    """
+    One request's slot in the controller: acquired by the pipeline's admit
+    stage (on the request thread) once the chunks are known, released when
+    the run ends. A `patient` request waits for its turn however long it
+    takes instead of risking a 429.
+    """
+
+    def __init__(self, controller: AdmissionController, patient: bool = False):
+        self.controller = controller
+        self.patient = patient
+        self.ticket = None
+        self.estimate = {}
+
+    def admit(self, chunks: List[str], features: List[ChunkFeatures] = None):
+        self.estimate = estimate_request_tokens(chunks, features)
+        self.ticket = self.controller.acquire(self.estimate["total_tokens"], patient=self.patient)
+
+    def release(self):
+
+        if self.ticket is not None:
+            self.controller.release(self.ticket)
+
+    def summary(self) -> Dict:
+        return {
+            **self.estimate,
+            "queued_sec": self.ticket["queued_sec"] if self.ticket else 0.0
+        }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+
+    global _controller
+
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+
+    return _controller
+
+# UPLOAD SIZE GUARD
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware that stops reading a request body once it exceeds
+    `max_bytes`, so oversized uploads fail with 413 while streaming instead
+    of after being spooled to disk.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._too_large(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+
+            nonlocal received
+            message = await receive()
+
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _too_large(self, send):
+
+        body = b'{"detail":"Request body too large"}'
+
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,129 @@
+import math
+import time
+import contextvars
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
+from logger import logger, log_context
+from services.concurrency import get_shared_executor
+from services.summarization_pipeline import run_summarization_pipeline
+
+BATCH_WEIGHTINGS = ("round_robin", "size")
+
+# LANE WEIGHTS
+
+def lane_weights(sizes: List[int], weighting: str) -> List[float]:
+    """
+    round_robin: every document gets an equal share of the worker budget.
+    size: shares grow with the square root of document size, so large
+    documents move faster without starving small ones.
+    """
+
+    if weighting != "size" or not sizes:
+        return [1.0] * len(sizes)
+
+    smallest = max(min(sizes), 1)
+    return [math.sqrt(max(size, 1) / smallest) for size in sizes]
+
+# BATCH ENGINE
+
+def summarize_batch(
+    files: List,
+    mode: str = "academic",
+    weighting: str = "round_robin",
+    detail: str = "executive",
+    backend: str = None
+) -> Dict:
+    """
+    Summarizes many uploads at once. Every document gets its own lane on
+    the process-wide executor (LLM_MAX_CONCURRENCY), so the batch shares
+    the global Bedrock budget with other traffic and documents are served
+    fairly regardless of their size.
+    """
+
+    if weighting not in BATCH_WEIGHTINGS:
+        weighting = "round_robin"
+
+    sizes = [_upload_size(f) for f in files]
+    weights = lane_weights(sizes, weighting)
+
+    executor = get_shared_executor()
+    batch_start = time.perf_counter()
+    documents = [None] * len(files)
+
+    def run_document(pos: int):
+
+        upload = files[pos]
+        doc_start = time.perf_counter()
+
+        try:
+            with log_context(document=upload.filename):
+                response = run_summarization_pipeline(
+                    upload,
+                    mode,
+                    detail=detail,
+                    weight=weights[pos],
+                    backend=backend,
+                    # The batch was accepted as a whole; its documents
+                    # wait for token budget rather than fail with 429
+                    patient_admission=True
+                )
+            status, error = "done", None
+
+        except Exception as e:
+            response, status = None, "failed"
+            error = str(getattr(e, "detail", None) or e)
+            logger.warning(f"Batch document {upload.filename} failed: {error}")
+
+        return {
+            "document_name": upload.filename,
+            "status": status,
+            "error": error,
+            "weight": round(weights[pos], 2),
+            "started_sec": round(doc_start - batch_start, 2),
+            "completed_sec": round(time.perf_counter() - batch_start, 2),
+            "result": response
+        }
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(settings.BATCH_MAX_DOCUMENTS, len(files))),
+        thread_name_prefix="batch-doc"
+    ) as documents_pool:
+
+        # Document threads inherit the request's trace
+        futures = {
+            documents_pool.submit(contextvars.copy_context().run, run_document, pos): pos
+            for pos in range(len(files))
+        }
+
+        for future in as_completed(futures):
+            documents[futures[future]] = future.result()
+
+    total_sec = time.perf_counter() - batch_start
+    done = [d for d in documents if d["status"] == "done"]
+    total_chunks = sum(d["result"]["performance"]["chunk_count"] for d in done)
+
+    return {
+        "documents": documents,
+        "throughput": {
+            "documents": len(files),
+            "succeeded": len(done),
+            "failed": len(files) - len(done),
+            "weighting": weighting,
+            "max_workers": executor.max_workers,
+            "total_time_sec": round(total_sec, 2),
+            "documents_per_min": round(len(done) / total_sec * 60, 2) if total_sec else 0.0,
+            "chunks_per_sec": round(total_chunks / total_sec, 2) if total_sec else 0.0
+        }
+    }
+
+
+def _upload_size(upload) -> int:
+
+    try:
+        upload.file.seek(0, 2)
+        size = upload.file.tell()
+        upload.file.seek(0)
+        return size
+    except Exception:
+        return 1
@@ -0,0 +1,202 @@
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError # type: ignore
+from logger import logger
+
+CASSETTE_MODES = ("record", "replay")
+MISS_POLICIES = ("error", "nearest")
+
+
+class CassetteMissError(RuntimeError):
+    """Replay found no recording for a request."""
+
+
+def request_key(model_id: str, body: str) -> str:
+    """
+    Hash of the model and the request body, with the body's keys sorted
+    so formatting differences do not matter.
+    """
+
+    canonical = json.dumps({"modelId": model_id, "body": json.loads(body)}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# RECORDING
+
+class RecordingClient:
+    """
+    Wraps a Bedrock runtime client and appends every invoke_model call to
+    a JSONL cassette: request hash, model, observed latency, and the
+    response body (or the error, with the ClientError response if any).
+    """
+
+    def __init__(self, inner, path: str):
+
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+
+        start = time.perf_counter()
+        entry = {
+            "key": request_key(modelId, body),
+            "model_id": modelId,
+            "request_chars": len(body),
+            "recorded_at": time.time()
+        }
+
+        try:
+            response = self.inner.invoke_model(modelId=modelId, body=body, **kwargs)
+            payload = response["body"].read()
+
+        except Exception as e:
+            entry.update({
+                "latency_sec": round(time.perf_counter() - start, 4),
+                "error": f"{type(e).__name__}: {str(e)}"
+            })
+
+            # Kept so replay raises the same ClientError (retryable or not)
+            if isinstance(getattr(e, "response", None), dict):
+                entry["error_response"] = {
+                    "Error": e.response.get("Error", {}),
+                    "ResponseMetadata": {
+                        "HTTPStatusCode": e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+                    }
+                }
+
+            self._write(entry)
+            raise
+
+        entry.update({
+            "latency_sec": round(time.perf_counter() - start, 4),
+            "response": payload.decode("utf-8")
+        })
+        self._write(entry)
+
+        return {**response, "body": io.BytesIO(payload)}
+
+    def _write(self, entry: Dict):
+
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.recorded += 1
+
+# REPLAY
+
+class ReplayClient:
+    """
+    Serves invoke_model from a cassette, sleeping the recorded latency
+    times `time_scale` (0 replays instantly). Repeated requests get their
+    recordings in order (e.g. a failed attempt, then its retry), the last
+    one once they run out.
+
+    On a miss, "error" raises CassetteMissError; "nearest" serves the
+    recording of the same model with the closest request size, so a
+    changed prompt still gets a realistic answer and latency.
+    """
+
+    def __init__(self, path: str, time_scale: float = 1.0, on_miss: str = "error"):
+
+        self.path = path
+        self.time_scale = time_scale
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict]] = {}
+        self._by_model: Dict[str, List[Dict]] = {}
+        self._served: Dict[str, int] = {}
+        self.stats = {"hits": 0, "nearest": 0, "misses": 0}
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted recording
+                    continue
+
+                self._entries.setdefault(entry["key"], []).append(entry)
+                self._by_model.setdefault(entry["model_id"], []).append(entry)
+
+        logger.info(f"Replaying {sum(len(e) for e in self._entries.values())} recorded Bedrock calls from {path}")
+
+    def _lookup(self, model_id: str, body: str) -> Optional[Dict]:
+
+        key = request_key(model_id, body)
+
+        with self._lock:
+            entries = self._entries.get(key)
+
+            if entries:
+                served = self._served.get(key, 0)
+                self._served[key] = served + 1
+                self.stats["hits"] += 1
+                return entries[min(served, len(entries) - 1)]
+
+            candidates = [e for e in self._by_model.get(model_id, []) if "response" in e]
+
+            if self.on_miss == "nearest" and candidates:
+                self.stats["nearest"] += 1
+                return min(candidates, key=lambda e: abs(e["request_chars"] - len(body)))
+
+            self.stats["misses"] += 1
+            return None
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+
+        entry = self._lookup(modelId, body)
+
+        if entry is None:
+            raise CassetteMissError(f"No recording for {modelId} request {request_key(modelId, body)[:12]}")
+
+        time.sleep(entry["latency_sec"] * self.time_scale)
+
+        if "error_response" in entry:
+            raise ClientError(entry["error_response"], "InvokeModel")
+
+        if "error" in entry:
+            # Errors without a response are connection errors and timeouts
+            raise ConnectionError(f"Replayed error: {entry['error']}")
+
+        return {"body": io.BytesIO(entry["response"].encode("utf-8"))}
+
+# WIRING
+
+def wrap_client(inner, mode: str, path: str, time_scale: float = 1.0, on_miss: str = "error"):
+    """
+    The Bedrock client to use for `mode`: "record" wraps `inner`,
+    "replay" replaces it, anything else returns it unchanged.
+    """
+
+    if mode == "record":
+        logger.info(f"Recording Bedrock calls to {path}")
+        return RecordingClient(inner, path)
+
+    if mode == "replay":
+        if on_miss not in MISS_POLICIES:
+            raise ValueError(f"Unknown cassette miss policy: {on_miss}")
+        return ReplayClient(path, time_scale, on_miss)
+
+    return inner
+
+
+def use_cassette(mode: str, path: str, time_scale: float = 1.0, on_miss: str = "error"):
+    """
+    Switches services.bedrock_service to record to / replay from `path`
+    at runtime (benchmarks, tests). Returns the new client.
+    """
+
+    import services.bedrock_service as bedrock_service
+
+    inner = getattr(bedrock_service.client, "inner", bedrock_service.client)
+    bedrock_service.client = wrap_client(inner, mode, path, time_scale, on_miss)
+
+    return bedrock_service.client
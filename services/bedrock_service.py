@@ -1,10 +1,18 @@
 import boto3 # type: ignore
 import json
 import time
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, List
+import numpy as np # type: ignore
+from botocore.exceptions import ClientError, HTTPClientError, ConnectionError as BotoConnectionError # type: ignore
 from config import settings
 from logger import logger
-import time
+from services.embedding_backends import get_embedding_backend
+from services.tracing import span, SPAN_KIND_CLIENT
+from services.profiling import record_call
+from services.bedrock_cassette import wrap_client
 
 # CLIENT INITIALIZATION
 
@@ -15,17 +23,30 @@ client = boto3.client(
     aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY if hasattr(settings, "AWS_SECRET_ACCESS_KEY") else None
 )
 
+# Record to / replay from a cassette when BEDROCK_CASSETTE_MODE is set
+client = wrap_client(
+    client,
+    settings.BEDROCK_CASSETTE_MODE,
+    settings.BEDROCK_CASSETTE_PATH,
+    settings.BEDROCK_REPLAY_TIME_SCALE,
+    settings.BEDROCK_CASSETTE_ON_MISS
+)
+
 # SAFE JSON PARSER (Unified)
 
+class ModelOutputError(ValueError):
+    """The model answered, but not with usable JSON."""
+
+
 def safe_parse_json(text: str) -> Dict:
     if not text:
-        raise ValueError("Empty model response")
+        raise ModelOutputError("Empty model response")
 
     text = text.strip()
     start = text.find("{")
 
     if start == -1:
-        raise ValueError("No JSON found in model response")
+        raise ModelOutputError("No JSON found in model response")
 
     text = text[start:]
 
@@ -35,17 +56,179 @@ def safe_parse_json(text: str) -> Dict:
         except json.JSONDecodeError:
             continue
 
-    raise ValueError("Could not extract valid JSON")
+    raise ModelOutputError("Could not extract valid JSON")
+
+
+# ERROR CLASSIFICATION
+
+# Bedrock error codes worth retrying (besides any 5xx)
+TRANSIENT_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "ServiceUnavailableException",
+    "InternalServerException"
+}
+
+
+def is_transient_error(e: Exception) -> bool:
+    """
+    Throttling, 5xx, timeouts and connection errors: worth a retry and a
+    sign of a Bedrock problem. Anything else (validation, access denied,
+    unknown model, ...) fails the same way on every attempt.
+    """
+
+    if isinstance(e, ClientError):
+        error = e.response.get("Error", {})
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+
+        return error.get("Code") in TRANSIENT_ERROR_CODES or status >= 500 or status in (408, 429)
+
+    return isinstance(e, (BotoConnectionError, HTTPClientError, ConnectionError, TimeoutError))
+
+# CIRCUIT BREAKER
+
+class LLMUnavailableError(RuntimeError):
+    """Bedrock could not produce a response (retries spent or circuit open)."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed attempts and fails
+    calls fast while open. After `reset_sec` one probe call is let through:
+    success closes the circuit, failure opens it again. Only transient
+    errors count as failures; invalid model output and rejected requests
+    do not, the service answered.
+    """
+
+    def __init__(self, failure_threshold: int, reset_sec: float):
+
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_sec = reset_sec
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
 
+        with self._lock:
+            if self._state == "closed":
+                return True
+
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_sec:
+                self._state = "half_open"
+
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+
+        with self._lock:
+            if self._state != "closed":
+                logger.info("LLM circuit closed")
+
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+
+        # Neither success nor failure: let the next call probe instead
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+
+            if self._state == "half_open" or (
+                self._state == "closed" and self._failures >= self.failure_threshold
+            ):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"LLM circuit opened after {self._failures} consecutive failures")
+
+    def state(self) -> Dict:
+
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "open_for_sec": round(time.monotonic() - self._opened_at, 1) if self._state != "closed" else 0.0,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected
+            }
+
+
+llm_circuit = CircuitBreaker(settings.LLM_CIRCUIT_FAILURES, settings.LLM_CIRCUIT_RESET_SEC)
 
 # LLM INVOCATION
 
 def invoke_llm(
     prompt: str,
     max_gen_len: int,
-    stop_tokens: List[str] = None
+    stop_tokens: List[str] = None,
+    model_id: str = None,
+    usage: Dict = None,
+    retry_invalid_output: bool = True
 ) -> Dict:
-    start = time.time()
+
+    usage = usage if usage is not None else {}
+    model_id = model_id or settings.LLM_MODEL_ID
+    start = time.perf_counter()
+    outcome = "error"
+
+    try:
+        parsed = _invoke_llm_attempts(prompt, max_gen_len, stop_tokens, model_id, usage, retry_invalid_output)
+        outcome = "ok"
+        return parsed
+
+    except ModelOutputError:
+        outcome = "invalid_json"
+        raise
+
+    except CircuitOpenError:
+        outcome = "circuit_open"
+        raise
+
+    finally:
+        record_call(
+            "llm",
+            model_id,
+            time.perf_counter() - start,
+            outcome=outcome,
+            attempts=usage.get("attempts"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            generation_tokens=usage.get("generation_tokens")
+        )
+
+
+def _invoke_llm_attempts(
+    prompt: str,
+    max_gen_len: int,
+    stop_tokens: List[str],
+    model_id: str,
+    usage: Dict,
+    retry_invalid_output: bool
+) -> Dict:
+    model_id = model_id or settings.LLM_MODEL_ID
     if not prompt:
         raise ValueError("Prompt is empty")
 
@@ -57,56 +240,186 @@ def invoke_llm(
         "stop": stop_tokens or ["```", "END"]
     }
 
+    output_error = None
+    transient = False
+
     for attempt in range(settings.MAX_RETRIES_LLM + 1):
 
-        try:
-            response = client.invoke_model(
-                modelId=settings.LLM_MODEL_ID,
-                body=json.dumps(body),
-                contentType="application/json",
-                accept="application/json"
-            )
+        # Fail fast instead of queueing retries against an outage
+        if not llm_circuit.allow():
+            raise CircuitOpenError("LLM circuit open; Bedrock call not attempted")
+
+        with span("bedrock.invoke_llm", {
+            "llm.model_id": model_id,
+            "llm.attempt": attempt + 1,
+            "llm.max_gen_len": max_gen_len,
+            "llm.prompt_chars": len(prompt)
+        }, kind=SPAN_KIND_CLIENT) as attempt_span:
+
+            try:
+                response = client.invoke_model(
+                    modelId=model_id,
+                    body=json.dumps(body),
+                    contentType="application/json",
+                    accept="application/json"
+                )
+
+                response_body = json.loads(response["body"].read())
+                generated_text = response_body.get("generation", "").strip()
+                llm_circuit.record_success()
+
+                attempt_span.set_attributes({
+                    "llm.prompt_tokens": response_body.get("prompt_token_count"),
+                    "llm.generation_tokens": response_body.get("generation_token_count"),
+                    "llm.stop_reason": response_body.get("stop_reason"),
+                    "llm.parse_outcome": "invalid_json"
+                })
+
+                usage["prompt_tokens"] = response_body.get("prompt_token_count")
+                usage["generation_tokens"] = response_body.get("generation_token_count")
+                usage["attempts"] = attempt + 1
+
+                parsed = safe_parse_json(generated_text)
+                attempt_span.set_attribute("llm.parse_outcome", "ok")
 
-            response_body = json.loads(response["body"].read())
-            generated_text = response_body.get("generation", "").strip()
+                return parsed
 
-            parsed = safe_parse_json(generated_text)
+            except Exception as e:
+                attempt_span.record_exception(e)
+                logger.warning(
+                    f"LLM attempt {attempt+1} failed: {str(e)}"
+                )
 
-            return parsed
+                if isinstance(e, ModelOutputError):
+                    output_error = e
+                    if not retry_invalid_output:
+                        raise
 
-        except Exception as e:
-            logger.warning(
-                f"LLM attempt {attempt+1} failed: {str(e)}"
-            )
-            time.sleep(settings.BASE_DELAY)
+                elif is_transient_error(e):
+                    transient = True
+                    llm_circuit.record_failure()
 
-    raise RuntimeError("LLM failed after retries")
-    end = time.time()
-    logger.info(f"LLM call latency: {round(end-start,2)} sec")
+                else:
+                    # The request itself is bad: retrying cannot help and
+                    # says nothing about Bedrock's health
+                    llm_circuit.release_probe()
+                    raise
+
+        time.sleep(settings.BASE_DELAY)
+
+    # Bedrock answered every time, just not with usable JSON: not an outage
+    if output_error is not None and not transient:
+        raise output_error
+
+    raise LLMUnavailableError("LLM failed after retries")
 
 # EMBEDDING INVOCATION
 
+_embedding_cache = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+
+def clear_embedding_cache():
+
+    with _embedding_cache_lock:
+        _embedding_cache.clear()
+
+
+def _cache_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
 def get_embedding(text: str) -> List[float]:
+    return get_embeddings([text])[0].tolist()
+
+
+def get_embeddings(texts: List[str]) -> np.ndarray:
+    """
+    Embeds a batch of texts, serving repeats from a bounded in-process LRU
+    cache and sending only the misses to the backend in one batch.
+    """
+
+    keys = [_cache_key(t) for t in texts]
+    vectors = {}
+
+    with _embedding_cache_lock:
+        for key in keys:
+            if key in _embedding_cache:
+                _embedding_cache.move_to_end(key)
+                vectors[key] = _embedding_cache[key]
+
+    misses = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            misses.setdefault(key, text)
+
+    if misses:
+        with span("embeddings.batch", {
+            "embedding.backend": settings.EMBED_BACKEND,
+            "embedding.texts": len(texts),
+            "embedding.cache_hits": len(texts) - len(misses)
+        }):
+            fresh = get_embedding_backend().embed_batch(list(misses.values()))
+
+        with _embedding_cache_lock:
+            for key, vector in zip(misses, fresh):
+                vectors[key] = vector
+                _embedding_cache[key] = vector
+
+            while len(_embedding_cache) > settings.EMBED_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
+    return np.array([vectors[key] for key in keys], dtype=np.float32)
+
+
+def invoke_titan_embedding(text: str) -> List[float]:
+
+    start = time.perf_counter()
+    outcome = "error"
+
+    try:
+        vector = _invoke_titan_attempts(text)
+        outcome = "ok"
+        return vector
+
+    finally:
+        record_call("embedding", settings.EMBED_MODEL_ID, time.perf_counter() - start, outcome=outcome)
+
+
+def _invoke_titan_attempts(text: str) -> List[float]:
 
     body = {"inputText": text}
 
     for attempt in range(settings.MAX_RETRIES_EMBED + 1):
 
-        try:
-            response = client.invoke_model(
-                modelId=settings.EMBED_MODEL_ID,
-                body=json.dumps(body),
-                contentType="application/json",
-                accept="application/json"
-            )
-
-            result = json.loads(response["body"].read())
-            return result["embedding"]
-
-        except Exception as e:
-            logger.warning(
-                f"Embedding attempt {attempt+1} failed: {str(e)}"
-            )
-            time.sleep(settings.BASE_DELAY)
+        with span("bedrock.embed", {
+            "embedding.model_id": settings.EMBED_MODEL_ID,
+            "embedding.attempt": attempt + 1,
+            "embedding.input_chars": len(text)
+        }, kind=SPAN_KIND_CLIENT) as attempt_span:
+
+            try:
+                response = client.invoke_model(
+                    modelId=settings.EMBED_MODEL_ID,
+                    body=json.dumps(body),
+                    contentType="application/json",
+                    accept="application/json"
+                )
+
+                result = json.loads(response["body"].read())
+                attempt_span.set_attribute("embedding.input_tokens", result.get("inputTextTokenCount"))
+
+                return result["embedding"]
+
+            except Exception as e:
+                attempt_span.record_exception(e)
+                logger.warning(
+                    f"Embedding attempt {attempt+1} failed: {str(e)}"
+                )
+
+                if not is_transient_error(e):
+                    raise
+
+        time.sleep(settings.BASE_DELAY)
 
     raise RuntimeError("Embedding failed after retries")
\ No newline at end of file
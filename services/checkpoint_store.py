@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Optional
+import numpy as np # type: ignore
+from config import settings
+from logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_checkpoints (
+    run_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (run_id, stage)
+);
+CREATE TABLE IF NOT EXISTS chunk_checkpoints (
+    run_id TEXT NOT NULL,
+    chunk_key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (run_id, chunk_key)
+);
+CREATE INDEX IF NOT EXISTS idx_stage_created ON stage_checkpoints (created_at);
+CREATE INDEX IF NOT EXISTS idx_chunk_created ON chunk_checkpoints (created_at);
+"""
+
+# FINGERPRINTS
+
+def _feed(digest, value):
+
+    if isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+        digest.update(b"}")
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _feed(digest, item)
+        digest.update(b"]")
+
+    elif isinstance(value, np.ndarray):
+        digest.update(f"nd{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+
+    else:
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+
+
+def fingerprint(value) -> str:
+    """
+    Stable hash of nested dicts / lists / numpy arrays / scalars, used to
+    decide whether a stage's inputs changed since its checkpoint.
+    """
+
+    digest = hashlib.sha256()
+    _feed(digest, value)
+    return digest.hexdigest()
+
+# STORE
+
+class CheckpointStore:
+    """
+    Local store of intermediate pipeline results, keyed by run id. Stage
+    outputs are pickled (they hold numpy arrays and int-keyed dicts) and
+    only ever read back by this service; chunk results are JSON.
+    """
+
+    def __init__(self, path: str = None):
+
+        self.path = path or settings.CHECKPOINT_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def run(self, run_id: str = None) -> "RunCheckpoint":
+        return RunCheckpoint(self, run_id or uuid.uuid4().hex)
+
+    def purge_expired(self) -> int:
+
+        cutoff = time.time() - settings.CHECKPOINT_TTL_SEC
+
+        with self._connection() as conn:
+            stages = conn.execute("DELETE FROM stage_checkpoints WHERE created_at < ?", (cutoff,)).rowcount
+            chunks = conn.execute("DELETE FROM chunk_checkpoints WHERE created_at < ?", (cutoff,)).rowcount
+
+        return stages + chunks
+
+
+class RunCheckpoint:
+    """
+    One run's view of the store. Read/write failures are logged and
+    treated as a miss, so checkpointing can never fail a run.
+    """
+
+    def __init__(self, store: CheckpointStore, run_id: str):
+
+        self.store = store
+        self.run_id = run_id
+        self.restored_stages = []
+        self.restored_chunks = 0
+
+    # STAGE OUTPUTS
+
+    def load_stage(self, stage: str, input_hash: str) -> Optional[Dict]:
+
+        try:
+            with self.store._connection() as conn:
+                row = conn.execute(
+                    "SELECT payload FROM stage_checkpoints "
+                    "WHERE run_id = ? AND stage = ? AND input_hash = ?",
+                    (self.run_id, stage, input_hash)
+                ).fetchone()
+
+        except Exception as e:
+            logger.warning(f"Checkpoint read for {stage} failed: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        self.restored_stages.append(stage)
+        return pickle.loads(row[0])
+
+    def save_stage(self, stage: str, input_hash: str, outputs: Dict):
+
+        try:
+            payload = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+
+            with self.store._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO stage_checkpoints "
+                    "(run_id, stage, input_hash, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.run_id, stage, input_hash, payload, time.time())
+                )
+
+        except Exception as e:
+            logger.warning(f"Checkpoint write for {stage} failed: {str(e)}")
+
+    # CHUNK RESULTS
+
+    @staticmethod
+    def chunk_key(chunk_id: int, chunk: str, mode: str, backend: str) -> str:
+        return fingerprint(["chunk", chunk_id, chunk, mode, backend])
+
+    def load_chunk_results(self, keys: Dict[int, str]) -> Dict[int, Dict]:
+
+        if not keys:
+            return {}
+
+        by_key = {key: chunk_id for chunk_id, key in keys.items()}
+
+        try:
+            with self.store._connection() as conn:
+                rows = conn.execute(
+                    "SELECT chunk_key, result FROM chunk_checkpoints WHERE run_id = ?",
+                    (self.run_id,)
+                ).fetchall()
+
+        except Exception as e:
+            logger.warning(f"Checkpoint read for chunk results failed: {str(e)}")
+            return {}
+
+        results = {
+            by_key[key]: json.loads(result)
+            for key, result in rows
+            if key in by_key
+        }
+
+        self.restored_chunks += len(results)
+        return results
+
+    def save_chunk_result(self, key: str, result: Dict):
+
+        try:
+            with self.store._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO chunk_checkpoints "
+                    "(run_id, chunk_key, result, created_at) VALUES (?, ?, ?, ?)",
+                    (self.run_id, key, json.dumps(result), time.time())
+                )
+
+        except Exception as e:
+            logger.warning(f"Checkpoint write for chunk {result.get('chunk_id')} failed: {str(e)}")
+
+    def summary(self) -> Dict:
+
+        return {
+            "run_id": self.run_id,
+            "restored_stages": list(self.restored_stages),
+            "restored_chunks": self.restored_chunks
+        }
+
+
+_store = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+
+    global _store
+
+    if _store is None:
+        _store = CheckpointStore()
+
+    return _store
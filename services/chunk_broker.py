@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from config import settings
+from services.checkpoint_store import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_tasks (
+    task_key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    routing TEXT,
+    degraded INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS chunk_workers (
+    worker TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chunk_tasks_status_created ON chunk_tasks (status, created_at);
+"""
+
+# Keys per IN (...) query, under SQLite's bound-parameter limit
+KEY_BATCH = 500
+
+
+def _batches(keys: List[str]):
+
+    for i in range(0, len(keys), KEY_BATCH):
+        yield keys[i:i + KEY_BATCH]
+
+# SQLITE CHUNK BROKER
+
+class ChunkBroker:
+    """
+    Local stand-in for a task broker between summarize_chunks (producer)
+    and chunk worker processes, on a SQLite file any number of processes
+    on the host can share.
+
+    Tasks are keyed by a hash of the chunk and everything its summary
+    depends on, so resubmitting a chunk reuses its result. Workers take
+    tasks on a lease that they renew while working; a lease that runs out
+    (dead worker) puts the task back up for grabs, so delivery is
+    at-least-once and the first completion wins.
+    """
+
+    def __init__(self, path: str = None):
+
+        self.path = path or settings.CHUNK_BROKER_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+
+        conn = self._connect()
+
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def task_key(chunk_id: int, chunk: str, mode: str, backend: str) -> str:
+        return fingerprint(["chunk-task", chunk_id, chunk, mode, backend])
+
+    # PRODUCER SIDE
+
+    def submit(self, tasks: List[Dict]) -> Dict[str, Dict]:
+        """
+        Queues tasks ({"task_key", "chunk_id", "chunk", "total_chunks",
+        "mode", "backend"}) that are not already queued, running or done.
+        Failed and degraded results are queued again. Returns the results
+        of tasks that were already done, by task key.
+        """
+
+        now = time.time()
+        keys = [t["task_key"] for t in tasks]
+
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_tasks (task_key, status, payload, created_at) "
+                "VALUES (?, 'queued', ?, ?)",
+                [(t["task_key"], json.dumps(t), now) for t in tasks]
+            )
+
+            done = {}
+
+            for batch in _batches(keys):
+                marks = ",".join("?" * len(batch))
+
+                conn.execute(
+                    f"UPDATE chunk_tasks SET status = 'queued', attempts = 0, worker = NULL, "
+                    f"lease_until = NULL, result = NULL, routing = NULL, degraded = 0, error = NULL, "
+                    f"created_at = ? WHERE task_key IN ({marks}) "
+                    f"AND (status = 'failed' OR (status = 'done' AND degraded = 1))",
+                    (now, *batch)
+                )
+
+                done.update({
+                    row["task_key"]: json.loads(row["result"])
+                    for row in conn.execute(
+                        f"SELECT task_key, result FROM chunk_tasks "
+                        f"WHERE task_key IN ({marks}) AND status = 'done'",
+                        batch
+                    )
+                })
+
+            conn.execute("COMMIT")
+
+        return done
+
+    def finished(self, keys: Iterable[str]) -> List[Dict]:
+        """
+        Done / failed tasks among `keys`.
+        """
+
+        rows = []
+
+        with self._connection() as conn:
+            for batch in _batches(list(keys)):
+                rows.extend(
+                    dict(row) for row in conn.execute(
+                        f"SELECT task_key, status, result, routing, degraded, error, attempts "
+                        f"FROM chunk_tasks WHERE task_key IN ({','.join('?' * len(batch))}) "
+                        f"AND status IN ('done', 'failed')",
+                        batch
+                    )
+                )
+
+        for row in rows:
+            row["result"] = json.loads(row["result"]) if row["result"] else None
+            row["routing"] = json.loads(row["routing"]) if row["routing"] else None
+
+        return rows
+
+    def cancel(self, keys: Iterable[str]) -> int:
+        """
+        Drops tasks that no worker has taken yet.
+        """
+
+        cancelled = 0
+
+        with self._connection() as conn:
+            for batch in _batches(list(keys)):
+                cancelled += conn.execute(
+                    f"DELETE FROM chunk_tasks WHERE task_key IN ({','.join('?' * len(batch))}) "
+                    f"AND status = 'queued' AND attempts = 0",
+                    batch
+                ).rowcount
+
+        return cancelled
+
+    def live_workers(self) -> int:
+
+        cutoff = time.time() - settings.CHUNK_WORKER_HEARTBEAT_SEC * 3
+
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM chunk_workers WHERE last_seen > ?",
+                (cutoff,)
+            ).fetchone()[0]
+
+    # WORKER SIDE
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Leases the oldest available task (queued, or leased to a worker
+        that let the lease run out) and returns its payload. Tasks out of
+        attempts are marked failed instead.
+        """
+
+        conn = self._connect()
+
+        try:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+
+                row = conn.execute(
+                    "SELECT task_key, payload, attempts FROM chunk_tasks "
+                    "WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= settings.CHUNK_MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE chunk_tasks SET status = 'failed', finished_at = ?, "
+                        "error = COALESCE(error, 'lease expired') WHERE task_key = ?",
+                        (now, row["task_key"])
+                    )
+                    conn.execute("COMMIT")
+                    continue
+
+                conn.execute(
+                    "UPDATE chunk_tasks SET status = 'leased', worker = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE task_key = ?",
+                    (worker, now + settings.CHUNK_LEASE_SEC, row["task_key"])
+                )
+                conn.execute("COMMIT")
+
+                return json.loads(row["payload"])
+
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        finally:
+            conn.close()
+
+    def complete(self, task_key: str, worker: str, result: Dict, routing: Dict = None, degraded: bool = False):
+
+        # A redelivered task may finish twice; the first result stands
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE chunk_tasks SET status = 'done', result = ?, routing = ?, degraded = ?, "
+                "worker = ?, lease_until = NULL, finished_at = ? "
+                "WHERE task_key = ? AND status != 'done'",
+                (json.dumps(result), json.dumps(routing), int(degraded), worker, time.time(), task_key)
+            )
+
+    def release(self, task_key: str, error: str):
+        """
+        Gives a task back after a worker-side error; it fails for good
+        once it is out of attempts.
+        """
+
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE chunk_tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = ?, worker = NULL, lease_until = NULL, finished_at = ? "
+                "WHERE task_key = ? AND status = 'leased'",
+                (settings.CHUNK_MAX_ATTEMPTS, error[:2000], time.time(), task_key)
+            )
+
+    def heartbeat(self, worker: str, leased: List[str], processed: int = 0):
+        """
+        Marks the worker alive and extends the leases of its tasks.
+        """
+
+        now = time.time()
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO chunk_workers (worker, last_seen, processed) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET last_seen = excluded.last_seen, "
+                "processed = chunk_workers.processed + excluded.processed",
+                (worker, now, processed)
+            )
+
+            for batch in _batches(leased):
+                conn.execute(
+                    f"UPDATE chunk_tasks SET lease_until = ? WHERE worker = ? AND status = 'leased' "
+                    f"AND task_key IN ({','.join('?' * len(batch))})",
+                    (now + settings.CHUNK_LEASE_SEC, worker, *batch)
+                )
+
+    def unregister(self, worker: str):
+
+        with self._connection() as conn:
+            conn.execute("DELETE FROM chunk_workers WHERE worker = ?", (worker,))
+
+    # HOUSEKEEPING
+
+    def purge_expired(self) -> int:
+
+        now = time.time()
+
+        with self._connection() as conn:
+            tasks = conn.execute(
+                "DELETE FROM chunk_tasks WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - settings.CHUNK_RESULT_TTL_SEC,)
+            ).rowcount
+            conn.execute("DELETE FROM chunk_workers WHERE last_seen < ?", (now - 3600,))
+
+        return tasks
+
+    def stats(self) -> Dict:
+
+        with self._connection() as conn:
+            counts = {
+                row["status"]: row["n"]
+                for row in conn.execute("SELECT status, COUNT(*) AS n FROM chunk_tasks GROUP BY status")
+            }
+
+            redelivered = conn.execute(
+                "SELECT COUNT(*) FROM chunk_tasks WHERE attempts > 1"
+            ).fetchone()[0]
+
+        return {
+            "queued": counts.get("queued", 0),
+            "leased": counts.get("leased", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "redelivered": redelivered,
+            "live_workers": self.live_workers()
+        }
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_chunk_broker() -> ChunkBroker:
+
+    global _broker
+
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = ChunkBroker()
+
+    return _broker
@@ -0,0 +1,171 @@
+import re
+from typing import Dict, List
+
+CITATION_PATTERN = re.compile(r"\[\d+\]")
+DIGIT_PATTERN = re.compile(r"\d")
+TERM_PATTERN = re.compile(r"[a-z]+")
+
+# Lines with fewer words than this count as short (headings, captions, refs)
+SHORT_LINE_WORDS = 5
+
+# Lines with at least this many words count as table-like rows
+STRUCTURED_LINE_WORDS = 3
+
+# FEATURES
+
+class ChunkFeatures:
+    """
+    Everything the chunk heuristics need, computed once per chunk while
+    chunking. `lowered` is the lowercased text and `terms` its alphabetic
+    words, in order; `term_set` is the same words for membership tests.
+    """
+
+    __slots__ = (
+        "token_count",
+        "word_count",
+        "line_count",
+        "short_lines",
+        "structured_lines",
+        "numeric_lines",
+        "citation_count",
+        "lowered",
+        "terms",
+        "term_set"
+    )
+
+    def __init__(
+        self,
+        token_count: int,
+        word_count: int,
+        line_count: int,
+        short_lines: int,
+        structured_lines: int,
+        numeric_lines: int,
+        citation_count: int,
+        lowered: str,
+        terms: tuple
+    ):
+        self.token_count = token_count
+        self.word_count = word_count
+        self.line_count = line_count
+        self.short_lines = short_lines
+        self.structured_lines = structured_lines
+        self.numeric_lines = numeric_lines
+        self.citation_count = citation_count
+        self.lowered = lowered
+        self.terms = terms
+        self.term_set = frozenset(terms)
+
+    @property
+    def numeric_density(self) -> float:
+        return self.numeric_lines / self.line_count if self.line_count else 0.0
+
+    @property
+    def short_line_ratio(self) -> float:
+        return self.short_lines / self.line_count if self.line_count else 0.0
+
+    @property
+    def is_table(self) -> bool:
+        """
+        Mostly multi-column rows with at least two lines containing numbers.
+        """
+
+        if self.line_count < 3:
+            return False
+
+        return (
+            self.structured_lines >= self.line_count * 0.6
+            and self.numeric_lines >= 2
+        )
+
+    def summary(self) -> Dict:
+
+        return {
+            "tokens": self.token_count,
+            "words": self.word_count,
+            "lines": self.line_count,
+            "numeric_density": round(self.numeric_density, 3),
+            "citations": self.citation_count,
+            "table": self.is_table
+        }
+
+# EXTRACTION
+
+def extract_features(text: str, token_count: int = None) -> ChunkFeatures:
+    """
+    One pass over the lines of `text`. `token_count` is the chunker's
+    tiktoken count, when it has one.
+    """
+
+    text = text or ""
+    lines = text.splitlines()
+
+    words = short = structured = numeric = 0
+
+    for line in lines:
+        n = len(line.split())
+        words += n
+
+        if n < SHORT_LINE_WORDS:
+            short += 1
+
+        if n >= STRUCTURED_LINE_WORDS:
+            structured += 1
+
+        if DIGIT_PATTERN.search(line):
+            numeric += 1
+
+    lowered = text.lower()
+
+    return ChunkFeatures(
+        token_count=token_count if token_count is not None else 0,
+        word_count=words,
+        line_count=len(lines),
+        short_lines=short,
+        structured_lines=structured,
+        numeric_lines=numeric,
+        citation_count=len(CITATION_PATTERN.findall(text)),
+        lowered=lowered,
+        terms=tuple(TERM_PATTERN.findall(lowered))
+    )
+
+
+def join_features(parts: List[ChunkFeatures]) -> ChunkFeatures:
+    """
+    Features of paragraphs joined with "\\n\\n", from the paragraphs' own
+    features: each join adds one empty (short) line and nothing else, so
+    the result matches extract_features on the joined text.
+    """
+
+    joins = max(0, len(parts) - 1)
+
+    return ChunkFeatures(
+        token_count=sum(p.token_count for p in parts),
+        word_count=sum(p.word_count for p in parts),
+        line_count=sum(p.line_count for p in parts) + joins,
+        short_lines=sum(p.short_lines for p in parts) + joins,
+        structured_lines=sum(p.structured_lines for p in parts),
+        numeric_lines=sum(p.numeric_lines for p in parts),
+        citation_count=sum(p.citation_count for p in parts),
+        lowered="\n\n".join(p.lowered for p in parts),
+        terms=tuple(t for p in parts for t in p.terms)
+    )
+
+
+def summary_features(chunk: Dict) -> ChunkFeatures:
+    """
+    Features of a chunk summary (summary + key points + risks), as read by
+    is_strong_chunk.
+    """
+
+    summary = chunk.get("summary", "").strip()
+    key_points = chunk.get("key_points", [])
+    risks = chunk.get("key_risks_action_items", [])
+
+    combined_text = " ".join(
+        [summary] +
+        [kp for kp in key_points if isinstance(kp, str)] +
+        [r for r in risks if isinstance(r, str)]
+    ).strip()
+
+    return extract_features(combined_text)
@@ -0,0 +1,127 @@
+import os
+import time
+import socket
+import multiprocessing
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import settings
+from logger import logger, log_context
+from services.chunk_broker import ChunkBroker
+from services.model_router import track_routing
+from services.summarizer import _process_single_chunk
+
+# TASKS
+
+def process_task(task: Dict):
+    """
+    Summarizes one brokered chunk exactly as summarize_chunks would in
+    process. Returns (result, routing summary, degraded).
+    """
+
+    with log_context(chunk_task=task["task_key"][:12]), track_routing(task["mode"], task["backend"]) as routing:
+        result = _process_single_chunk(
+            task["chunk_id"],
+            task["chunk"],
+            task["total_chunks"],
+            task["mode"]
+        )
+
+    return result, routing.summary(), routing.degraded
+
+# WORKER LOOP
+
+def chunk_worker_loop(stop_event, db_path: str = None, threads: int = None):
+
+    broker = ChunkBroker(db_path)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    threads = threads or settings.CHUNK_WORKER_THREADS
+
+    in_flight = {}
+    processed = 0
+    last_heartbeat = 0.0
+    last_housekeeping = time.time()
+
+    logger.info(f"Chunk worker {worker} started ({threads} threads)")
+
+    def finish(future):
+
+        nonlocal processed
+        key = in_flight.pop(future)
+
+        try:
+            result, routing, degraded = future.result()
+            broker.complete(key, worker, result, routing, degraded)
+            processed += 1
+
+        except Exception as e:
+            logger.warning(f"Chunk task {key[:12]} failed on {worker}: {str(e)}")
+            broker.release(key, str(e))
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="chunk-worker") as pool:
+
+        while not stop_event.is_set():
+
+            # Heartbeat also renews the leases of the tasks in hand
+            if time.time() - last_heartbeat > settings.CHUNK_WORKER_HEARTBEAT_SEC:
+                broker.heartbeat(worker, list(in_flight.values()), processed)
+                processed = 0
+                last_heartbeat = time.time()
+
+            if time.time() - last_housekeeping > 60:
+                broker.purge_expired()
+                last_housekeeping = time.time()
+
+            for future in [f for f in in_flight if f.done()]:
+                finish(future)
+
+            while len(in_flight) < threads:
+                task = broker.claim(worker)
+
+                if task is None:
+                    break
+
+                in_flight[pool.submit(process_task, task)] = task["task_key"]
+
+            if in_flight:
+                wait(list(in_flight), timeout=settings.CHUNK_BROKER_POLL_SEC, return_when=FIRST_COMPLETED)
+            else:
+                stop_event.wait(settings.CHUNK_BROKER_POLL_SEC)
+
+        # Hand in what is already running rather than waiting for the lease to expire
+        wait(list(in_flight))
+
+        for future in list(in_flight):
+            finish(future)
+
+    broker.unregister(worker)
+    logger.info(f"Chunk worker {worker} stopped")
+
+# PROCESS MANAGEMENT
+
+def start_chunk_workers(count: int = None, db_path: str = None, threads: int = None):
+    """
+    Spawns `count` chunk worker processes. Returns (processes, stop_event).
+    """
+
+    count = settings.CHUNK_WORKERS if count is None else count
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+
+    processes: List = []
+
+    for i in range(count):
+        process = context.Process(
+            target=chunk_worker_loop,
+            args=(stop_event, db_path, threads),
+            name=f"chunk-worker-{i}",
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    return processes, stop_event
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m services.chunk_worker
+    chunk_worker_loop(multiprocessing.Event())
@@ -1,22 +1,47 @@
 from typing import List
+from functools import lru_cache
 import tiktoken # type: ignore
+from services.chunk_features import ChunkFeatures, extract_features, join_features
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
 
 
 def chunk_text(
     text: str,
     max_tokens: int = 700,
-    overlap_paragraphs: int = 1
+    overlap_paragraphs: int = 1,
+    features: List[ChunkFeatures] = None
 ) -> List[str]:
+    """
+    When `features` is a list, it is filled with one ChunkFeatures per
+    returned chunk. Each paragraph is scanned once, even when it is carried
+    into the next chunk as overlap.
+    """
 
-    encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = get_encoding()
 
     # Better paragraph detection
     paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
 
     chunks = []
     current_chunk = []
+    current_counts = []
+    current_features = []
     current_tokens = 0
 
+    def flush():
+        chunks.append("\n\n".join(current_chunk))
+
+        if features is not None:
+            features.append(join_features(current_features))
+
     for para in paragraphs:
 
         para_tokens = len(encoding.encode(para))
@@ -24,30 +49,37 @@ def chunk_text(
         # If single paragraph too large → split safely
         if para_tokens > max_tokens:
             if current_chunk:
-                chunks.append("\n\n".join(current_chunk))
-                current_chunk = []
+                flush()
+                current_chunk, current_counts, current_features = [], [], []
                 current_tokens = 0
 
             para_encoded = encoding.encode(para)
             for i in range(0, len(para_encoded), max_tokens):
                 chunk_tokens = para_encoded[i:i+max_tokens]
-                chunks.append(encoding.decode(chunk_tokens))
+                piece = encoding.decode(chunk_tokens)
+                chunks.append(piece)
+
+                if features is not None:
+                    features.append(extract_features(piece, len(chunk_tokens)))
             continue
 
         if current_tokens + para_tokens > max_tokens and current_chunk:
-            chunks.append("\n\n".join(current_chunk))
+            flush()
 
             # PARAGRAPH OVERLAP
-            overlap = current_chunk[-overlap_paragraphs:]
-            current_chunk = overlap.copy()
-            current_tokens = sum(
-                len(encoding.encode(p)) for p in current_chunk
-            )
+            current_chunk = current_chunk[-overlap_paragraphs:]
+            current_counts = current_counts[-overlap_paragraphs:]
+            current_features = current_features[-overlap_paragraphs:]
+            current_tokens = sum(current_counts)
 
         current_chunk.append(para)
+        current_counts.append(para_tokens)
         current_tokens += para_tokens
 
+        if features is not None:
+            current_features.append(extract_features(para, para_tokens))
+
     if current_chunk:
-        chunks.append("\n\n".join(current_chunk))
+        flush()
 
     return chunks
@@ -0,0 +1,93 @@
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from services.fair_executor import FairExecutor
+
+# Executor that model/embedding calls of the current request should use
+_current_executor = contextvars.ContextVar("current_executor", default=None)
+
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+
+# PROCESS-WIDE EXECUTOR
+
+def get_shared_executor() -> FairExecutor:
+    """
+    The process-wide pool every Bedrock call goes through, so concurrent
+    requests share one global concurrency cap instead of each opening
+    their own pools.
+    """
+
+    global _shared_executor
+
+    if _shared_executor is None:
+        with _shared_lock:
+            if _shared_executor is None:
+                _shared_executor = FairExecutor(
+                    settings.LLM_MAX_CONCURRENCY,
+                    name="bedrock"
+                )
+
+    return _shared_executor
+
+
+def shutdown_shared_executor():
+
+    global _shared_executor
+
+    with _shared_lock:
+        executor, _shared_executor = _shared_executor, None
+
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+# REQUEST SCOPE
+
+@contextmanager
+def use_executor(executor):
+    """
+    Routes every stage pool opened inside this context (including stage
+    threads spawned with a copied context) to `executor`.
+    """
+
+    token = _current_executor.set(executor)
+
+    try:
+        yield executor
+    finally:
+        _current_executor.reset(token)
+
+
+def current_executor(priority: str = None):
+    """
+    The request's executor, re-tagged with `priority` when it is a lane of
+    the shared pool.
+    """
+
+    executor = _current_executor.get()
+
+    if executor is not None and priority and hasattr(executor, "with_priority"):
+        return executor.with_priority(priority)
+
+    return executor
+
+
+@contextmanager
+def stage_executor(max_workers: int, priority: str = "normal"):
+    """
+    Yields the request's shared executor when one is in scope, otherwise a
+    private ThreadPoolExecutor that is torn down on exit.
+    """
+
+    executor = current_executor(priority)
+
+    if executor is not None:
+        yield executor
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield executor
@@ -0,0 +1,119 @@
+from typing import Dict, List
+import threading
+import numpy as np # type: ignore
+from config import settings
+from logger import logger
+from services.concurrency import stage_executor
+
+# BACKEND INTERFACE
+
+class EmbeddingBackend:
+    """
+    Turns text into dense vectors. Implementations only need `embed_batch`;
+    `embed` is a convenience for single texts.
+    """
+
+    name = "base"
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_batch([text])[0].tolist()
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+# BEDROCK TITAN
+
+class TitanEmbeddingBackend(EmbeddingBackend):
+
+    name = "bedrock"
+
+    def embed(self, text: str) -> List[float]:
+        from services.bedrock_service import invoke_titan_embedding
+        return invoke_titan_embedding(text)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+
+        # Titan takes one text per request, so fan the batch out. Single
+        # texts go through the executor too, to stay under the global cap.
+        if not texts:
+            return np.array([], dtype=np.float32)
+
+        with stage_executor(min(settings.MAX_WORKERS, len(texts))) as executor:
+            return np.array(list(executor.map(self.embed, texts)), dtype=np.float32)
+
+# LOCAL CPU BACKEND
+
+class LocalHashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Offline embeddings for rough topical similarity: signed feature hashing
+    of unigrams and bigrams with sublinear term frequency, projected to a
+    fixed low dimension by a seeded sparse random projection.
+
+    Nothing is fitted on the input, so vectors from separate calls are
+    directly comparable (a per-batch TF-IDF/SVD fit would not be).
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = None, n_features: int = 2 ** 18):
+
+        from sklearn.feature_extraction.text import HashingVectorizer # type: ignore
+        from sklearn.random_projection import SparseRandomProjection # type: ignore
+        from scipy.sparse import csr_matrix # type: ignore
+
+        self.dim = dim or settings.EMBED_LOCAL_DIM
+
+        self._vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            stop_words="english",
+            alternate_sign=True,
+            norm=None,
+            dtype=np.float32
+        )
+
+        # Projection matrix depends only on the shape and seed
+        self._projection = SparseRandomProjection(
+            n_components=self.dim,
+            dense_output=True,
+            random_state=0
+        ).fit(csr_matrix((1, n_features), dtype=np.float32))
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+
+        counts = self._vectorizer.transform(texts)
+        counts.data = np.sign(counts.data) * (1.0 + np.log(np.abs(counts.data)))
+
+        vectors = self._projection.transform(counts).astype(np.float32)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-10)
+
+# REGISTRY
+
+EMBEDDING_BACKENDS: Dict[str, type] = {
+    "bedrock": TitanEmbeddingBackend,
+    "local": LocalHashingEmbeddingBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = settings.EMBED_BACKEND.lower()
+
+                if name not in EMBEDDING_BACKENDS:
+                    logger.warning(f"Unknown embedding backend '{name}'. Using bedrock.")
+                    name = "bedrock"
+
+                _backend = EMBEDDING_BACKENDS[name]()
+                logger.info(f"Embedding backend: {name}")
+
+    return _backend
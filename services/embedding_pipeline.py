@@ -0,0 +1,100 @@
+import time
+import threading
+from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from logger import logger
+from services.bedrock_service import get_embedding
+from services.concurrency import current_executor
+from services.semantic_section_builder import (
+    is_strong_chunk,
+    build_chunk_embedding_text
+)
+
+
+# PIPELINED CHUNK EMBEDDER
+
+class EmbeddingPipeline:
+    """
+    Embeds strong chunk summaries while the chunk stage is still running.
+
+    `submit` is meant to be passed as the `on_result` hook of
+    `summarize_chunks`; `collect` waits for the outstanding embeddings and
+    returns them keyed by chunk_id, ready for `build_semantic_sections`.
+    """
+
+    def __init__(self, mode: str = "academic", max_workers: int = None):
+
+        self.mode = mode
+
+        # Share the request's executor when one is in scope
+        self._executor = current_executor(priority="bulk")
+        self._owns_executor = self._executor is None
+
+        if self._owns_executor:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers or settings.MAX_WORKERS
+            )
+
+        self._futures = {}
+        self._timings = []
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def submit(self, chunk: Dict):
+
+        if not is_strong_chunk(chunk, mode=self.mode):
+            return
+
+        self._futures[chunk["chunk_id"]] = self._executor.submit(
+            self._embed,
+            chunk
+        )
+
+    def _embed(self, chunk: Dict):
+
+        start = time.perf_counter()
+
+        try:
+            return get_embedding(build_chunk_embedding_text(chunk))
+        finally:
+            with self._lock:
+                self._timings.append((start, time.perf_counter()))
+
+    def collect(self) -> Dict:
+
+        summaries_done = time.perf_counter()
+        embeddings = {}
+
+        for chunk_id, future in self._futures.items():
+            try:
+                embeddings[chunk_id] = future.result()
+            except Exception as e:
+                # Left out so build_chunk_embeddings retries it inline
+                logger.warning(f"Pipelined embedding for chunk {chunk_id} failed: {str(e)}")
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+        wait_time = time.perf_counter() - summaries_done
+        total_time = sum(end - start for start, end in self._timings)
+        hidden_time = sum(
+            max(0.0, min(end, summaries_done) - start)
+            for start, end in self._timings
+        )
+
+        self.stats = {
+            "embedded_chunks": len(embeddings),
+            "embedding_time_sec": round(total_time, 2),
+            "hidden_embedding_time_sec": round(hidden_time, 2),
+            "hidden_ratio": round(hidden_time / total_time, 3) if total_time else 0.0,
+            "wait_after_summaries_sec": round(wait_time, 2)
+        }
+
+        logger.info(
+            f"Pipelined embeddings: {len(embeddings)} chunks, "
+            f"{self.stats['hidden_embedding_time_sec']}s of "
+            f"{self.stats['embedding_time_sec']}s hidden behind summarization"
+        )
+
+        return embeddings
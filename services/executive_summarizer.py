@@ -1,18 +1,24 @@
+import re
 from typing import List, Dict
 from config import settings
 from logger import logger
 from prompts.executive import (
     build_formatted_input,
+    format_executive_section,
     build_research_executive_prompt,
     build_academic_executive_prompt
 )
-from services.bedrock_service import invoke_llm
+from services.model_router import invoke_routed
+from services.chunking import count_tokens
+
+PACK_LEVELS = ("full", "key_points", "one_line", "dropped")
 
 # PUBLIC ENTRY=
 
 def generate_executive_summary(
     section_summaries: List[Dict],
-    mode: str = "research" 
+    mode: str = "research",
+    stats: Dict = None
 ) -> Dict:
 
     cleaned = clean_sections(section_summaries)
@@ -22,11 +28,12 @@ def generate_executive_summary(
 
     ranked = rank_sections_by_importance(cleaned)
     prioritized = prioritize_sections(ranked)
+    packed, omitted = pack_sections(prioritized, stats=stats, mode=mode)
 
     if mode == "academic":
-        return generate_academic_executive(prioritized)
+        return generate_academic_executive(packed, omitted_count=omitted)
 
-    return generate_research_executive(prioritized)
+    return generate_research_executive(packed, omitted_count=omitted)
 
 # CLEAN SECTIONS
 
@@ -93,31 +100,140 @@ def prioritize_sections(ranked_sections):
 
     return top_sections + compressed
 
+# TOKEN-BUDGETED PACKING
+
+def degrade_section(section: Dict, level: str):
+
+    if level == "full":
+        return section
+
+    if level == "key_points":
+        return {
+            "section_id": section["section_id"],
+            "section_key_points": section.get("section_key_points", [])[:3],
+            "section_risks_action_items": section.get("section_risks_action_items", [])[:2]
+        }
+
+    if level == "one_line":
+        summary = section.get("section_summary", "").strip()
+        first_sentence = re.split(r"(?<=[.!?])\s+", summary, maxsplit=1)[0]
+
+        return {
+            "section_id": section["section_id"],
+            "section_summary": " ".join(first_sentence.split()[:40])
+        }
+
+    return None
+
+
+def prompt_overhead(mode: str) -> int:
+
+    # Instructions and JSON template around the section input
+    builder = build_academic_executive_prompt if mode == "academic" else build_research_executive_prompt
+    return count_tokens(builder(""))
+
+
+def pack_sections(
+    prioritized_sections: List[Dict],
+    token_budget: int = None,
+    stats: Dict = None,
+    mode: str = "research"
+):
+    """
+    Fits the executive prompt for `mode` (instructions, prioritized
+    sections and the omitted-sections note) into the token budget.
+
+    Sections start at full fidelity. While the prompt is over budget, the
+    lowest-ranked section is degraded a step at a time (full -> key points
+    -> one-line summary -> dropped) before the one above it loses any
+    detail, so the most important sections keep theirs longest. The top
+    section is never dropped.
+
+    Returns (packed_sections, omitted_count).
+    """
+
+    budget = token_budget or settings.EXEC_INPUT_TOKEN_BUDGET
+    levels = [0] * len(prioritized_sections)
+
+    costs = [
+        [
+            count_tokens(format_executive_section(rendered))
+            if rendered is not None else 0
+            for rendered in (degrade_section(s, level) for level in PACK_LEVELS)
+        ]
+        for s in prioritized_sections
+    ]
+
+    overhead = prompt_overhead(mode)
+    note = count_tokens(build_formatted_input([], len(prioritized_sections)))
+    dropped = PACK_LEVELS.index("dropped")
+
+    def used():
+        omitted = levels.count(dropped)
+        return overhead + (note if omitted else 0) + sum(c[l] for c, l in zip(costs, levels))
+
+    for i in reversed(range(len(prioritized_sections))):
+        floor = dropped if i > 0 else PACK_LEVELS.index("one_line")
+
+        while used() > budget and levels[i] < floor:
+            levels[i] += 1
+
+        if used() <= budget:
+            break
+
+    packed = [
+        degrade_section(s, PACK_LEVELS[l])
+        for s, l in zip(prioritized_sections, levels)
+        if l != dropped
+    ]
+    omitted = levels.count(dropped)
+
+    usage = {
+        "budget_tokens": budget,
+        "used_tokens": used(),
+        "prompt_overhead_tokens": overhead,
+        "sections": {
+            level: sum(1 for l in levels if PACK_LEVELS[l] == level)
+            for level in PACK_LEVELS
+        }
+    }
+
+    if omitted or usage["sections"]["key_points"] or usage["sections"]["one_line"]:
+        logger.info(f"Executive input packed to budget: {usage}")
+
+    if usage["used_tokens"] > budget:
+        logger.warning(f"Executive prompt still over budget after packing: {usage}")
+
+    if stats is not None:
+        stats.update(usage)
+
+    return packed, omitted
+
 # RESEARCH EXECUTIVE GENERATOR
 
-def generate_research_executive(section_summaries: List[Dict]) -> Dict:
-    formatted_input = build_formatted_input(section_summaries)
+def generate_research_executive(section_summaries: List[Dict], omitted_count: int = 0) -> Dict:
+    formatted_input = build_formatted_input(section_summaries, omitted_count)
     prompt = build_research_executive_prompt(formatted_input)
-    return call_model(prompt)
+    return call_model(prompt, section_summaries)
 
     
 # ACADEMIC EXECUTIVE GENERATOR
 
-def generate_academic_executive(section_summaries: List[Dict]) -> Dict:
+def generate_academic_executive(section_summaries: List[Dict], omitted_count: int = 0) -> Dict:
 
-    formatted_input = build_formatted_input(section_summaries)
+    formatted_input = build_formatted_input(section_summaries, omitted_count)
     prompt = build_academic_executive_prompt(formatted_input)
-    return call_model(prompt)
+    return call_model(prompt, section_summaries)
 
 # MODEL CALL
 
-def call_model(prompt: str) -> Dict:
+def call_model(prompt: str, section_summaries: List[Dict] = None) -> Dict:
+
+    # The sections let a local backend stand in when Bedrock is unavailable
+    source = {"sections": section_summaries} if section_summaries is not None else None
 
     try:
-        parsed = invoke_llm(
-            prompt,
-            max_gen_len=settings.MAX_GEN_LEN_EXEC
-        )
+        parsed = invoke_routed("executive", prompt, source=source)
 
         parsed.setdefault("executive_summary", "")
         parsed.setdefault("executive_key_points", [])
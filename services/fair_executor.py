@@ -0,0 +1,270 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict
+from logger import logger
+from services.profiling import profile_of, run_profiled_task
+
+# Dispatch order: every queued "high" task runs before any "normal" one,
+# and "normal" before "bulk". Fairness between lanes applies per class.
+PRIORITIES = ("high", "normal", "bulk")
+
+# LANE STATE
+
+class _Lane:
+
+    __slots__ = ("name", "weight", "queues", "pass_value", "submitted", "completed", "closed")
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.queues = {p: deque() for p in PRIORITIES}
+        self.pass_value = 0.0
+        self.submitted = 0
+        self.completed = 0
+        self.closed = False
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+# FAIR EXECUTOR
+
+class FairExecutor:
+    """
+    Fixed pool of worker threads shared by many lanes (one per document or
+    request). Work is dispatched by stride scheduling: each dispatch
+    advances the lane's pass by 1 / weight, and the non-empty lane with the
+    lowest pass runs next. A lane with weight 2 gets twice the throughput
+    of a lane with weight 1, and no lane can be starved by another's
+    backlog. Tasks also carry a priority class (see PRIORITIES); higher
+    classes are always dispatched first.
+
+    Submitting from one of the executor's own workers runs the task inline,
+    so nested fan-out can never deadlock the pool.
+    """
+
+    def __init__(self, max_workers: int, name: str = "fair"):
+
+        self.max_workers = max_workers
+        self.name = name
+        self._lanes: Dict[str, _Lane] = {}
+        self._cond = threading.Condition()
+        self._virtual_time = 0.0
+        self._shutdown = False
+        self._local = threading.local()
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+
+        for thread in self._threads:
+            thread.start()
+
+    # SUBMISSION
+
+    def lane(self, name: str, weight: float = 1.0, priority: str = "normal") -> "LaneExecutor":
+        return LaneExecutor(self, name, weight, priority)
+
+    def submit_to(
+        self,
+        lane_name: str,
+        weight: float,
+        priority: str,
+        fn: Callable,
+        *args,
+        **kwargs
+    ) -> Future:
+
+        future = Future()
+        context = contextvars.copy_context()
+
+        if getattr(self._local, "owner", None) is self:
+            self._run(future, context, fn, args, kwargs)
+            return future
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f"{self.name} executor is shut down")
+
+            lane = self._lanes.get(lane_name)
+
+            if lane is None:
+                lane = self._lanes[lane_name] = _Lane(lane_name, weight)
+
+            # An idle lane rejoins at the current virtual time, so it can't
+            # bank credit while it had nothing queued
+            if not lane.queued():
+                lane.pass_value = max(lane.pass_value, self._virtual_time)
+
+            if priority not in lane.queues:
+                priority = "normal"
+
+            lane.weight = weight
+            lane.queues[priority].append((future, context, fn, args, kwargs, time.perf_counter()))
+            lane.submitted += 1
+            self._cond.notify()
+
+        return future
+
+    def close_lane(self, lane_name: str):
+        """
+        Forgets the lane now, or, if it still has queued work (a run that
+        failed mid-stage), once its last queued task is dispatched.
+        """
+
+        with self._cond:
+            lane = self._lanes.get(lane_name)
+
+            if lane is None:
+                return
+
+            if lane.queued():
+                lane.closed = True
+            else:
+                del self._lanes[lane_name]
+
+    # DISPATCH
+
+    def _next_item(self):
+
+        for priority in PRIORITIES:
+
+            active = [lane for lane in self._lanes.values() if lane.queues[priority]]
+
+            if not active:
+                continue
+
+            lane = min(active, key=lambda l: l.pass_value)
+            self._virtual_time = lane.pass_value
+            lane.pass_value += 1.0 / max(lane.weight, 1e-6)
+            item = lane.queues[priority].popleft()
+
+            if lane.closed and not lane.queued():
+                del self._lanes[lane.name]
+
+            return lane, item
+
+        return None
+
+    def _worker(self):
+
+        self._local.owner = self
+
+        while True:
+            with self._cond:
+                item = self._next_item()
+
+                while item is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    item = self._next_item()
+
+            lane, (future, context, fn, args, kwargs, enqueued_at) = item
+            self._run(future, context, fn, args, kwargs, time.perf_counter() - enqueued_at)
+
+            with self._cond:
+                lane.completed += 1
+
+    @staticmethod
+    def _run(future: Future, context, fn, args, kwargs, queue_wait: float = 0.0):
+
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            # Profiled requests also record queue wait / run time per task
+            if profile_of(context) is not None:
+                result = context.run(run_profiled_task, fn, queue_wait, *args, **kwargs)
+            else:
+                result = context.run(fn, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    # LIFECYCLE
+
+    def stats(self) -> Dict:
+
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "queued": {
+                    p: sum(len(l.queues[p]) for l in self._lanes.values())
+                    for p in PRIORITIES
+                },
+                "lanes": {
+                    l.name: {
+                        "weight": l.weight,
+                        "queued": l.queued(),
+                        "submitted": l.submitted,
+                        "completed": l.completed
+                    }
+                    for l in self._lanes.values()
+                }
+            }
+
+    def shutdown(self, wait: bool = True):
+
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+        logger.info(f"{self.name} executor shut down")
+
+
+class LaneExecutor:
+    """
+    ThreadPoolExecutor-shaped view of one lane, so stage code can submit
+    work without knowing about lanes. Shutting it down does not stop the
+    shared pool.
+    """
+
+    def __init__(
+        self,
+        executor: FairExecutor,
+        name: str,
+        weight: float = 1.0,
+        priority: str = "normal"
+    ):
+        self.executor = executor
+        self.name = name
+        self.weight = weight
+        self.priority = priority
+
+    def with_priority(self, priority: str) -> "LaneExecutor":
+        return LaneExecutor(self.executor, self.name, self.weight, priority)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.executor.submit_to(
+            self.name,
+            self.weight,
+            self.priority,
+            fn,
+            *args,
+            **kwargs
+        )
+
+    def close(self):
+        self.executor.close_lane(self.name)
+
+    def map(self, fn: Callable, *iterables):
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return (f.result() for f in futures)
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -1,10 +1,12 @@
 from fastapi import UploadFile, HTTPException  # type: ignore
 from typing import Dict
+import io
 import os
 import tempfile
-import shutil
 import re
 import fitz  # type: ignore 
+from config import settings
+from logger import logger
 
 ALLOWED_EXTENSIONS = {'txt', 'pdf'}
 
@@ -32,15 +34,14 @@ def clean_text(text: str) -> str:
 
     return text.strip()
 
-# INGESTION FUNCTION
+# UPLOAD VALIDATION
 
-def ingest_document(file: UploadFile) -> Dict[str, str]:
+def validate_upload_name(filename: str) -> str:
 
-    # Validate uploaded file
-    if not file or not file.filename:
+    if not filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
 
-    filename = file.filename.strip()
+    filename = filename.strip()
 
     if filename == "":
         raise HTTPException(status_code=400, detail="Filename cannot be empty")
@@ -59,18 +60,73 @@ def ingest_document(file: UploadFile) -> Dict[str, str]:
             detail=f"Unsupported file type: {extension}. Allowed types are: {', '.join(ALLOWED_EXTENSIONS)}"
         )
 
+    return extension
+
+# UPLOAD COPY
+
+COPY_BLOCK_BYTES = 1024 * 1024
+
+
+def copy_upload(source, destination, max_bytes: int = None) -> int:
+    """
+    Copies an upload stream block by block, failing with 413 as soon as it
+    passes `max_bytes` instead of after the whole file is written.
+    """
+
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    copied = 0
+
+    while True:
+        block = source.read(COPY_BLOCK_BYTES)
+
+        if not block:
+            return copied
+
+        copied += len(block)
+
+        if copied > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {max_bytes / (1024 * 1024):.1f} MB upload limit"
+            )
+
+        destination.write(block)
+
+
+def read_upload(file: UploadFile) -> bytes:
+
+    buffer = io.BytesIO()
+    file.file.seek(0)
+    copy_upload(file.file, buffer)
+
+    return buffer.getvalue()
+
+# INGESTION FUNCTION
+
+def ingest_document(file: UploadFile) -> Dict[str, str]:
+
+    # Validate uploaded file
+    if not file or not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    filename = file.filename.strip()
+    extension = validate_upload_name(filename)
+
     # Save temporarily
+    temp_path = None
+
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=f".{extension}") as temp_file:
-            file.file.seek(0)
-            shutil.copyfileobj(file.file, temp_file)
             temp_path = temp_file.name
+            file.file.seek(0)
+            copy_upload(file.file, temp_file)
+    except HTTPException:
+        os.remove(temp_path)
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Error saving the uploaded file")
 
-    print("temp_path:", temp_path)
-    print("File exists:", os.path.exists(temp_path))
-    print("File size:", os.path.getsize(temp_path))
+    logger.debug(f"Saved upload {filename} to {temp_path} ({os.path.getsize(temp_path)} bytes)")
 
     # Extract text
     raw_text = extract_text(temp_path, extension)
@@ -83,28 +139,56 @@ def ingest_document(file: UploadFile) -> Dict[str, str]:
         "text": cleaned_text
     }
 
-# TEXT EXTRACTION
+# LOCAL FILES
 
-def extract_text(temp_path: str, extension: str) -> str:
-    try:
-        if extension == "pdf":
-            text_chunks = []
+def ingest_path(path: str) -> Dict[str, str]:
+    """
+    Same as ingest_document for a file already on disk (offline batch).
+    The file is read in place and never removed.
+    """
 
-            with fitz.open(temp_path) as doc:
-                for page in doc:
-                    page_text = page.get_text("text")
-                    if page_text:
-                        text_chunks.append(page_text)
+    filename = os.path.basename(path)
+    extension = validate_upload_name(filename)
 
-            return "\n\n".join(text_chunks).strip()
+    return {
+        "document_name": filename,
+        "text": clean_text(read_text(path, extension))
+    }
 
-        elif extension == "txt":
-            with open(temp_path, "r", encoding="utf-8") as f:
-                return f.read().strip()
+# TEXT EXTRACTION
 
-        else:
-            raise ValueError(f"Unsupported file type: {extension}")
+def extract_text(temp_path: str, extension: str) -> str:
+    try:
+        return read_text(temp_path, extension)
 
     finally:
         if os.path.exists(temp_path):
             os.remove(temp_path)
+
+
+def read_text(path: str, extension: str) -> str:
+
+    if extension == "pdf":
+        text_chunks = []
+
+        with fitz.open(path) as doc:
+
+            if doc.page_count > settings.MAX_PDF_PAGES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"PDF has {doc.page_count} pages; the limit is {settings.MAX_PDF_PAGES}"
+                )
+
+            for page in doc:
+                page_text = page.get_text("text")
+                if page_text:
+                    text_chunks.append(page_text)
+
+        return "\n\n".join(text_chunks).strip()
+
+    elif extension == "txt":
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+
+    else:
+        raise ValueError(f"Unsupported file type: {extension}")
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Optional
+from config import settings
+from services.response_encoder import encode_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    skip TEXT NOT NULL DEFAULT '',
+    payload BLOB,
+    result BLOB,
+    error TEXT,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+STATUS_FIELDS = (
+    "id", "status", "filename", "mode", "error", "worker", "lease_until",
+    "created_at", "started_at", "finished_at", "expires_at"
+)
+
+# Columns added since the first schema, for databases created before them
+MIGRATIONS = {
+    "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL"
+}
+
+# SQLITE JOB QUEUE
+
+class JobQueue:
+    """
+    Durable local job queue shared by the API process and the worker
+    processes. Every operation opens its own connection, so an instance is
+    safe to use from any thread or process.
+    """
+
+    def __init__(self, path: str = None):
+
+        self.path = path or settings.JOB_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self):
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+
+        conn = self._connect()
+
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # PRODUCER SIDE
+
+    def enqueue(self, filename: str, data: bytes, mode: str, skip: str = "") -> str:
+
+        job_id = uuid.uuid4().hex
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, mode, skip, payload, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, mode, skip, data, time.time())
+            )
+
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(STATUS_FIELDS)} FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        now = time.time()
+
+        job["wait_sec"] = round((job["started_at"] or now) - job["created_at"], 2)
+
+        if job["started_at"]:
+            job["run_sec"] = round((job["finished_at"] or now) - job["started_at"], 2)
+
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Dict]:
+
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'done'",
+                (job_id,)
+            ).fetchone()
+
+        if row is None or row["result"] is None:
+            return None
+
+        return json.loads(zlib.decompress(row["result"]))
+
+    # WORKER SIDE
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Atomically moves the oldest queued job to running, leased to
+        `worker` for JOB_LEASE_SEC, and returns it with its payload, or
+        None when the queue is empty.
+        """
+
+        conn = self._connect()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            row = conn.execute(
+                "SELECT id, filename, mode, skip, payload FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, lease_until = ? WHERE id = ?",
+                (worker, now, now + settings.JOB_LEASE_SEC, row["id"])
+            )
+            conn.execute("COMMIT")
+
+            return dict(row)
+
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        finally:
+            conn.close()
+
+    def renew_lease(self, job_id: str, worker: str) -> bool:
+        """
+        Extends the lease of a job `worker` is running. False when the job
+        is no longer leased to it.
+        """
+
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + settings.JOB_LEASE_SEC, job_id, worker)
+            )
+
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result: Dict):
+
+        now = time.time()
+        blob = zlib.compress(encode_json(result), 6)
+
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, payload = NULL, lease_until = NULL, "
+                "finished_at = ?, expires_at = ? WHERE id = ?",
+                (blob, now, now + settings.JOB_RESULT_TTL_SEC, job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+
+        now = time.time()
+
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, payload = NULL, lease_until = NULL, "
+                "finished_at = ?, expires_at = ? WHERE id = ?",
+                (error[:2000], now, now + settings.JOB_RESULT_TTL_SEC, job_id)
+            )
+
+    # HOUSEKEEPING
+
+    def purge_expired(self) -> int:
+
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            )
+
+        return cursor.rowcount
+
+    def requeue_stale(self) -> int:
+        """
+        Returns jobs whose worker died mid-run (lease not renewed) to the
+        queue. Jobs claimed before leases existed expire JOB_LEASE_SEC
+        after they started.
+        """
+
+        now = time.time()
+
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, lease_until = NULL "
+                "WHERE status = 'running' AND COALESCE(lease_until, started_at + ?) < ?",
+                (settings.JOB_LEASE_SEC, now)
+            )
+
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+
+        now = time.time()
+
+        with self._connection() as conn:
+            counts = {
+                row["status"]: row["n"]
+                for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+
+            oldest = conn.execute(
+                "SELECT MIN(created_at) AS t FROM jobs WHERE status = 'queued'"
+            ).fetchone()["t"]
+
+            waits = conn.execute(
+                "SELECT AVG(started_at - created_at) AS avg_wait, "
+                "MAX(started_at - created_at) AS max_wait "
+                "FROM jobs WHERE started_at IS NOT NULL AND started_at > ?",
+                (now - 3600,)
+            ).fetchone()
+
+        return {
+            "queue_depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_wait_sec": round(now - oldest, 2) if oldest else 0.0,
+            "avg_wait_sec_last_hour": round(waits["avg_wait"] or 0.0, 2),
+            "max_wait_sec_last_hour": round(waits["max_wait"] or 0.0, 2)
+        }
@@ -0,0 +1,138 @@
+import io
+import os
+import time
+import socket
+import threading
+import multiprocessing
+from typing import List
+from fastapi import UploadFile  # type: ignore
+from config import settings
+from logger import logger, log_context
+from services.job_queue import JobQueue
+from services.checkpoint_store import get_checkpoint_store
+
+# WORKER LOOP
+
+def keep_lease(queue: JobQueue, job_id: str, worker: str, done: threading.Event):
+
+    # Renews the job's lease until it finishes, however long it runs
+    while not done.wait(settings.JOB_HEARTBEAT_SEC):
+        try:
+            if not queue.renew_lease(job_id, worker):
+                logger.warning(f"Job {job_id} is no longer leased to {worker}")
+                return
+        except Exception as e:
+            logger.warning(f"Could not renew lease of job {job_id}: {str(e)}")
+
+
+def run_job(queue: JobQueue, job: dict, worker: str):
+
+    # Imported here so the API process doesn't pay for it on startup
+    from services.summarization_pipeline import run_summarization_pipeline
+
+    upload = UploadFile(file=io.BytesIO(job["payload"]), filename=job["filename"])
+    skip = [s for s in job["skip"].split(",") if s]
+
+    done = threading.Event()
+    threading.Thread(
+        target=keep_lease,
+        args=(queue, job["id"], worker, done),
+        name=f"job-lease-{job['id'][:8]}",
+        daemon=True
+    ).start()
+
+    try:
+        with log_context(job_id=job["id"]):
+            # A requeued job resumes from its own checkpoints
+            result = run_summarization_pipeline(
+                upload,
+                job["mode"],
+                skip,
+                run_id=job["id"],
+                backend=settings.JOB_LLM_BACKEND or None
+            )
+        queue.complete(job["id"], result)
+        logger.info(f"Job {job['id']} done")
+
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        logger.warning(f"Job {job['id']} failed: {detail}")
+        queue.fail(job["id"], str(detail))
+
+    finally:
+        done.set()
+
+
+def worker_loop(stop_event, db_path: str = None):
+
+    queue = JobQueue(db_path)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    last_requeue = 0.0
+    last_housekeeping = 0.0
+
+    logger.info(f"Job worker {worker} started")
+
+    while not stop_event.is_set():
+
+        # Frequent, so a dead worker's job is picked up soon after its lease ends
+        if time.time() - last_requeue > settings.JOB_HEARTBEAT_SEC:
+            requeued = queue.requeue_stale()
+            if requeued:
+                logger.warning(f"Requeued {requeued} job(s) whose lease expired")
+            last_requeue = time.time()
+
+        if time.time() - last_housekeeping > 60:
+            queue.purge_expired()
+            get_checkpoint_store().purge_expired()
+            last_housekeeping = time.time()
+
+        job = queue.claim(worker)
+
+        if job is None:
+            stop_event.wait(settings.JOB_POLL_INTERVAL_SEC)
+            continue
+
+        run_job(queue, job, worker)
+
+    logger.info(f"Job worker {worker} stopped")
+
+# PROCESS MANAGEMENT
+
+def start_workers(count: int = None, db_path: str = None):
+    """
+    Spawns `count` worker processes. Returns (processes, stop_event).
+    """
+
+    count = settings.JOB_WORKERS if count is None else count
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+
+    processes: List = []
+
+    for i in range(count):
+        process = context.Process(
+            target=worker_loop,
+            args=(stop_event, db_path),
+            name=f"job-worker-{i}",
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    return processes, stop_event
+
+
+def stop_workers(processes, stop_event, timeout: float = 10.0):
+
+    stop_event.set()
+
+    for process in processes:
+        process.join(timeout)
+
+        if process.is_alive():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m services.job_worker
+    worker_loop(multiprocessing.Event())
@@ -0,0 +1,295 @@
+import re
+import threading
+from typing import Dict, List
+import numpy as np # type: ignore
+from logger import logger
+from services.bedrock_service import invoke_llm
+from services.tracing import span
+
+# BACKEND INTERFACE
+
+class LLMBackend:
+    """
+    Produces the parsed JSON of one chunk / section / executive call.
+    `prompt` is the rendered stage prompt; `source` is the same input in
+    structured form, for backends that do not read prompts:
+
+        chunk      {"chunk_id", "text"}
+        section    {"section_id", "chunks": [chunk summaries]}
+        executive  {"sections": [section summaries]}
+    """
+
+    name = "base"
+
+    def generate(self, stage: str, prompt: str, source: Dict = None, **options) -> Dict:
+        raise NotImplementedError
+
+# BEDROCK
+
+class BedrockLLMBackend(LLMBackend):
+
+    name = "bedrock"
+
+    def generate(self, stage: str, prompt: str, source: Dict = None, **options) -> Dict:
+        return invoke_llm(prompt, **options)
+
+# LOCAL EXTRACTIVE BACKEND
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+NUMBER_PATTERN = re.compile(r"\d")
+RISK_CUES = re.compile(
+    r"\b(risk|limitation|limited|challeng|however|fail|concern|issue|cannot|"
+    r"lack|unclear|uncertain|drawback|trade-?off|bias|constraint|future work|must|should)",
+    re.IGNORECASE
+)
+
+NO_QUANTITATIVE_DATA = "No quantitative data present in this chunk"
+
+# Sentences outside this range are dropped / split into windows
+MIN_SENTENCE_WORDS = 4
+MAX_SENTENCE_WORDS = 60
+
+# Ranking: centrality + small bonuses; near-duplicates above REDUNDANCY are skipped
+POSITION_WEIGHT = 0.1
+NUMBER_BONUS = 0.05
+REDUNDANCY = 0.75
+
+# (sentences in summary, max summary words, key points, risks) per stage
+EXTRACTIVE_LIMITS = {
+    "chunk": (3, 90, 4, 3),
+    "section": (4, 120, 5, 4),
+    "executive": (5, 160, 5, 4),
+}
+
+TLDR_MAX_WORDS = 40
+ITEM_MAX_WORDS = 40
+
+
+def split_sentences(text: str) -> List[str]:
+
+    text = re.sub(r"\s+", " ", text or "").strip()
+    sentences = []
+
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+
+        # Unpunctuated text (tables, extraction noise) becomes fixed windows
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            window = words[start:start + MAX_SENTENCE_WORDS]
+
+            if len(window) >= MIN_SENTENCE_WORDS:
+                sentences.append(" ".join(window))
+
+    return sentences
+
+
+def _truncate_words(text: str, max_words: int) -> str:
+
+    words = text.split()
+
+    if len(words) <= max_words:
+        return text
+
+    return " ".join(words[:max_words]).rstrip(",;:") + " ..."
+
+
+def _unique(items: List[str]) -> List[str]:
+
+    seen = set()
+    result = []
+
+    for item in items:
+        if not isinstance(item, str) or not item.strip():
+            continue
+
+        normalized = item.lower().strip()
+
+        if normalized not in seen and normalized != NO_QUANTITATIVE_DATA.lower():
+            seen.add(normalized)
+            result.append(item.strip())
+
+    return result
+
+
+class ExtractiveLLMBackend(LLMBackend):
+    """
+    CPU-only degraded mode: builds schema-valid stage output from the input
+    text itself. Sentences are ranked by TF-IDF similarity to the centroid
+    of the input (with a small lead-position and number bonus, skipping
+    near-duplicates); key points favour sentences with figures, and risks
+    are sentences with limitation / risk cues. Section and executive
+    outputs select from the lower level's summaries, key points and risks.
+
+    Output is verbatim source text, so it is always grounded, never
+    abstractive, and takes milliseconds.
+    """
+
+    name = "extractive"
+
+    def __init__(self):
+
+        from sklearn.feature_extraction.text import TfidfVectorizer # type: ignore
+
+        self._vectorizer_cls = TfidfVectorizer
+
+    def generate(self, stage: str, prompt: str, source: Dict = None, **options) -> Dict:
+
+        if source is None:
+            raise ValueError(f"Extractive backend needs the structured {stage} input")
+
+        with span("extractive.generate", {"llm.stage": stage}):
+
+            if stage == "chunk":
+                parsed = self._chunk(source)
+            elif stage == "section":
+                parsed = self._section(source)
+            elif stage == "executive":
+                parsed = self._executive(source)
+            else:
+                raise ValueError(f"Unknown stage: {stage}")
+
+        usage = options.get("usage")
+
+        if usage is not None:
+            usage.update({"prompt_tokens": 0, "generation_tokens": 0, "attempts": 1})
+
+        return parsed
+
+    # RANKING
+
+    def rank(self, texts: List[str], limit: int) -> List[int]:
+        """
+        Indices of up to `limit` texts, most central first.
+        """
+
+        if len(texts) <= 1:
+            return list(range(len(texts)))[:limit]
+
+        try:
+            matrix = self._vectorizer_cls(stop_words="english", sublinear_tf=True).fit_transform(texts)
+        except ValueError:
+            # Nothing but stop words / numbers: keep document order
+            return list(range(min(limit, len(texts))))
+
+        n = len(texts)
+        centroid = np.asarray(matrix.mean(axis=0)).ravel()
+        centroid /= max(np.linalg.norm(centroid), 1e-10)
+
+        scores = (
+            matrix @ centroid
+            + POSITION_WEIGHT * (1.0 - np.arange(n) / n)
+            + NUMBER_BONUS * np.array([bool(NUMBER_PATTERN.search(t)) for t in texts])
+        )
+
+        chosen = []
+
+        for i in np.argsort(-scores, kind="stable"):
+            if len(chosen) == limit:
+                break
+
+            if chosen and (matrix[chosen] @ matrix[i].T).toarray().max() > REDUNDANCY:
+                continue
+
+            chosen.append(int(i))
+
+        return chosen
+
+    def _summary(self, sentences: List[str], count: int, max_words: int) -> str:
+
+        # Best sentences, read back in document order
+        picked = sorted(self.rank(sentences, count))
+        return _truncate_words(" ".join(sentences[i] for i in picked), max_words)
+
+    def _select(self, items: List[str], limit: int) -> List[str]:
+        items = _unique(items)
+        return [_truncate_words(items[i], ITEM_MAX_WORDS) for i in self.rank(items, limit)]
+
+    # STAGES
+
+    def _chunk(self, source: Dict) -> Dict:
+
+        count, max_words, max_points, max_risks = EXTRACTIVE_LIMITS["chunk"]
+        sentences = split_sentences(source.get("text", ""))
+
+        numeric = [s for s in sentences if NUMBER_PATTERN.search(s)]
+        key_points = self._select(numeric, max_points) or [NO_QUANTITATIVE_DATA]
+
+        risks = [s for s in sentences if RISK_CUES.search(s)]
+
+        return {
+            "chunk_id": source.get("chunk_id"),
+            "summary": self._summary(sentences, count, max_words),
+            "key_points": key_points,
+            "key_risks_action_items": self._select(risks, max_risks)
+        }
+
+    def _section(self, source: Dict) -> Dict:
+
+        count, max_words, max_points, max_risks = EXTRACTIVE_LIMITS["section"]
+        chunks = source.get("chunks", [])
+
+        sentences = [s for c in chunks for s in split_sentences(c.get("summary", ""))]
+
+        return {
+            "section_id": source.get("section_id"),
+            "section_summary": self._summary(sentences, count, max_words),
+            "section_key_points": self._select(
+                [kp for c in chunks for kp in c.get("key_points", [])], max_points
+            ),
+            "section_risks_action_items": self._select(
+                [r for c in chunks for r in c.get("key_risks_action_items", [])], max_risks
+            )
+        }
+
+    def _executive(self, source: Dict) -> Dict:
+
+        count, max_words, max_points, max_risks = EXTRACTIVE_LIMITS["executive"]
+        sections = source.get("sections", [])
+
+        sentences = [s for sec in sections for s in split_sentences(sec.get("section_summary", ""))]
+        top = self.rank(sentences, 1)
+
+        return {
+            "executive_summary": self._summary(sentences, count, max_words),
+            "executive_key_points": self._select(
+                [kp for sec in sections for kp in sec.get("section_key_points", [])], max_points
+            ),
+            "executive_risks_action_items": self._select(
+                [r for sec in sections for r in sec.get("section_risks_action_items", [])], max_risks
+            ),
+            "tldr": _truncate_words(sentences[top[0]], TLDR_MAX_WORDS) if top else ""
+        }
+
+# REGISTRY
+
+LLM_BACKENDS: Dict[str, type] = {
+    "bedrock": BedrockLLMBackend,
+    "extractive": ExtractiveLLMBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def resolve_backend_name(name: str) -> str:
+
+    name = (name or "bedrock").strip().lower()
+
+    if name not in LLM_BACKENDS:
+        logger.warning(f"Unknown LLM backend '{name}'. Using bedrock.")
+        return "bedrock"
+
+    return name
+
+
+def get_llm_backend(name: str) -> LLMBackend:
+
+    name = resolve_backend_name(name)
+
+    if name not in _backends:
+        with _backends_lock:
+            if name not in _backends:
+                _backends[name] = LLM_BACKENDS[name]()
+                logger.info(f"LLM backend ready: {name}")
+
+    return _backends[name]
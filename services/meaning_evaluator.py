@@ -1,5 +1,6 @@
 import numpy as np # type: ignore
-from services.bedrock_service import get_embedding
+from typing import Dict, List
+from services.bedrock_service import get_embeddings
 
 
 def cosine_similarity(vec1, vec2):
@@ -12,20 +13,57 @@ def cosine_similarity(vec1, vec2):
     )
 
 
-def compute_meaning_coverage(section_summaries, executive_summary_text):
+def compute_meaning_breakdown(section_summaries: List[Dict], executive_summary_text: str) -> Dict:
+    """
+    Embeds every section summary and the executive summary in one batch and
+    compares the executive vector against the length-weighted centroid of
+    the section vectors. Also returns each section's own similarity to the
+    executive summary.
+    """
+
+    sections = [
+        s for s in section_summaries
+        if s.get("section_summary", "").strip()
+    ]
+
+    if not sections or not executive_summary_text.strip():
+        return {"score": 0.0, "sections": []}
 
-    section_text = " ".join(
-        s.get("section_summary", "")
-        for s in section_summaries
-        if s.get("section_summary")
+    vectors = get_embeddings(
+        [s["section_summary"] for s in sections] + [executive_summary_text]
     )
 
-    if not section_text.strip() or not executive_summary_text.strip():
-        return 0.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-10)
 
-    section_embedding = get_embedding(section_text)
-    executive_embedding = get_embedding(executive_summary_text)
+    section_vectors = vectors[:-1]
+    executive_vector = vectors[-1]
+
+    weights = np.array(
+        [len(s["section_summary"].split()) for s in sections],
+        dtype=np.float32
+    )
+    weights = weights / weights.sum()
 
-    similarity = cosine_similarity(section_embedding, executive_embedding)
+    centroid = weights @ section_vectors
+    similarities = section_vectors @ executive_vector
+
+    return {
+        "score": round(cosine_similarity(centroid, executive_vector) * 100, 2),
+        "sections": [
+            {
+                "section_id": s.get("section_id"),
+                "similarity": round(float(sim) * 100, 2),
+                "weight": round(float(w), 3)
+            }
+            for s, sim, w in zip(sections, similarities, weights)
+        ]
+    }
+
+
+def compute_meaning_coverage(section_summaries, executive_summary_text):
 
-    return round(similarity * 100, 2)
+    return compute_meaning_breakdown(
+        section_summaries,
+        executive_summary_text
+    )["score"]
@@ -0,0 +1,285 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict
+from config import settings
+from logger import logger
+from services.bedrock_service import ModelOutputError, LLMUnavailableError, CircuitOpenError
+from services.llm_backends import get_llm_backend, resolve_backend_name
+from services.chunking import count_tokens
+
+# "local" covers calls served by a non-Bedrock backend (e.g. extractive)
+TIERS = ("fast", "strong", "local")
+
+# Output cap per stage; fast-tier calls get a limit sized to the prompt below it
+STAGE_GEN_CAPS = {
+    "chunk": settings.MAX_GEN_LEN_CHUNK,
+    "section": settings.MAX_GEN_LEN_SECTION,
+    "executive": settings.MAX_GEN_LEN_EXEC,
+}
+
+# Prompts above this many tokens go straight to the strong tier
+STAGE_STRONG_TOKENS = {
+    "chunk": settings.ROUTER_CHUNK_STRONG_TOKENS,
+    "section": settings.ROUTER_SECTION_STRONG_TOKENS,
+}
+
+# ROUTING STATS
+
+class RoutingStats:
+    """
+    Per-request tally of calls, latency and tokens by tier, shared by every
+    thread of the request through a contextvar. `backend` overrides
+    LLM_BACKEND for the request.
+    """
+
+    def __init__(self, mode: str = None, backend: str = None):
+
+        self.mode = mode
+        self.backend = resolve_backend_name(backend or settings.LLM_BACKEND)
+        self._lock = threading.Lock()
+        self.tiers = {
+            tier: {"calls": 0, "latency_sec": 0.0, "prompt_tokens": 0, "generation_tokens": 0}
+            for tier in TIERS
+        }
+        self.stages = {}
+        self.escalations = {"invalid_json": 0, "ungrounded": 0}
+        self.fallbacks = {"circuit_open": 0, "unavailable": 0}
+
+    def record(self, stage: str, tier: str, latency: float, usage: Dict):
+
+        with self._lock:
+            totals = self.tiers[tier]
+            totals["calls"] += 1
+            totals["latency_sec"] += latency
+            totals["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            totals["generation_tokens"] += usage.get("generation_tokens") or 0
+
+            per_stage = self.stages.setdefault(stage, {t: 0 for t in TIERS})
+            per_stage[tier] += 1
+
+    def escalated(self, reason: str):
+
+        with self._lock:
+            self.escalations[reason] += 1
+
+    @property
+    def degraded(self) -> bool:
+        """Some call of this request was served by the fallback backend."""
+        return any(self.fallbacks.values())
+
+    def fell_back(self, reason: str):
+
+        with self._lock:
+            self.fallbacks[reason] += 1
+
+    def merge(self, summary: Dict):
+        """
+        Adds the calls of another tally (e.g. a chunk worker's summary()).
+        """
+
+        with self._lock:
+            for tier, totals in summary.get("tiers", {}).items():
+                for key in ("calls", "latency_sec", "prompt_tokens", "generation_tokens"):
+                    self.tiers[tier][key] += totals.get(key, 0)
+
+            for stage, counts in summary.get("by_stage", {}).items():
+                per_stage = self.stages.setdefault(stage, {t: 0 for t in TIERS})
+
+                for tier, count in counts.items():
+                    per_stage[tier] += count
+
+            for reason, count in summary.get("escalations", {}).items():
+                self.escalations[reason] += count
+
+            for reason, count in summary.get("fallbacks", {}).items():
+                self.fallbacks[reason] += count
+
+    def summary(self) -> Dict:
+
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "tiers": {
+                    tier: {
+                        **totals,
+                        "latency_sec": round(totals["latency_sec"], 2),
+                        "avg_latency_sec": round(totals["latency_sec"] / totals["calls"], 2) if totals["calls"] else 0.0
+                    }
+                    for tier, totals in self.tiers.items()
+                },
+                "by_stage": {stage: dict(counts) for stage, counts in self.stages.items()},
+                "escalations": dict(self.escalations),
+                "fallbacks": dict(self.fallbacks)
+            }
+
+
+_routing_stats = contextvars.ContextVar("routing_stats", default=None)
+
+
+@contextmanager
+def track_routing(mode: str = None, backend: str = None):
+
+    stats = RoutingStats(mode, backend)
+    token = _routing_stats.set(stats)
+
+    try:
+        yield stats
+    finally:
+        _routing_stats.reset(token)
+
+def current_routing():
+    return _routing_stats.get()
+
+# ROUTING
+
+def model_for(stage: str, tier: str) -> str:
+
+    if tier == "strong":
+        return settings.LLM_STRONG_MODEL_ID
+
+    return {
+        "chunk": settings.CHUNK_MODEL_ID,
+        "section": settings.SECTION_MODEL_ID,
+        "executive": settings.EXEC_MODEL_ID,
+    }[stage]
+
+
+def route(stage: str, prompt_tokens: int, is_table: bool = False, mode: str = None) -> str:
+
+    if model_for(stage, "fast") == settings.LLM_STRONG_MODEL_ID:
+        return "strong"
+
+    if is_table:
+        return "strong"
+
+    if prompt_tokens > STAGE_STRONG_TOKENS.get(stage, float("inf")):
+        return "strong"
+
+    if mode and mode in settings.ROUTER_STRONG_MODES.split(","):
+        return "strong"
+
+    return "fast"
+
+
+def size_gen_len(stage: str, prompt_tokens: int) -> int:
+    """
+    Fast-tier output limit proportional to the prompt, between
+    ROUTER_MIN_GEN_LEN and the stage's MAX_GEN_LEN_* cap.
+    """
+
+    cap = STAGE_GEN_CAPS[stage]
+    sized = int(prompt_tokens * settings.ROUTER_GEN_LEN_RATIO)
+
+    return max(min(settings.ROUTER_MIN_GEN_LEN, cap), min(sized, cap))
+
+# ROUTED INVOCATION
+
+def invoke_routed(
+    stage: str,
+    prompt: str,
+    is_table: bool = False,
+    accept: Callable[[Dict], bool] = None,
+    source: Dict = None
+) -> Dict:
+    """
+    Calls the request's backend. On Bedrock, the tier chosen by `route` is
+    used; a fast-tier result that is not valid JSON, or that `accept`
+    rejects (e.g. fails groundedness), is retried once on the strong tier
+    with the full output cap.
+
+    When Bedrock is unavailable (circuit open or retries spent) and the
+    stage's structured `source` is given, the call is served by
+    LLM_FALLBACK_BACKEND instead.
+    """
+
+    stats = _routing_stats.get()
+    backend = stats.backend if stats is not None else resolve_backend_name(settings.LLM_BACKEND)
+
+    if backend != "bedrock":
+        return _call_local(backend, stage, prompt, source, stats)
+
+    try:
+        return _invoke_bedrock(stage, prompt, is_table, accept, stats)
+
+    except LLMUnavailableError as e:
+        fallback = settings.LLM_FALLBACK_BACKEND.strip().lower()
+
+        if fallback in ("", "bedrock") or source is None:
+            raise
+
+        reason = "circuit_open" if isinstance(e, CircuitOpenError) else "unavailable"
+        logger.warning(f"{stage} call served by {fallback} backend: {str(e)}")
+
+        if stats is not None:
+            stats.fell_back(reason)
+
+        return _call_local(fallback, stage, prompt, source, stats)
+
+
+def _invoke_bedrock(stage: str, prompt: str, is_table: bool, accept, stats: RoutingStats) -> Dict:
+
+    mode = stats.mode if stats is not None else None
+
+    prompt_tokens = count_tokens(prompt)
+    tier = route(stage, prompt_tokens, is_table=is_table, mode=mode)
+
+    # Only a fast-tier call can afford a tight limit: a truncated answer
+    # escalates. Strong-tier calls (all of them without a distinct fast
+    # model) retry on the same model, so they get the full cap
+    max_gen_len = size_gen_len(stage, prompt_tokens) if tier == "fast" else STAGE_GEN_CAPS[stage]
+
+    try:
+        parsed = _call(stage, tier, prompt, max_gen_len, stats)
+
+    except ModelOutputError as e:
+        if tier == "strong":
+            raise
+
+        reason = "invalid_json"
+        logger.info(f"Escalating {stage} call to strong tier: {str(e)}")
+
+    else:
+        if tier == "strong" or accept is None or accept(parsed):
+            return parsed
+
+        reason = "ungrounded"
+        logger.info(f"Escalating {stage} call to strong tier: result not grounded")
+
+    if stats is not None:
+        stats.escalated(reason)
+
+    return _call(stage, "strong", prompt, STAGE_GEN_CAPS[stage], stats)
+
+
+def _call(stage: str, tier: str, prompt: str, max_gen_len: int, stats: RoutingStats) -> Dict:
+
+    usage = {}
+    start = time.perf_counter()
+
+    try:
+        return get_llm_backend("bedrock").generate(
+            stage,
+            prompt,
+            max_gen_len=max_gen_len,
+            model_id=model_for(stage, tier),
+            usage=usage,
+            # Invalid JSON on the fast tier escalates instead of retrying
+            retry_invalid_output=(tier == "strong")
+        )
+    finally:
+        if stats is not None:
+            stats.record(stage, tier, time.perf_counter() - start, usage)
+
+
+def _call_local(backend: str, stage: str, prompt: str, source: Dict, stats: RoutingStats) -> Dict:
+
+    usage = {}
+    start = time.perf_counter()
+
+    try:
+        return get_llm_backend(backend).generate(stage, prompt, source=source, usage=usage)
+    finally:
+        if stats is not None:
+            stats.record(stage, "local", time.perf_counter() - start, usage)
@@ -0,0 +1,258 @@
+import os
+import glob
+import json
+import time
+import queue
+import contextvars
+import multiprocessing
+from typing import Dict, List, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException  # type: ignore
+from config import settings
+from logger import logger, log_context
+from services.ingestion import ALLOWED_EXTENSIONS, ingest_path
+from services.chunking import chunk_text
+from services.checkpoint_store import fingerprint
+from services.concurrency import get_shared_executor
+from services.summarization_pipeline import run_summarization_pipeline
+
+# Attempts per document when the admission queue pushes back with 429
+MAX_ADMISSION_ATTEMPTS = 20
+
+# INPUT DISCOVERY
+
+def discover_documents(sources: Sequence[str]) -> List[str]:
+    """
+    Expands directories (recursively) and glob patterns into supported
+    files, de-duplicated, in a stable order.
+    """
+
+    found = []
+
+    for source in sources:
+        if os.path.isdir(source):
+            matches = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(source)
+                for name in names
+            ]
+        elif glob.has_magic(source):
+            matches = glob.glob(source, recursive=True)
+        else:
+            matches = [source]
+
+        found.extend(
+            m for m in matches
+            if os.path.isfile(m) and m.rsplit(".", 1)[-1].lower() in ALLOWED_EXTENSIONS
+        )
+
+    return sorted({os.path.abspath(p) for p in found})
+
+
+def completed_sources(output_path: str) -> set:
+    """
+    Sources with a successful record in an existing output file. Failed
+    documents are not listed, so a rerun retries them.
+    """
+
+    done = set()
+
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from an interrupted run
+                continue
+
+            if record.get("status") == "done":
+                done.add(record.get("source"))
+
+    return done
+
+# CPU STAGES (worker processes)
+
+def prepare_document(path: str) -> Dict:
+    """
+    Ingestion and chunking for one file; runs in a worker process and
+    returns the outputs of the pipeline's ingest and chunk stages.
+    """
+
+    start = time.perf_counter()
+
+    document_data = ingest_path(path)
+    features = []
+    chunks = chunk_text(document_data["text"], features=features)
+
+    return {
+        "document_data": document_data,
+        "chunks": chunks,
+        "chunk_features": features,
+        "prepare_sec": round(time.perf_counter() - start, 3)
+    }
+
+# BATCH ENGINE
+
+def run_offline_batch(
+    sources: Sequence[str],
+    output_path: str,
+    mode: str = "academic",
+    detail: str = "executive",
+    prepare_workers: int = None,
+    max_documents: int = None,
+    backend: str = None
+) -> Dict:
+    """
+    Summarizes every supported file under `sources` into `output_path`
+    (JSONL, one record per document, appended as each finishes).
+
+    Ingestion and chunking run on a process pool; each prepared document
+    then runs the Bedrock stages in its own lane of the shared executor,
+    so LLM_MAX_CONCURRENCY caps the whole batch. Documents that already
+    have a successful record in the output are skipped.
+    """
+
+    paths = discover_documents(sources)
+    already_done = completed_sources(output_path)
+    todo = [p for p in paths if p not in already_done]
+
+    prepare_workers = prepare_workers or settings.OFFLINE_PREPARE_WORKERS or os.cpu_count() or 1
+    max_documents = max_documents or settings.BATCH_MAX_DOCUMENTS
+
+    logger.info(
+        f"Offline batch: {len(paths)} documents found, "
+        f"{len(paths) - len(todo)} already in {output_path}, {len(todo)} to run"
+    )
+
+    stats = {
+        "documents_found": len(paths),
+        "skipped": len(paths) - len(todo),
+        "succeeded": 0,
+        "failed": 0,
+        "prepare_failed": 0,
+        "chunks": 0,
+        "llm_tokens": 0
+    }
+
+    executor = get_shared_executor()
+    records = queue.SimpleQueue()
+    batch_start = time.perf_counter()
+
+    def run_document(path: str, prepared: Dict):
+
+        doc_start = time.perf_counter()
+        response, error = None, None
+
+        try:
+            with log_context(document=os.path.basename(path)):
+                response = _summarize_prepared(path, prepared, mode, detail, backend)
+
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            logger.warning(f"Offline document {path} failed: {error}")
+
+        records.put(_record(path, prepared, response, error, time.perf_counter() - doc_start))
+
+    def on_prepared(path: str, future):
+
+        try:
+            prepared = future.result()
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            logger.warning(f"Preparing {path} failed: {error}")
+            records.put(_record(path, None, None, error, 0.0, stage="prepare"))
+            return
+
+        documents_pool.submit(contextvars.copy_context().run, run_document, path, prepared)
+
+    # Spawned, not forked: the parent already runs logging and executor threads
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(prepare_workers, len(todo) or 1)),
+        mp_context=multiprocessing.get_context("spawn")
+    ) as prepare_pool, ThreadPoolExecutor(
+        max_workers=max(1, min(max_documents, len(todo) or 1)),
+        thread_name_prefix="offline-doc"
+    ) as documents_pool, open(output_path, "a", encoding="utf-8") as output:
+
+        for path in todo:
+            future = prepare_pool.submit(prepare_document, path)
+            future.add_done_callback(lambda f, path=path: on_prepared(path, f))
+
+        for _ in range(len(todo)):
+            record = records.get()
+
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+
+            if record["status"] == "done":
+                stats["succeeded"] += 1
+                stats["chunks"] += record["chunk_count"]
+                stats["llm_tokens"] += record["llm_tokens"]
+            else:
+                stats["failed"] += 1
+                stats["prepare_failed"] += record.get("failed_stage") == "prepare"
+
+    total_sec = time.perf_counter() - batch_start
+    minutes = total_sec / 60
+
+    stats.update({
+        "max_workers": executor.max_workers,
+        "prepare_workers": prepare_workers,
+        "total_time_sec": round(total_sec, 2),
+        "documents_per_min": round(stats["succeeded"] / minutes, 2) if minutes else 0.0,
+        "tokens_per_min": round(stats["llm_tokens"] / minutes, 1) if minutes else 0.0
+    })
+
+    return stats
+
+
+def _summarize_prepared(path: str, prepared: Dict, mode: str, detail: str, backend: str = None) -> Dict:
+
+    stat = os.stat(path)
+
+    # Same file, same content -> same run id, so an interrupted run resumes
+    run_id = fingerprint(["offline", path, stat.st_size, stat.st_mtime, mode, backend])[:32]
+
+    inputs = {k: prepared[k] for k in ("document_data", "chunks", "chunk_features")}
+
+    for attempt in range(1, MAX_ADMISSION_ATTEMPTS + 1):
+        try:
+            return run_summarization_pipeline(
+                None,
+                mode,
+                detail=detail,
+                run_id=run_id,
+                prepared=inputs,
+                backend=backend
+            )
+
+        except HTTPException as e:
+            if e.status_code != 429 or attempt == MAX_ADMISSION_ATTEMPTS:
+                raise
+
+            # Offline work waits its turn instead of failing
+            retry_after = int((e.headers or {}).get("Retry-After", settings.ADMISSION_DEFAULT_RETRY_SEC))
+            logger.info(f"{os.path.basename(path)} not admitted yet; retrying in {retry_after}s")
+            time.sleep(retry_after)
+
+
+def _record(path: str, prepared: Dict, response: Dict, error: str, elapsed: float, stage: str = "summarize") -> Dict:
+
+    performance = (response or {}).get("performance", {})
+    tiers = performance.get("model_routing", {}).get("tiers", {})
+
+    return {
+        "source": path,
+        "document_name": os.path.basename(path),
+        "status": "done" if response is not None else "failed",
+        "error": error,
+        "failed_stage": stage if response is None else None,
+        "prepare_sec": prepared["prepare_sec"] if prepared else None,
+        "elapsed_sec": round(elapsed, 2),
+        "chunk_count": performance.get("chunk_count", 0),
+        "llm_tokens": sum(t["prompt_tokens"] + t["generation_tokens"] for t in tiers.values()),
+        "result": response
+    }
@@ -0,0 +1,224 @@
+import time
+import contextvars
+from typing import Callable, Dict, List, Sequence
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import settings
+from logger import logger
+from services.tracing import span
+from services.profiling import profile_stage
+from services.checkpoint_store import RunCheckpoint, fingerprint
+
+# Shared by every pipeline run; nodes only orchestrate, model calls run
+# on the stage-specific pools underneath.
+_stage_executor = ThreadPoolExecutor(
+    max_workers=settings.PIPELINE_STAGE_WORKERS,
+    thread_name_prefix="pipeline-stage"
+)
+
+# NODE
+
+class PipelineNode:
+    """
+    One stage of a pipeline. `func` is called with the named inputs as
+    keyword arguments and returns a dict containing every name in
+    `outputs`. Nodes with `defaults` can be skipped per run, in which case
+    the defaults stand in for their outputs.
+
+    Nodes with `checkpoint` (the values that determine their result: inputs,
+    or run-wide values such as the LLM backend) are restored from the run's
+    checkpoint when those values are unchanged.
+    `transient` outputs are not persisted and come back as None;
+    `checkpoint_when` can veto saving a result (e.g. a fallback).
+
+    `inline` nodes run on the thread driving the run instead of the shared
+    stage pool: for stages that mostly block (admission waits), so waiting
+    runs do not hold stage threads that admitted runs need. Finished nodes
+    are collected once an inline node returns.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Dict],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        defaults: Dict = None,
+        checkpoint: Sequence[str] = None,
+        transient: Sequence[str] = (),
+        checkpoint_when: Callable[[Dict], bool] = None,
+        inline: bool = False
+    ):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.defaults = defaults
+        self.checkpoint = tuple(checkpoint) if checkpoint is not None else None
+        self.transient = tuple(transient)
+        self.checkpoint_when = checkpoint_when
+        self.inline = inline
+
+    @property
+    def skippable(self) -> bool:
+        return self.defaults is not None
+
+# ENGINE
+
+class Pipeline:
+    """
+    Runs nodes as soon as all of their inputs are available. Records the
+    start/end of every node and the critical path through the graph. Nodes
+    whose outputs are all passed in `inputs` count as done and are not run.
+    """
+
+    def __init__(self, nodes: List[PipelineNode]):
+
+        self.nodes = {node.name: node for node in nodes}
+        self.producers = {}
+
+        for node in nodes:
+            for output in node.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output '{output}' produced by both {self.producers[output]} and {node.name}")
+                self.producers[output] = node.name
+
+    def dependencies(self, node: PipelineNode) -> List[str]:
+        return sorted({
+            self.producers[i] for i in node.inputs
+            if i in self.producers
+        })
+
+    def run(
+        self,
+        inputs: Dict,
+        skip: Sequence[str] = (),
+        checkpoint: RunCheckpoint = None
+    ) -> Dict:
+
+        values = dict(inputs)
+        timings = {}
+        pending = dict(self.nodes)
+        in_flight = {}
+        run_start = time.perf_counter()
+
+        # Nodes whose outputs the caller already supplied are not run
+        for name, node in list(pending.items()):
+            if node.outputs and all(o in values for o in node.outputs):
+                timings[name] = {"start_sec": 0.0, "end_sec": 0.0, "duration_sec": 0.0, "provided": True}
+                del pending[name]
+
+        for name in skip:
+            node = pending.get(name)
+
+            if node is None or not node.skippable:
+                logger.warning(f"Pipeline node '{name}' cannot be skipped. Running it.")
+                continue
+
+            values.update(node.defaults)
+            timings[name] = {"start_sec": 0.0, "end_sec": 0.0, "duration_sec": 0.0, "skipped": True}
+            del pending[name]
+
+        def ready(node: PipelineNode) -> bool:
+            return all(i in values for i in node.inputs)
+
+        def execute(node: PipelineNode, kwargs: Dict, keyed: List):
+            with span(f"stage.{node.name}") as stage_span, profile_stage(node.name):
+                start = time.perf_counter()
+                input_hash = None
+
+                if checkpoint is not None and keyed is not None:
+                    input_hash = fingerprint([node.name] + keyed)
+                    restored = checkpoint.load_stage(node.name, input_hash)
+
+                    if restored is not None:
+                        stage_span.set_attribute("checkpoint.restored", True)
+                        restored.update({o: None for o in node.transient})
+                        return restored, start, time.perf_counter(), True
+
+                result = node.func(**kwargs)
+
+                if input_hash is not None and (node.checkpoint_when is None or node.checkpoint_when(result)):
+                    checkpoint.save_stage(
+                        node.name,
+                        input_hash,
+                        {o: result[o] for o in node.outputs if o not in node.transient}
+                    )
+
+                return result, start, time.perf_counter(), False
+
+        def finish(node: PipelineNode, result: Dict, start: float, end: float, restored: bool):
+
+            values.update({o: result[o] for o in node.outputs})
+            timings[node.name] = {
+                "start_sec": round(start - run_start, 3),
+                "end_sec": round(end - run_start, 3),
+                "duration_sec": round(end - start, 3)
+            }
+
+            if restored:
+                timings[node.name]["restored"] = True
+
+        try:
+            while pending or in_flight:
+
+                for name in [n for n, node in pending.items() if ready(node)]:
+                    node = pending.pop(name)
+                    kwargs = {i: values[i] for i in node.inputs}
+                    keyed = [values[i] for i in node.checkpoint] if node.checkpoint is not None else None
+
+                    if node.inline:
+                        finish(node, *execute(node, kwargs, keyed))
+                        continue
+
+                    # Stage threads inherit the caller's context (executor, etc.)
+                    context = contextvars.copy_context()
+                    future = _stage_executor.submit(context.run, execute, node, kwargs, keyed)
+                    in_flight[future] = node
+
+                if not in_flight:
+                    # An inline node may have made others ready
+                    if any(ready(node) for node in pending.values()):
+                        continue
+
+                    missing = {i for node in pending.values() for i in node.inputs if i not in values}
+                    raise RuntimeError(f"Pipeline stalled; unresolved inputs: {sorted(missing)}")
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    finish(in_flight.pop(future), *future.result())
+
+        except Exception:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+        return {
+            "values": values,
+            "timings": timings,
+            "critical_path": self.critical_path(timings),
+            "total_sec": round(time.perf_counter() - run_start, 3)
+        }
+
+    def critical_path(self, timings: Dict) -> List[str]:
+        """
+        Walks back from the last node to finish, each time following the
+        dependency that finished latest.
+        """
+
+        if not timings:
+            return []
+
+        current = max(timings, key=lambda n: timings[n]["end_sec"])
+        path = [current]
+
+        while True:
+            deps = [d for d in self.dependencies(self.nodes[current]) if d in timings]
+
+            if not deps:
+                break
+
+            current = max(deps, key=lambda n: timings[n]["end_sec"])
+            path.append(current)
+
+        return list(reversed(path))
@@ -0,0 +1,404 @@
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config import settings
+from logger import logger
+
+try:
+    import resource  # type: ignore
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# basic:    wall / CPU / RSS per stage, queue wait and run time per task and call
+# memory:   basic + tracemalloc top allocations per stage (snapshots are slow)
+# cprofile: basic + a cProfile dump of the request
+PROFILE_LEVELS = ("basic", "memory", "cprofile")
+
+# Profile of the request running in this context; None when not profiling
+_profile = contextvars.ContextVar("request_profile", default=None)
+
+# Queue wait of the executor task running in this context
+_task_queue_wait = contextvars.ContextVar("task_queue_wait", default=None)
+
+# Threads currently running a cProfile.Profile (one per thread at a time)
+_cprofile_local = threading.local()
+
+# tracemalloc is process-wide: started by the first profiled request and
+# stopped when the last one finishes
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+_tracemalloc_lock = threading.Lock()
+
+# MEMORY READINGS
+
+def _rss_mb() -> Optional[float]:
+
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_mb() -> Optional[float]:
+
+    if resource is None:
+        return None
+
+    # Linux reports KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _round(value, digits: int = 3):
+    return round(value, digits) if value is not None else None
+
+# REQUEST PROFILE
+
+def parse_profile_level(value: str) -> Optional[str]:
+    """
+    "1" / "true" / "basic" -> "basic", "memory" / "cprofile" as given,
+    anything else -> None.
+    """
+
+    value = (value or "").strip().lower()
+
+    if value in ("1", "true", "yes", "basic"):
+        return "basic"
+
+    if value in PROFILE_LEVELS:
+        return value
+
+    return None
+
+
+class RequestProfile:
+    """
+    Resource usage of one request: per stage (wall, CPU, RSS, tracemalloc
+    top allocations) and per executor task / Bedrock call (queue wait and
+    run time). Filled from every thread of the request.
+
+    CPU and memory readings are process-wide, so they include whatever ran
+    concurrently (other stages of the DAG, other requests); thread CPU is
+    the stage thread alone.
+    """
+
+    def __init__(self, profile_id: str, request_id: str = None, level: str = "basic"):
+
+        self.profile_id = profile_id
+        self.request_id = request_id
+        self.level = level
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.tasks = {}
+        self.calls = []
+        self._stats = None
+        self._start = time.perf_counter()
+
+    # RECORDING
+
+    def record_stage(self, name: str, entry: Dict):
+
+        with self._lock:
+            self.stages[name] = entry
+
+    def record_task(self, name: str, queue_wait: float, run_sec: float, cpu_sec: float):
+
+        with self._lock:
+            task = self.tasks.setdefault(name, {
+                "count": 0,
+                "queue_wait_sec": 0.0,
+                "max_queue_wait_sec": 0.0,
+                "run_sec": 0.0,
+                "cpu_sec": 0.0
+            })
+            task["count"] += 1
+            task["queue_wait_sec"] += queue_wait
+            task["max_queue_wait_sec"] = max(task["max_queue_wait_sec"], queue_wait)
+            task["run_sec"] += run_sec
+            task["cpu_sec"] += cpu_sec
+
+    def record_call(self, entry: Dict):
+
+        with self._lock:
+            self.calls.append(entry)
+
+    def add_cprofile(self, profiler: cProfile.Profile):
+
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler)
+            else:
+                self._stats.add(profiler)
+
+    # OUTPUT
+
+    def summary(self) -> Dict:
+
+        with self._lock:
+            calls = list(self.calls)
+            waits = sorted(c["queue_wait_sec"] for c in calls if c.get("queue_wait_sec") is not None)
+
+            return {
+                "profile_id": self.profile_id,
+                "request_id": self.request_id,
+                "level": self.level,
+                "stages": dict(self.stages),
+                "executor_tasks": {
+                    name: {
+                        **{k: round(v, 4) if isinstance(v, float) else v for k, v in t.items()},
+                        "avg_queue_wait_sec": round(t["queue_wait_sec"] / t["count"], 4),
+                        "avg_run_sec": round(t["run_sec"] / t["count"], 4)
+                    }
+                    for name, t in self.tasks.items()
+                },
+                "bedrock_calls": {
+                    "count": len(calls),
+                    "queue_wait_p50_sec": waits[len(waits) // 2] if waits else None,
+                    "queue_wait_max_sec": waits[-1] if waits else None,
+                    "run_sec_total": round(sum(c["run_sec"] for c in calls), 3),
+                    "calls": calls
+                }
+            }
+
+    def finish(self) -> Dict:
+        """
+        Saves the summary (and the merged cProfile stats, if any) under
+        PROFILE_DIR as <profile_id>.json / .prof and returns the summary.
+        """
+
+        summary = self.summary()
+        summary["total_sec"] = round(time.perf_counter() - self._start, 3)
+
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+
+            if self._stats is not None:
+                self._stats.dump_stats(profile_path(self.profile_id, "prof"))
+                summary["cprofile"] = f"/profiles/{self.profile_id}/cprofile"
+
+            with open(profile_path(self.profile_id, "json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, default=str)
+
+        except OSError as e:
+            logger.warning(f"Could not save profile {self.profile_id}: {str(e)}")
+
+        return summary
+
+
+def profile_path(profile_id: str, extension: str) -> str:
+
+    # Profile ids embed request ids from headers; keep them to a safe file name
+    safe = "".join(c for c in profile_id if c.isalnum() or c in "-_")[:64] or "request"
+    return os.path.join(settings.PROFILE_DIR, f"{safe}.{extension}")
+
+
+def purge_profiles() -> int:
+
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return 0
+
+    cutoff = time.time() - settings.PROFILE_TTL_SEC
+    removed = 0
+
+    for name in os.listdir(settings.PROFILE_DIR):
+        path = os.path.join(settings.PROFILE_DIR, name)
+
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+
+    return removed
+
+# CONTEXT
+
+def current_profile() -> Optional[RequestProfile]:
+    return _profile.get()
+
+
+@contextmanager
+def profile_request(level: str, profile_id: str, request_id: str = None):
+    """
+    Profiles everything run in this context when `level` is set; yields
+    the RequestProfile, or None (and does nothing) when it is not.
+    `profile_id` names the saved profile and must be unique per run (the
+    documents of a batch share one request id).
+    """
+
+    global _tracemalloc_users, _tracemalloc_owned
+
+    if not level or not settings.PROFILING_ENABLED:
+        yield None
+        return
+
+    profile = RequestProfile(profile_id, request_id, level)
+    token = _profile.set(profile)
+    traces = level == "memory"
+
+    if traces:
+        with _tracemalloc_lock:
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_owned = True
+            _tracemalloc_users += 1
+
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+        if traces:
+            with _tracemalloc_lock:
+                _tracemalloc_users -= 1
+                if _tracemalloc_users == 0 and _tracemalloc_owned:
+                    tracemalloc.stop()
+                    _tracemalloc_owned = False
+
+
+@contextmanager
+def _cprofiled(profile: RequestProfile):
+
+    # Nested tasks (run inline on a worker) are covered by the outer profiler
+    if profile.level != "cprofile" or getattr(_cprofile_local, "active", False):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    _cprofile_local.active = True
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _cprofile_local.active = False
+        profile.add_cprofile(profiler)
+
+# STAGES
+
+def _top_allocations(before, after) -> List[Dict]:
+
+    if before is None or after is None:
+        return []
+
+    diffs = after.compare_to(before, "lineno")[:settings.PROFILE_TOP_ALLOCATIONS]
+
+    return [
+        {
+            "location": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+            "size_diff_kb": round(d.size_diff / 1024, 1),
+            "count_diff": d.count_diff
+        }
+        for d in diffs
+        if d.size_diff > 0
+    ]
+
+
+def _snapshot(profile: RequestProfile):
+
+    if profile.level != "memory" or not tracemalloc.is_tracing():
+        return None
+
+    # Leave out the profiler's own bookkeeping
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Records wall time, CPU time, RSS (and, at the memory level, top
+    allocations) of a pipeline stage when the request is being profiled.
+    """
+
+    profile = _profile.get()
+
+    if profile is None:
+        yield
+        return
+
+    before = _snapshot(profile)
+    rss_start, max_rss_start = _rss_mb(), _max_rss_mb()
+    wall_start, cpu_start, thread_start = time.perf_counter(), time.process_time(), time.thread_time()
+
+    try:
+        with _cprofiled(profile):
+            yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        thread_cpu = time.thread_time() - thread_start
+        rss_end, max_rss_end = _rss_mb(), _max_rss_mb()
+
+        profile.record_stage(name, {
+            "wall_sec": _round(wall),
+            "thread_cpu_sec": _round(thread_cpu),
+            "process_cpu_sec": _round(time.process_time() - cpu_start),
+            "thread_cpu_share": _round(thread_cpu / wall if wall else 0.0),
+            "rss_delta_mb": _round(rss_end - rss_start if rss_start is not None else None, 1),
+            "peak_rss_delta_mb": _round(max_rss_end - max_rss_start if max_rss_start is not None else None, 1),
+            "top_allocations": _top_allocations(before, _snapshot(profile))
+        })
+
+# EXECUTOR TASKS AND BEDROCK CALLS
+
+def run_profiled_task(fn, queue_wait: float, *args, **kwargs):
+    """
+    Runs an executor task of a profiled request, recording how long it
+    waited in the queue and how long it ran. Called inside the task's
+    context, so calls it makes can see their queue wait.
+    """
+
+    profile = _profile.get()
+    _task_queue_wait.set(queue_wait)
+
+    start, cpu_start = time.perf_counter(), time.thread_time()
+
+    try:
+        with _cprofiled(profile):
+            return fn(*args, **kwargs)
+    finally:
+        profile.record_task(
+            getattr(fn, "__qualname__", repr(fn)),
+            queue_wait,
+            time.perf_counter() - start,
+            time.thread_time() - cpu_start
+        )
+
+
+def record_call(kind: str, model_id: str, run_sec: float, **fields):
+    """
+    Adds one Bedrock call (all attempts) to the request's profile, with the
+    queue wait of the executor task it ran in.
+    """
+
+    profile = _profile.get()
+
+    if profile is None:
+        return
+
+    wait = _task_queue_wait.get()
+
+    profile.record_call({
+        "kind": kind,
+        "model_id": model_id,
+        "queue_wait_sec": _round(wait, 4),
+        "run_sec": _round(run_sec, 4),
+        **fields
+    })
+
+
+def profile_of(context: contextvars.Context) -> Optional[RequestProfile]:
+    return context.get(_profile)
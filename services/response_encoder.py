@@ -0,0 +1,110 @@
+import gzip
+import json
+from typing import Dict
+from fastapi import Response  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional compression
+    brotli = None
+
+DETAIL_LEVELS = ("executive", "sections", "full")
+
+# Document summary keys left out at each detail level
+DETAIL_EXCLUDES = {
+    "executive": {"sections", "chunk_summaries"},
+    "sections": {"chunk_summaries"},
+    "full": set(),
+}
+
+MIN_COMPRESS_BYTES = 1024
+
+# DETAIL SELECTION
+
+def normalize_detail(detail: str) -> str:
+
+    detail = (detail or "full").strip().lower()
+    return detail if detail in DETAIL_LEVELS else "full"
+
+
+def dump_exclusions(detail: str) -> Dict:
+    """
+    `exclude` argument for FinalOutput.model_dump, so large lists are never
+    serialized for clients that did not ask for them.
+    """
+
+    excluded = DETAIL_EXCLUDES[normalize_detail(detail)]
+    return {"document_summary": excluded} if excluded else None
+
+
+def apply_detail(response: Dict, detail: str) -> Dict:
+    """
+    Same trimming as dump_exclusions, for responses already held as dicts
+    (e.g. stored job results).
+    """
+
+    for key in DETAIL_EXCLUDES[normalize_detail(detail)]:
+        response.get("document_summary", {}).pop(key, None)
+
+    return response
+
+# ENCODING
+
+def _default(value):
+
+    # numpy scalars / arrays that slip into stats blocks
+    if hasattr(value, "tolist"):
+        return value.tolist()
+
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_json(payload: Dict) -> bytes:
+
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in (accept_encoding or "").split(",")
+    }
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+
+    if "gzip" in accepted:
+        return "gzip"
+
+    return None
+
+
+def render_response(payload: Dict, accept_encoding: str = None) -> Response:
+    """
+    Encodes once with orjson (stdlib json fallback) and compresses with the
+    best encoding the client accepts, skipping tiny bodies.
+    """
+
+    body = encode_json(payload)
+    headers = {"Vary": "Accept-Encoding"}
+
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+        headers["Content-Encoding"] = "br"
+
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
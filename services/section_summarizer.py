@@ -1,8 +1,11 @@
 from typing import List, Dict
+from concurrent.futures import wait, FIRST_COMPLETED
 from config import settings
 from logger import logger
-from prompts.section import build_section_prompt
-from services.bedrock_service import invoke_llm
+from prompts.section import build_section_prompt, format_section_chunk
+from services.chunking import count_tokens
+from services.concurrency import stage_executor
+from services.model_router import invoke_routed
 
 # PUBLIC 
 
@@ -19,7 +22,149 @@ def summarize_section(section_chunks: List[Dict], section_id: int) -> Dict:
             "covered_chunk_ids": [chunk.get("chunk_id")]
         }
 
-    return summarize_section_bedrock(section_chunks, section_id)
+    return summarize_sections([{
+        "section_id": section_id,
+        "section_chunks": section_chunks,
+        "covered_chunk_ids": [c["chunk_id"] for c in section_chunks]
+    }])[0]
+
+
+def summarize_sections(semantic_sections: List[Dict], stats: Dict = None) -> List[Dict]:
+    """
+    Summarizes every semantic section concurrently (bounded by MAX_WORKERS,
+    the same limit as the chunk stage) and returns results in section order
+    with each section's covered_chunk_ids attached.
+
+    Sections whose input exceeds SECTION_INPUT_TOKEN_BUDGET are reduced as a
+    tree: token-budgeted groups are summarized in parallel, and the partial
+    summaries are regrouped and merged level by level until one remains.
+    Only individual model calls go on the pool; the tree is driven from the
+    calling thread.
+    """
+
+    results = [None] * len(semantic_sections)
+    trees = {}
+
+    with stage_executor(settings.MAX_WORKERS) as executor:
+
+        in_flight = {}
+        levels = {}
+
+        def schedule(pos: int, items: List[Dict]):
+
+            section_id = semantic_sections[pos]["section_id"]
+            groups = group_by_token_budget(items, settings.SECTION_INPUT_TOKEN_BUDGET)
+
+            tree = trees.setdefault(pos, {"depth": 0, "fan_out": 0, "calls": 0})
+            tree["depth"] += 1
+            tree["fan_out"] = max(tree["fan_out"], len(groups))
+            tree["calls"] += len(groups)
+
+            levels[pos] = [None] * len(groups)
+
+            for g_idx, group in enumerate(groups):
+                future = executor.submit(summarize_section_bedrock, group, section_id)
+                in_flight[future] = (pos, g_idx, group)
+
+        for pos, section in enumerate(semantic_sections):
+
+            # Single-chunk sections need no model call, so skip the pool
+            if len(section["section_chunks"]) == 1:
+                results[pos] = summarize_section(
+                    section["section_chunks"],
+                    section["section_id"]
+                )
+            else:
+                schedule(pos, section["section_chunks"])
+
+        while in_flight:
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pos, g_idx, group = in_flight.pop(future)
+                levels[pos][g_idx] = as_reduce_item(future.result(), group)
+
+                if any(part is None for part in levels[pos]):
+                    continue
+
+                parts = levels.pop(pos)
+
+                if len(parts) == 1:
+                    results[pos] = future.result()
+                else:
+                    schedule(pos, parts)
+
+    for section, result in zip(semantic_sections, results):
+        result["covered_chunk_ids"] = section["covered_chunk_ids"]
+
+    for pos, tree in trees.items():
+        if tree["depth"] > 1:
+            logger.info(
+                f"Section {semantic_sections[pos]['section_id']} reduced with depth "
+                f"{tree['depth']}, fan-out {tree['fan_out']}, {tree['calls']} calls"
+            )
+
+    if stats is not None:
+        stats["reduce_trees"] = {
+            semantic_sections[pos]["section_id"]: tree
+            for pos, tree in trees.items()
+        }
+        stats["max_depth"] = max((t["depth"] for t in trees.values()), default=0)
+        stats["max_fan_out"] = max((t["fan_out"] for t in trees.values()), default=0)
+
+    return results
+
+# MAP-REDUCE HELPERS
+
+def group_by_token_budget(items: List[Dict], budget: int) -> List[List[Dict]]:
+    """
+    Packs items, in order, into groups whose formatted prompt input stays
+    within the token budget. An item larger than the budget gets its own
+    group. Always makes progress: if every item would sit alone, items are
+    paired so the next level is smaller.
+    """
+
+    groups = []
+    current = []
+    used = 0
+
+    for item in items:
+
+        cost = count_tokens(format_section_chunk(item))
+
+        if current and used + cost > budget:
+            groups.append(current)
+            current = []
+            used = 0
+
+        current.append(item)
+        used += cost
+
+    if current:
+        groups.append(current)
+
+    if len(items) > 1 and len(groups) == len(items):
+        groups = [items[i:i + 2] for i in range(0, len(items), 2)]
+
+    return groups
+
+
+def as_reduce_item(partial: Dict, group: List[Dict]) -> Dict:
+    """
+    Presents a partial section summary as a chunk-shaped input for the next
+    reduce level, labelled with the chunk range it covers.
+    """
+
+    first = str(group[0]["chunk_id"]).split("-")[0]
+    last = str(group[-1]["chunk_id"]).split("-")[-1]
+
+    return {
+        "chunk_id": first if first == last else f"{first}-{last}",
+        "summary": partial.get("section_summary", ""),
+        "key_points": partial.get("section_key_points", []),
+        "key_risks_action_items": partial.get("section_risks_action_items", [])
+    }
 
 
 # MAIN ENGINE
@@ -29,9 +174,10 @@ def summarize_section_bedrock(section_chunks: List[Dict], section_id: int) -> Di
     prompt = build_section_prompt(section_chunks, section_id)
 
     try:
-        parsed = invoke_llm(
+        parsed = invoke_routed(
+            "section",
             prompt,
-            max_gen_len=settings.MAX_GEN_LEN_SECTION
+            source={"section_id": section_id, "chunks": section_chunks}
         )
 
         parsed.setdefault("section_id", section_id)
@@ -1,29 +1,29 @@
 from typing import List, Dict
 import numpy as np # type: ignore
-from sklearn.cluster import AgglomerativeClustering # type: ignore
+from scipy.cluster.hierarchy import linkage, fcluster # type: ignore
 from config import settings
 from logger import logger
-from services.bedrock_service import get_embedding
+from services.bedrock_service import get_embeddings
+from services.text_tiling import segment_embeddings
+from services.tracing import span
+from services.chunk_features import ChunkFeatures, summary_features
 
 BASE_DISTANCE_RESEARCH = settings.BASE_DISTANCE_RESEARCH
 BASE_DISTANCE_ACADEMIC = settings.BASE_DISTANCE_ACADEMIC
 MIN_CHUNKS_FOR_CLUSTERING = settings.MIN_CHUNKS_FOR_CLUSTERING
+SECTIONING_ENGINE = settings.SECTIONING_ENGINE
+
+THRESHOLD_STEP = 0.05
+MIN_DISTANCE_THRESHOLD = 0.05
+MAX_DISTANCE_THRESHOLD = 0.9
 
 # MODE-AWARE CHUNK VALIDATOR
 
-def is_strong_chunk(chunk: Dict, mode: str = "academic") -> bool:
+def is_strong_chunk(chunk: Dict, mode: str = "academic", features: ChunkFeatures = None) -> bool:
 
-    summary = chunk.get("summary", "").strip()
     key_points = chunk.get("key_points", [])
-    risks = chunk.get("key_risks_action_items", [])
-
-    combined_text = " ".join(
-        [summary] +
-        [kp for kp in key_points if isinstance(kp, str)] +
-        [r for r in risks if isinstance(r, str)]
-    ).strip()
 
-    word_count = len(combined_text.split())
+    word_count = (features or summary_features(chunk)).word_count
 
     valid_key_points = [
         kp for kp in key_points
@@ -42,15 +42,18 @@ def is_strong_chunk(chunk: Dict, mode: str = "academic") -> bool:
 
     return True
 
-# BUILD EMBEDDINGS
+def select_strong_chunks(chunk_summaries: List[Dict], mode: str = "academic") -> List[Dict]:
 
-def build_chunk_embeddings(chunk_summaries: List[Dict]):
+    return [
+        c for c in chunk_summaries
+        if is_strong_chunk(c, mode=mode)
+    ]
 
-    embeddings = []
+# BUILD EMBEDDINGS
 
-    for chunk in chunk_summaries:
+def build_chunk_embedding_text(chunk: Dict) -> str:
 
-        text = f"""
+    return f"""
         Summary:
         {chunk.get('summary','')}
 
@@ -61,10 +64,30 @@ def build_chunk_embeddings(chunk_summaries: List[Dict]):
         {' '.join(chunk.get('key_risks_action_items', []))}
         """
 
-        emb = get_embedding(text)
-        embeddings.append(emb)
 
-    embeddings = np.array(embeddings)
+def build_chunk_embeddings(chunk_summaries: List[Dict], precomputed: Dict = None):
+
+    precomputed = precomputed or {}
+
+    missing = [
+        chunk for chunk in chunk_summaries
+        if precomputed.get(chunk.get("chunk_id")) is None
+    ]
+
+    # Embed everything not already available in one backend batch
+    fresh = {}
+
+    if missing:
+        vectors = get_embeddings([build_chunk_embedding_text(c) for c in missing])
+        fresh = {c.get("chunk_id"): v for c, v in zip(missing, vectors)}
+
+    embeddings = np.array(
+        [
+            precomputed.get(c.get("chunk_id"), fresh.get(c.get("chunk_id")))
+            for c in chunk_summaries
+        ],
+        dtype=np.float32
+    )
 
     # Normalize for cosine similarity
     norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
@@ -72,12 +95,132 @@ def build_chunk_embeddings(chunk_summaries: List[Dict]):
 
     return embeddings
 
+# THRESHOLD SEARCH
+
+def _cut_tree(tree, threshold: float):
+    return fcluster(tree, t=threshold, criterion="distance")
+
+
+def _too_few_sections(num_sections: int, total_chunks: int) -> bool:
+    return num_sections == 1 and total_chunks > 6
+
+
+def _too_many_sections(num_sections: int, total_chunks: int) -> bool:
+    return num_sections > total_chunks * 0.7
+
+
+def select_threshold(tree, distance_threshold: float, total_chunks: int):
+    """
+    Finds the cut height closest to distance_threshold that satisfies the
+    section-count constraints. The number of clusters never increases as
+    the threshold grows, so the threshold grid is binary-searched on the
+    single average-linkage tree instead of re-clustering per guess.
+
+    Returns (labels, threshold, probes).
+    """
+
+    probes = 1
+    labels = _cut_tree(tree, distance_threshold)
+    num_sections = len(set(labels))
+
+    if _too_few_sections(num_sections, total_chunks):
+        logger.warning("Only 1 section formed from many chunks. Decreasing threshold.")
+        candidates = []
+        t = distance_threshold - THRESHOLD_STEP
+        while t >= MIN_DISTANCE_THRESHOLD - 1e-9:
+            candidates.append(round(t, 4))
+            t -= THRESHOLD_STEP
+        violates = _too_few_sections
+
+    elif _too_many_sections(num_sections, total_chunks):
+        logger.warning(f"{num_sections} sections formed from {total_chunks} chunks. Increasing threshold.")
+        candidates = []
+        t = distance_threshold + THRESHOLD_STEP
+        while t <= MAX_DISTANCE_THRESHOLD + 1e-9:
+            candidates.append(round(t, 4))
+            t += THRESHOLD_STEP
+        violates = _too_many_sections
+
+    else:
+        return labels, distance_threshold, probes
+
+    if not candidates:
+        return labels, distance_threshold, probes
+
+    # Binary search for the first candidate (nearest to the base threshold)
+    # that satisfies the constraint; fall back to the furthest candidate.
+    lo, hi = 0, len(candidates) - 1
+    best = None
+
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        mid_labels = _cut_tree(tree, candidates[mid])
+        probes += 1
+
+        if not violates(len(set(mid_labels)), total_chunks):
+            best = (mid_labels, candidates[mid])
+            hi = mid - 1
+        else:
+            lo = mid + 1
+
+    if best is None:
+        threshold = candidates[-1]
+        best = (_cut_tree(tree, threshold), threshold)
+        probes += 1
+
+    return best[0], best[1], probes
+
+# SECTION ASSIGNMENT
+
+def assign_section_labels(
+        embeddings: np.ndarray,
+        distance_threshold: float,
+        engine: str = None,
+        stats: Dict = None
+):
+
+    engine = (engine or SECTIONING_ENGINE).lower()
+
+    if engine == "texttiling":
+        labels = segment_embeddings(embeddings)
+
+        if stats is not None:
+            stats["engine"] = engine
+
+        return labels
+
+    if engine != "agglomerative":
+        logger.warning(f"Unknown sectioning engine '{engine}'. Using agglomerative.")
+
+    # Build the linkage tree once and search cut heights on it
+    tree = linkage(embeddings, method="average", metric="cosine")
+
+    labels, threshold, probes = select_threshold(
+        tree,
+        distance_threshold,
+        embeddings.shape[0]
+    )
+
+    logger.info(
+        f"Section threshold settled at {threshold} after {probes} probe(s) "
+        f"(base={distance_threshold})"
+    )
+
+    if stats is not None:
+        stats["engine"] = "agglomerative"
+        stats["distance_threshold"] = threshold
+        stats["threshold_probes"] = probes
+
+    return labels
+
 # SEMANTIC SECTION BUILDER 
 
 def build_semantic_sections(
         chunk_summaries: List[Dict],
         mode: str = "academic",
-        distance_threshold: float = None
+        distance_threshold: float = None,
+        stats: Dict = None,
+        precomputed_embeddings: Dict = None
 ):
 
     if not chunk_summaries:
@@ -89,10 +232,7 @@ def build_semantic_sections(
         else:
             distance_threshold = BASE_DISTANCE_ACADEMIC
 
-    strong_chunks = [
-        c for c in chunk_summaries
-        if is_strong_chunk(c, mode=mode)
-    ]
+    strong_chunks = select_strong_chunks(chunk_summaries, mode=mode)
 
     if not strong_chunks:
         logger.warning("No semantically strong chunks found.")
@@ -105,18 +245,30 @@ def build_semantic_sections(
             "covered_chunk_ids": [c["chunk_id"] for c in strong_chunks]
         }]
 
-    # Build embeddings
+    embeddings = build_chunk_embeddings(
+        strong_chunks,
+        precomputed=precomputed_embeddings
+    )
+
+    fit_stats = stats if stats is not None else {}
 
-    embeddings = build_chunk_embeddings(strong_chunks)
+    with span("sections.cluster", {
+        "cluster.chunks": len(strong_chunks),
+        "cluster.dim": int(embeddings.shape[1])
+    }) as cluster_span:
 
-    clustering = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=distance_threshold,
-        metric="cosine",
-        linkage="average"
-    )
+        labels = assign_section_labels(
+            embeddings,
+            distance_threshold,
+            stats=fit_stats
+        )
 
-    labels = clustering.fit_predict(embeddings)
+        cluster_span.set_attributes({
+            "cluster.engine": fit_stats.get("engine"),
+            "cluster.distance_threshold": fit_stats.get("distance_threshold"),
+            "cluster.threshold_probes": fit_stats.get("threshold_probes"),
+            "cluster.sections": len(set(labels))
+        })
 
     sections = {}
 
@@ -138,27 +290,4 @@ def build_semantic_sections(
             "covered_chunk_ids": [c["chunk_id"] for c in chunks]
         })
 
-    num_sections = len(semantic_sections)
-    total_chunks = len(strong_chunks)
-
-    if num_sections == 1 and total_chunks > 6:
-        logger.warning("Only 1 section formed from many chunks. Decreasing threshold.")
-        new_threshold = max(0.05, distance_threshold - 0.05)
-        if new_threshold != distance_threshold:
-            return build_semantic_sections(
-                strong_chunks,
-                mode=mode,
-                distance_threshold=new_threshold
-            )
-        
-    if num_sections > total_chunks * 0.7:
-        logger.warning(f"{num_sections} sections formed from {total_chunks} chunks. Increasing threshold.")
-        new_threshold = min(0.9, distance_threshold + 0.05)
-        if new_threshold != distance_threshold:
-            return build_semantic_sections(
-                strong_chunks,
-                mode=mode,
-                distance_threshold=new_threshold
-            )
-
     return semantic_sections
@@ -0,0 +1,473 @@
+import uuid
+from typing import Dict, Sequence
+from config import settings
+from logger import logger, log_context, log_field
+from services.pipeline import Pipeline, PipelineNode
+from services.ingestion import ingest_document
+from services.chunking import chunk_text
+from services.summarizer import summarize_chunks
+from services.section_summarizer import summarize_sections
+from services.executive_summarizer import generate_executive_summary, safe_fallback
+from services.checkpoint_store import get_checkpoint_store
+from services.admission import get_admission_controller, RequestAdmission
+from services.semantic_section_builder import (
+    build_semantic_sections,
+    build_chunk_embeddings,
+    select_strong_chunks
+)
+from services.document_assembler import assemble_document
+from services.meaning_evaluator import compute_meaning_breakdown
+from services.embedding_pipeline import EmbeddingPipeline
+from services.response_encoder import dump_exclusions, normalize_detail
+from services.tracing import span, current_trace_id
+from services.model_router import track_routing, current_routing
+from services.profiling import profile_request
+from services.vector_index import get_vector_index, document_items, document_id_for
+from services.concurrency import (
+    get_shared_executor,
+    current_executor,
+    use_executor,
+    stage_executor
+)
+
+EXECUTIVE_FAILURE = {
+    "executive_summary": "Executive summary failed.",
+    "key_points": [],
+    "risks_action_items": [],
+    "tldr": "Executive TLDR unavailable."
+}
+
+MEANING_DEFAULT = {"score": 0.0, "sections": []}
+
+# STAGES
+
+def ingest_stage(file):
+    return {"document_data": ingest_document(file)}
+
+
+def chunk_stage(document_data):
+
+    # Heuristic features are collected while chunking, once per chunk
+    features = []
+    chunks = chunk_text(document_data["text"], features=features)
+
+    return {"chunks": chunks, "chunk_features": features}
+
+
+def admit_stage(chunks, chunk_features, admission):
+
+    # Waits for token budget, or raises 429 with Retry-After. Runs inline
+    # on the request thread: a queued request must not pin a stage thread
+    admission.admit(chunks, chunk_features)
+    return {"admitted_chunks": chunks}
+
+
+def chunk_summarize_stage(admitted_chunks, chunk_features, mode, checkpoint):
+
+    chunks = admitted_chunks
+
+    embedding_pipeline = EmbeddingPipeline(mode=mode) if settings.PIPELINED_EMBEDDING else None
+    completed = {}
+
+    if checkpoint is not None:
+        keys = {
+            idx: checkpoint.chunk_key(idx, chunk, mode, current_routing().backend)
+            for idx, chunk in enumerate(chunks, start=1)
+        }
+        completed = checkpoint.load_chunk_results(keys)
+
+    def on_result(result):
+
+        # Empty summaries may be transient failures; leave them to the retry
+        if checkpoint is not None and result["summary"] and result["chunk_id"] not in completed and not_degraded(result):
+            checkpoint.save_chunk_result(keys[result["chunk_id"]], result)
+
+        if embedding_pipeline is not None:
+            embedding_pipeline.submit(result)
+
+    chunk_summaries = summarize_chunks(
+        chunks,
+        mode=mode,
+        on_result=on_result,
+        completed=completed,
+        features=chunk_features
+    )
+
+    return {
+        "chunk_summaries": chunk_summaries,
+        "embedding_pipeline": embedding_pipeline
+    }
+
+
+def embed_stage(chunk_summaries, embedding_pipeline, mode):
+
+    precomputed = embedding_pipeline.collect() if embedding_pipeline else {}
+    strong_chunks = select_strong_chunks(chunk_summaries, mode=mode)
+
+    if len(strong_chunks) < settings.MIN_CHUNKS_FOR_CLUSTERING:
+        return {"chunk_embeddings": precomputed}
+
+    # Fill in anything the pipelined embedder missed
+    embeddings = build_chunk_embeddings(strong_chunks, precomputed=precomputed)
+
+    return {
+        "chunk_embeddings": {
+            c["chunk_id"]: vector
+            for c, vector in zip(strong_chunks, embeddings)
+        }
+    }
+
+
+def cluster_stage(chunk_summaries, chunk_embeddings, mode):
+
+    section_build_stats = {}
+
+    semantic_sections = build_semantic_sections(
+        chunk_summaries,
+        mode=mode,
+        stats=section_build_stats,
+        precomputed_embeddings=chunk_embeddings
+    )
+
+    return {
+        "semantic_sections": semantic_sections,
+        "section_build_stats": section_build_stats
+    }
+
+
+def section_summarize_stage(semantic_sections):
+
+    section_reduce_stats = {}
+
+    section_summaries = summarize_sections(
+        semantic_sections,
+        stats=section_reduce_stats
+    )
+
+    return {
+        "section_summaries": section_summaries,
+        "section_reduce_stats": section_reduce_stats
+    }
+
+
+def executive_stage(section_summaries, mode):
+
+    executive_budget_stats = {}
+
+    try:
+        # High priority: one call that gates the response, never queued
+        # behind other requests' bulk chunk work
+        with stage_executor(1, priority="high") as executor:
+            executive_summary = executor.submit(
+                generate_executive_summary,
+                section_summaries,
+                mode=mode,
+                stats=executive_budget_stats
+            ).result()
+
+        executive_summary.setdefault(
+            "tldr",
+            "Executive TLDR generation failed."
+        )
+
+    except Exception as e:
+        logger.warning(f"Executive generation failed: {str(e)}")
+        executive_summary = dict(EXECUTIVE_FAILURE)
+
+    return {
+        "executive_summary": executive_summary,
+        "executive_budget_stats": executive_budget_stats
+    }
+
+
+def executive_failed(executive_summary: Dict) -> bool:
+
+    # Skipped (EXECUTIVE_FAILURE default), failed, or the model fallback
+    text = executive_summary.get("executive_summary")
+    return text in (EXECUTIVE_FAILURE["executive_summary"], safe_fallback()["executive_summary"])
+
+
+def executive_succeeded(outputs: Dict) -> bool:
+    return not executive_failed(outputs["executive_summary"]) and not_degraded(outputs)
+
+
+def not_degraded(outputs: Dict) -> bool:
+
+    # Results from a run that fell back to the local backend are not kept,
+    # so a retry once Bedrock is back redoes them properly
+    routing = current_routing()
+    return routing is None or not routing.degraded
+
+
+def index_stage(document_data, chunk_summaries, chunk_embeddings, semantic_sections, section_summaries):
+
+    if not settings.VECTOR_INDEX_ENABLED:
+        return {"index_stats": {}}
+
+    # Search is a side feature: never fail the summary over it
+    try:
+        index_stats = get_vector_index().add_document(
+            document_id_for(document_data),
+            document_data.get("document_name"),
+            document_items(chunk_summaries, chunk_embeddings, section_summaries, semantic_sections)
+        )
+    except Exception as e:
+        logger.warning(f"Vector indexing failed: {str(e)}")
+        index_stats = {"error": str(e)}
+
+    return {"index_stats": index_stats}
+
+
+def assemble_stage(executive_summary, section_summaries, chunk_summaries, chunks):
+
+    final_output = assemble_document(
+        executive_output=executive_summary,
+        section_outputs=section_summaries,
+        chunk_outputs=chunk_summaries,
+        total_chunks=len(chunks)
+    )
+
+    return {"final_output": final_output}
+
+
+def meaning_stage(section_summaries, executive_summary):
+
+    # No executive text to measure: report the default, not a score of
+    # the placeholder message
+    if executive_failed(executive_summary):
+        return {"meaning": dict(MEANING_DEFAULT)}
+
+    meaning = compute_meaning_breakdown(
+        section_summaries,
+        executive_summary.get("executive_summary", "")
+    )
+
+    return {"meaning": meaning}
+
+
+# GRAPH
+
+SUMMARIZATION_PIPELINE = Pipeline([
+    PipelineNode("ingest", ingest_stage, ["file"], ["document_data"]),
+    PipelineNode("chunk", chunk_stage, ["document_data"], ["chunks", "chunk_features"]),
+    PipelineNode(
+        "admit",
+        admit_stage,
+        ["chunks", "chunk_features", "admission"],
+        ["admitted_chunks"],
+        inline=True
+    ),
+    PipelineNode(
+        "chunk_summarize",
+        chunk_summarize_stage,
+        ["admitted_chunks", "chunk_features", "mode", "checkpoint"],
+        ["chunk_summaries", "embedding_pipeline"],
+        checkpoint=["admitted_chunks", "mode", "backend"],
+        checkpoint_when=not_degraded,
+        transient=["embedding_pipeline"]
+    ),
+    PipelineNode(
+        "embed",
+        embed_stage,
+        ["chunk_summaries", "embedding_pipeline", "mode"],
+        ["chunk_embeddings"],
+        checkpoint=["chunk_summaries", "mode"]
+    ),
+    PipelineNode(
+        "cluster",
+        cluster_stage,
+        ["chunk_summaries", "chunk_embeddings", "mode"],
+        ["semantic_sections", "section_build_stats"],
+        checkpoint=["chunk_summaries", "chunk_embeddings", "mode"]
+    ),
+    PipelineNode(
+        "section_summarize",
+        section_summarize_stage,
+        ["semantic_sections"],
+        ["section_summaries", "section_reduce_stats"],
+        checkpoint=["semantic_sections", "backend"],
+        checkpoint_when=not_degraded
+    ),
+    PipelineNode(
+        "executive",
+        executive_stage,
+        ["section_summaries", "mode"],
+        ["executive_summary", "executive_budget_stats"],
+        defaults={"executive_summary": EXECUTIVE_FAILURE, "executive_budget_stats": {}},
+        checkpoint=["section_summaries", "mode", "backend"],
+        checkpoint_when=executive_succeeded
+    ),
+    PipelineNode(
+        "index",
+        index_stage,
+        ["document_data", "chunk_summaries", "chunk_embeddings", "semantic_sections", "section_summaries"],
+        ["index_stats"],
+        defaults={"index_stats": {}}
+    ),
+    PipelineNode(
+        "assemble",
+        assemble_stage,
+        ["executive_summary", "section_summaries", "chunk_summaries", "chunks"],
+        ["final_output"]
+    ),
+    PipelineNode(
+        "meaning",
+        meaning_stage,
+        ["section_summaries", "executive_summary"],
+        ["meaning"],
+        defaults={"meaning": MEANING_DEFAULT},
+        checkpoint=["section_summaries", "executive_summary"]
+    ),
+])
+
+# PUBLIC ENTRY
+
+def run_summarization_pipeline(
+    file,
+    mode: str = "academic",
+    skip: Sequence[str] = (),
+    detail: str = "full",
+    weight: float = 1.0,
+    run_id: str = None,
+    prepared: Dict = None,
+    backend: str = None,
+    profile: str = None,
+    patient_admission: bool = False
+) -> Dict:
+    """
+    Runs one document through the stage graph. Unless the caller already
+    scoped an executor, the request gets its own lane (with `weight`) on the
+    process-wide executor, so all its model and embedding calls share the
+    global concurrency cap fairly with other requests.
+
+    Intermediate results are checkpointed under `run_id`; running again
+    with the same run_id only redoes work whose inputs changed.
+
+    `prepared` holds outputs computed elsewhere (document_data, chunks,
+    chunk_features from the offline batch's process pool); the stages that
+    produce them are not run and `file` may be None.
+
+    `backend` picks the LLM backend for this run ("bedrock", "extractive");
+    by default LLM_BACKEND.
+
+    `profile` ("basic", "memory" or "cprofile") records per-stage CPU / memory and
+    per-call queue wait into performance.profile (see services.profiling).
+
+    `patient_admission` queues for the token budget without a timeout or
+    429 (batch documents, already accepted as part of one request).
+    """
+
+    prepared = prepared or {}
+    document_name = getattr(file, "filename", None) or prepared.get("document_data", {}).get("document_name")
+
+    if mode not in ["academic", "research"]:
+        mode = "academic"
+
+    # One id per document run: a batch's documents share the request id,
+    # but each needs its own executor lane and profile
+    run_key = uuid.uuid4().hex[:12]
+
+    with span("summarize_document", {
+        "document.name": document_name,
+        "summarize.mode": mode,
+        "summarize.detail": detail,
+        "summarize.skip": ",".join(skip)
+    }) as document_span, log_context(
+        request_id=log_field("request_id") or uuid.uuid4().hex[:12],
+        trace_id=current_trace_id()
+    ), track_routing(mode, backend) as routing_stats, profile_request(
+        profile, f"{log_field('request_id')[:48]}-{run_key}", log_field("request_id")
+    ) as request_profile:
+
+        checkpoint = get_checkpoint_store().run(run_id) if settings.CHECKPOINT_ENABLED else None
+        admission = RequestAdmission(get_admission_controller(), patient=patient_admission)
+        inputs = {
+            "file": file,
+            "mode": mode,
+            "checkpoint": checkpoint,
+            "admission": admission,
+            # Part of the LLM stages' checkpoint keys: an extractive run's
+            # results must not be restored into a Bedrock run
+            "backend": routing_stats.backend,
+            **prepared
+        }
+
+        try:
+            if current_executor() is not None:
+                run = SUMMARIZATION_PIPELINE.run(inputs, skip=skip, checkpoint=checkpoint)
+            else:
+                lane = get_shared_executor().lane(f"run-{run_key}", weight)
+
+                try:
+                    with use_executor(lane):
+                        run = SUMMARIZATION_PIPELINE.run(inputs, skip=skip, checkpoint=checkpoint)
+                finally:
+                    lane.close()
+        finally:
+            admission.release()
+
+        document_span.set_attributes({
+            "document.chunks": len(run["values"]["chunks"]),
+            "pipeline.critical_path": ",".join(run["critical_path"])
+        })
+
+        response = build_response(run, mode, detail=detail)
+        response["performance"]["model_routing"] = routing_stats.summary()
+        response["performance"]["trace_id"] = current_trace_id()
+
+        response["performance"]["admission"] = admission.summary()
+
+        if checkpoint is not None:
+            response["performance"]["checkpoint"] = checkpoint.summary()
+
+        if request_profile is not None:
+            response["performance"]["profile"] = request_profile.finish()
+
+    return response
+
+
+def build_response(run: Dict, mode: str, detail: str = "full") -> Dict:
+
+    values = run["values"]
+    timings = run["timings"]
+
+    def stage_time(name):
+        return round(timings.get(name, {}).get("duration_sec", 0.0), 2)
+
+    embedding_pipeline = values["embedding_pipeline"]
+    section_build_stats = values["section_build_stats"]
+    section_reduce_stats = values["section_reduce_stats"]
+    meaning = values["meaning"]
+
+    # FinalOutput was validated at assembly; dump only what was asked for
+    detail = normalize_detail(detail)
+    response = values["final_output"].model_dump(exclude=dump_exclusions(detail))
+
+    response["performance"] = {
+        "ingestion_time_sec": stage_time("ingest"),
+        "chunking_time_sec": stage_time("chunk"),
+        "chunk_count": len(values["chunks"]),
+        "chunk_summarization_time_sec": stage_time("chunk_summarize"),
+        "section_build_time_sec": round(stage_time("embed") + stage_time("cluster"), 2),
+        "section_engine": section_build_stats.get("engine"),
+        "section_threshold": section_build_stats.get("distance_threshold"),
+        "section_threshold_probes": section_build_stats.get("threshold_probes", 0),
+        "embedding_overlap": embedding_pipeline.stats if embedding_pipeline else {},
+        "section_summarization_time_sec": stage_time("section_summarize"),
+        "section_reduce_max_depth": section_reduce_stats.get("max_depth", 0),
+        "section_reduce_max_fan_out": section_reduce_stats.get("max_fan_out", 0),
+        "executive_time_sec": stage_time("executive"),
+        "executive_input_budget": values["executive_budget_stats"],
+        "meaning_coverage_time_sec": stage_time("meaning"),
+        "vector_index": values["index_stats"],
+        "total_time_sec": round(run["total_sec"], 2),
+        "stages": timings,
+        "critical_path": run["critical_path"]
+    }
+
+    response["document_summary"]["meaning_coverage_score"] = meaning["score"]
+    response["document_summary"]["meaning_coverage_by_section"] = meaning["sections"]
+    response["document_summary"]["mode_used"] = mode
+    response["document_summary"]["detail"] = detail
+
+    return response
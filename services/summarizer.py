@@ -1,50 +1,60 @@
 import json
 import time
 import re
-from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Callable
+from concurrent.futures import as_completed
 from config import settings
-from logger import logger
+from logger import logger, log_context
 from prompts.chunk import build_chunk_summary_prompt
-from services.bedrock_service import invoke_llm
+from services.model_router import invoke_routed, current_routing
+from services.chunk_broker import get_chunk_broker
+from services.concurrency import stage_executor
+from services.tracing import span
+from services.chunk_features import ChunkFeatures, extract_features
 
 MAX_WORKERS = settings.MAX_WORKERS
 
 
 # LOW INFORMATION DETECTOR 
 
-def is_low_information_chunk(text: str) -> bool:
+def is_low_information_chunk(text: str, features: ChunkFeatures = None) -> bool:
 
-    if not text or not text.strip():
+    features = features or extract_features(text)
+
+    if features.word_count == 0:
         return True
 
     # Table override
-    if looks_like_table(text):
+    if features.is_table:
         return False
 
-    if len(text.split()) < 40:
+    if features.word_count < 40:
         return True
 
-    if re.search(r"\[\d+\]", text) and len(text.split()) < 80:
+    if features.citation_count and features.word_count < 80:
         return True
 
-    lines = text.splitlines()
-    short_lines = sum(1 for l in lines if len(l.split()) < 5)
-
-    if short_lines > len(lines) * 0.65:
+    if features.short_lines > features.line_count * 0.65:
         return True
 
     return False
 
 # GROUNDEDNESS CHECK
 
-def is_grounded(summary: str, source_text: str, mode: str = "research") -> bool:
+def is_grounded(
+    summary: str,
+    source_text: str,
+    mode: str = "research",
+    features: ChunkFeatures = None
+) -> bool:
 
     if not summary.strip():
         return False
 
+    features = features or extract_features(source_text)
+
     summary_lower = summary.lower()
-    source_lower = source_text.lower()
+    source_lower = features.lowered
 
     # -------- Phrase grounding --------
     summary_words = summary_lower.split()
@@ -69,9 +79,10 @@ def is_grounded(summary: str, source_text: str, mode: str = "research") -> bool:
         if len(word) > 6
     ]
 
+    # Whole-word hits skip the substring scan
     keyword_matches = [
         word for word in keywords
-        if word in source_lower
+        if word in features.term_set or word in source_lower
     ]
 
     keyword_ratio = len(keyword_matches) / len(keywords) if keywords else 0
@@ -112,40 +123,37 @@ def deduplicate(items):
 
     return result
 
-def looks_like_table(text: str) -> bool:
+def looks_like_table(text: str, features: ChunkFeatures = None) -> bool:
 
-    lines = text.splitlines()
-
-    if len(lines) < 3:
-        return False
+    # Many structured rows AND numeric content → table
+    return (features or extract_features(text)).is_table
 
-    numeric_lines = 0
-    structured_lines = 0
+def _process_single_chunk(idx, chunk, total_chunks, mode, features=None):
 
-    for line in lines:
-        tokens = line.strip().split()
+    features = features or extract_features(chunk)
 
-        # Many columns
-        if len(tokens) >= 3:
-            structured_lines += 1
+    with log_context(chunk_id=idx), span("chunk.summarize", {
+        "chunk.id": idx,
+        "chunk.chars": len(chunk),
+        "chunk.words": features.word_count,
+        "summarize.mode": mode
+    }) as chunk_span:
 
-        # Contains numbers or percentages
-        if re.search(r"\d", line):
-            numeric_lines += 1
+        result = _summarize_chunk(idx, chunk, total_chunks, mode, chunk_span, features)
+        chunk_span.set_attribute("chunk.kept", bool(result["summary"]))
 
-    # If many structured rows AND numeric content → table
-    if structured_lines >= len(lines) * 0.6 and numeric_lines >= 2:
-        return True
+        return result
 
-    return False
 
-def _process_single_chunk(idx, chunk, total_chunks, mode):
+def _summarize_chunk(idx, chunk, total_chunks, mode, chunk_span, features):
 
     logger.info(f"Processing chunk {idx}/{total_chunks} (mode={mode})")
 
     try:
 
-        if is_low_information_chunk(chunk):
+        if is_low_information_chunk(chunk, features):
+            chunk_span.set_attribute("chunk.low_information", True)
+
             if mode == "research":
                 logger.info(f"Chunk {idx} identified as low-information. Discarding.")
                 return {
@@ -157,14 +165,18 @@ def _process_single_chunk(idx, chunk, total_chunks, mode):
             else:
                 logger.info(f"Chunk {idx} identified as low-information. Keeping (academic mode).")
 
-        parsed = invoke_llm(
-        build_chunk_summary_prompt(chunk, idx),
-        max_gen_len=settings.MAX_GEN_LEN_CHUNK
+        parsed = invoke_routed(
+            "chunk",
+            build_chunk_summary_prompt(chunk, idx),
+            is_table=features.is_table,
+            accept=lambda p: is_grounded(p.get("summary", "").strip(), chunk, mode=mode, features=features),
+            source={"chunk_id": idx, "text": chunk}
         )
 
         summary = parsed.get("summary", "").strip()
 
-        if not is_grounded(summary, chunk, mode=mode):
+        if not is_grounded(summary, chunk, mode=mode, features=features):
+            chunk_span.set_attribute("chunk.grounded", False)
 
             if mode == "research":
                 logger.warning(f"Chunk {idx} summary failed groundedness check. Discarding.")
@@ -191,6 +203,7 @@ def _process_single_chunk(idx, chunk, total_chunks, mode):
         }
 
     except Exception as e:
+        chunk_span.record_exception(e)
         logger.warning(f"Chunk {idx} processing failed: {str(e)}")
 
         return {
@@ -202,23 +215,131 @@ def _process_single_chunk(idx, chunk, total_chunks, mode):
 
 # PUBLIC SUMMARIZER
 
-def summarize_chunks(chunks: List[str], mode: str = "academic") -> List[Dict]:
+def summarize_chunks(
+    chunks: List[str],
+    mode: str = "academic",
+    on_result: Callable[[Dict], None] = None,
+    completed: Dict[int, Dict] = None,
+    features: List[ChunkFeatures] = None
+) -> List[Dict]:
+    """
+    `completed` holds results (by chunk_id) recovered from a checkpoint;
+    those chunks are not summarized again but still go through on_result.
+    `features` are the chunker's per-chunk features, when available.
+
+    With CHUNK_BROKER_ENABLED the chunks are summarized by chunk worker
+    processes (services.chunk_worker) instead of this process's threads;
+    results are still returned in chunk order.
+    """
 
     total_chunks = len(chunks)
-    print(f"\nProcessing {total_chunks} chunks (mode={mode})\n")
+    completed = completed or {}
+    logger.info(f"Processing {total_chunks} chunks (mode={mode}, {len(completed)} restored)")
 
     results = [None] * total_chunks
-    MAX_WORKERS = settings.MAX_WORKERS  
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    def deliver(result):
+
+        results[result["chunk_id"] - 1] = result
+
+        # Hand each result downstream as soon as it lands
+        if on_result is not None:
+            on_result(result)
+
+    for result in completed.values():
+        deliver(result)
+
+    pending = [idx for idx in range(1, total_chunks + 1) if idx not in completed]
+
+    if settings.CHUNK_BROKER_ENABLED and pending:
+        pending = _summarize_via_broker(chunks, pending, mode, deliver)
+
+    _summarize_in_process(chunks, pending, mode, features, deliver)
+
+    return results
+
+
+def _summarize_in_process(chunks, chunk_ids, mode, features, deliver):
+
+    if not chunk_ids:
+        return
+
+    # Bulk priority: section and executive calls of in-flight requests go first
+    with stage_executor(MAX_WORKERS, priority="bulk") as executor:
 
         futures = [
-            executor.submit(_process_single_chunk, idx, chunk, total_chunks, mode)
-            for idx, chunk in enumerate(chunks, start=1)
+            executor.submit(
+                _process_single_chunk,
+                idx,
+                chunks[idx - 1],
+                len(chunks),
+                mode,
+                features[idx - 1] if features else None
+            )
+            for idx in chunk_ids
         ]
 
         for future in as_completed(futures):
-            result = future.result()
-            results[result["chunk_id"] - 1] = result
+            deliver(future.result())
+
+
+def _summarize_via_broker(chunks, chunk_ids, mode, deliver) -> List[int]:
+    """
+    Puts the chunks on the chunk broker for worker processes and delivers
+    their results as they finish. Returns the chunk ids left to summarize
+    in process: tasks that failed on the workers, or all outstanding ones
+    when no worker is alive.
+    """
+
+    broker = get_chunk_broker()
+    routing = current_routing()
+    backend = routing.backend if routing is not None else None
+
+    tasks = {
+        broker.task_key(idx, chunks[idx - 1], mode, backend): {
+            "chunk_id": idx,
+            "chunk": chunks[idx - 1],
+            "total_chunks": len(chunks),
+            "mode": mode,
+            "backend": backend
+        }
+        for idx in chunk_ids
+    }
+
+    reused = broker.submit([{"task_key": key, **task} for key, task in tasks.items()])
+
+    for result in reused.values():
+        deliver(result)
+
+    remaining = set(tasks) - set(reused)
+    left_over = []
+
+    logger.info(f"Brokered {len(remaining)} chunk tasks ({len(reused)} results reused)")
+
+    while remaining:
+        for row in broker.finished(remaining):
+            remaining.discard(row["task_key"])
+
+            if row["status"] != "done":
+                logger.warning(f"Chunk task {tasks[row['task_key']]['chunk_id']} failed on workers: {row['error']}")
+                left_over.append(tasks[row["task_key"]]["chunk_id"])
+                continue
+
+            if routing is not None and row["routing"]:
+                routing.merge(row["routing"])
+
+            deliver(row["result"])
+
+        if not remaining:
+            break
+
+        if not broker.live_workers():
+            logger.warning(f"No live chunk workers; summarizing {len(remaining)} chunks in process")
+            broker.cancel(remaining)
+            left_over.extend(tasks[key]["chunk_id"] for key in remaining)
+            break
+
+        time.sleep(settings.CHUNK_BROKER_POLL_SEC)
+
+    return sorted(left_over)
 
-    return results
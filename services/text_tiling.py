@@ -0,0 +1,96 @@
+import numpy as np # type: ignore
+from config import settings
+
+TEXTTILING_WINDOW = settings.TEXTTILING_WINDOW
+
+# ADJACENT BLOCK SIMILARITY
+
+def block_similarities(embeddings: np.ndarray, window: int = TEXTTILING_WINDOW) -> np.ndarray:
+    """
+    Cosine similarity across every gap between consecutive chunks, comparing
+    the summed vectors of up to `window` chunks on each side. Uses a prefix
+    sum so the cost is O(n * d) regardless of the window size.
+    """
+
+    n = embeddings.shape[0]
+
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    prefix = np.zeros((n + 1, embeddings.shape[1]), dtype=np.float32)
+    np.cumsum(embeddings, axis=0, out=prefix[1:])
+
+    gaps = np.arange(1, n)
+    left_start = np.maximum(gaps - window, 0)
+    right_end = np.minimum(gaps + window, n)
+
+    left = prefix[gaps] - prefix[left_start]
+    right = prefix[right_end] - prefix[gaps]
+
+    numerator = np.einsum("ij,ij->i", left, right)
+    denominator = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+
+    return numerator / np.maximum(denominator, 1e-10)
+
+# DEPTH SCORES
+
+def depth_scores(similarities: np.ndarray) -> np.ndarray:
+    """
+    Hearst-style depth of each similarity valley: how far the score climbs
+    to the nearest peak on either side. Peaks are carried forward with a
+    single pass in each direction.
+    """
+
+    m = len(similarities)
+
+    left_peak = similarities.copy()
+    for i in range(1, m):
+        if similarities[i - 1] >= similarities[i]:
+            left_peak[i] = left_peak[i - 1]
+
+    right_peak = similarities.copy()
+    for i in range(m - 2, -1, -1):
+        if similarities[i + 1] >= similarities[i]:
+            right_peak[i] = right_peak[i + 1]
+
+    return (left_peak - similarities) + (right_peak - similarities)
+
+# SEGMENTATION
+
+def segment_embeddings(embeddings: np.ndarray, window: int = TEXTTILING_WINDOW) -> np.ndarray:
+    """
+    Splits document-ordered chunk embeddings into contiguous sections and
+    returns one label per chunk. Boundaries are placed at local maxima of
+    the depth score above the mean depth, then clipped to the same
+    section-count constraints the agglomerative engine enforces.
+    """
+
+    n = embeddings.shape[0]
+
+    if n < 2:
+        return np.zeros(n, dtype=np.int64)
+
+    similarities = block_similarities(embeddings, window=window)
+    depths = depth_scores(similarities)
+
+    cutoff = depths.mean()
+
+    padded = np.concatenate(([-np.inf], depths, [-np.inf]))
+    is_local_max = (depths >= padded[:-2]) & (depths >= padded[2:])
+
+    candidates = np.flatnonzero(is_local_max & (depths > cutoff) & (depths > 0))
+
+    # Keep sections <= 70% of chunks, and force a split on long documents
+    max_boundaries = max(int(n * 0.7) - 1, 0)
+
+    if len(candidates) > max_boundaries:
+        strongest = np.argsort(depths[candidates])[::-1][:max_boundaries]
+        candidates = np.sort(candidates[strongest])
+
+    if len(candidates) == 0 and n > 6:
+        candidates = np.array([int(np.argmax(depths))])
+
+    boundaries = np.zeros(n, dtype=np.int64)
+    boundaries[candidates + 1] = 1
+
+    return np.cumsum(boundaries)
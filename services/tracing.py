@@ -0,0 +1,399 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config import settings
+from logger import logger
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# SPANS
+
+class SpanContext:
+    """
+    Identity of a span. Also stands in for spans that are not recorded
+    (unsampled traces, remote parents), so instrumented code never has to
+    check whether tracing is on.
+    """
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, attributes: Dict):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+
+class Span(SpanContext):
+
+    __slots__ = (
+        "parent_id", "name", "kind", "start_ns", "end_ns",
+        "attributes", "events", "status_code", "status_message"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: int = SPAN_KIND_INTERNAL):
+        super().__init__(trace_id, _new_id(8), True)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.events = []
+        self.status_code = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException):
+
+        self.events.append({
+            "name": "exception",
+            "timeUnixNano": str(time.time_ns()),
+            "attributes": _otlp_attributes({
+                "exception.type": type(exc).__name__,
+                "exception.message": str(exc)[:500]
+            })
+        })
+        self.status_code = STATUS_ERROR
+        self.status_message = str(exc)[:200]
+
+    def to_otlp(self) -> Dict:
+
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code}
+        }
+
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+
+        if self.events:
+            span["events"] = self.events
+
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+
+        return span
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def _otlp_value(value) -> Dict:
+
+    if isinstance(value, bool):
+        return {"boolValue": value}
+
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+# SPAN API
+
+def current_span() -> Optional[SpanContext]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+
+    parent = _current_span.get()
+    return parent.trace_id if parent is not None and parent.sampled else None
+
+
+def parse_traceparent(header: str) -> Optional[SpanContext]:
+    """
+    Reads a W3C `traceparent` header (00-<trace>-<span>-<flags>), so a
+    caller's trace and sampling decision carry over into ours.
+    """
+
+    parts = (header or "").strip().split("-")
+
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+
+    return SpanContext(parts[1], parts[2], sampled)
+
+
+@contextmanager
+def span(
+    name: str,
+    attributes: Dict = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    parent: SpanContext = None
+):
+    """
+    Opens a child of the current span (or of `parent`). Without a parent it
+    starts a new trace, sampled at TRACE_SAMPLE_RATE; every span under an
+    unsampled root is a no-op.
+    """
+
+    parent = parent or _current_span.get()
+
+    if parent is None:
+        sampled = _processor() is not None and random.random() < settings.TRACE_SAMPLE_RATE
+        parent_id = None
+        trace_id = _new_id(16)
+    else:
+        sampled = parent.sampled and _processor() is not None
+        parent_id = parent.span_id
+        trace_id = parent.trace_id
+
+    if not sampled:
+        # Carry the decision down so children don't re-sample
+        token = _current_span.set(parent or SpanContext(trace_id, _new_id(8), False))
+
+        try:
+            yield _current_span.get()
+        finally:
+            _current_span.reset(token)
+
+        return
+
+    current = Span(name, trace_id, parent_id, kind)
+    current.set_attributes(attributes or {})
+    token = _current_span.set(current)
+
+    try:
+        yield current
+
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        _processor().on_end(current)
+
+# EXPORTERS
+
+def _export_request(spans: List[Span]) -> Dict:
+
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": _otlp_attributes({
+                    "service.name": settings.TRACE_SERVICE_NAME,
+                    "process.pid": os.getpid()
+                })
+            },
+            "scopeSpans": [{
+                "scope": {"name": "genai_summarizer"},
+                "spans": [s.to_otlp() for s in spans]
+            }]
+        }]
+    }
+
+
+class FileSpanExporter:
+    """
+    Appends one OTLP/JSON export request per line, the same layout the
+    OpenTelemetry collector's file exporter writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, spans: List[Span]):
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(_export_request(spans), separators=(",", ":")) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """
+    Posts OTLP/JSON to a collector's /v1/traces endpoint.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def export(self, spans: List[Span]):
+
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(_export_request(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+# BATCH PROCESSOR
+
+class BatchSpanProcessor:
+    """
+    Finished spans go onto a bounded queue and are exported in batches by
+    a background thread, so request threads never wait on I/O. Spans are
+    dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self, exporter, max_queue: int, batch_size: int, interval_sec: float):
+
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval_sec = interval_sec
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first: Span = None) -> List[Span]:
+
+        batch = [first] if first is not None else []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _export(self, batch: List[Span]):
+
+        if not batch:
+            return
+
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Trace export of {len(batch)} spans failed: {str(e)}")
+
+    def _run(self):
+
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.interval_sec)
+            except queue.Empty:
+                continue
+
+            self._export(self._drain(first))
+
+        # Flush whatever is left on shutdown
+        while not self._queue.empty():
+            self._export(self._drain())
+
+    def shutdown(self):
+
+        self._stop.set()
+        self._thread.join(timeout=10)
+
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} spans (export queue full)")
+
+# PROVIDER
+
+_span_processor = None
+_processor_lock = threading.Lock()
+_processor_ready = False
+
+
+def _build_exporter():
+
+    exporter = settings.TRACE_EXPORTER.lower()
+
+    if exporter == "file":
+        return FileSpanExporter(settings.TRACE_FILE_PATH)
+
+    if exporter == "otlp":
+        return OtlpHttpSpanExporter(settings.TRACE_OTLP_ENDPOINT)
+
+    if exporter != "none":
+        logger.warning(f"Unknown trace exporter '{exporter}'. Tracing disabled.")
+
+    return None
+
+
+def _processor() -> Optional[BatchSpanProcessor]:
+
+    global _span_processor, _processor_ready
+
+    if not _processor_ready:
+        with _processor_lock:
+            if not _processor_ready:
+                exporter = _build_exporter()
+
+                if exporter is not None:
+                    _span_processor = BatchSpanProcessor(
+                        exporter,
+                        max_queue=settings.TRACE_MAX_QUEUE,
+                        batch_size=settings.TRACE_EXPORT_BATCH_SIZE,
+                        interval_sec=settings.TRACE_EXPORT_INTERVAL_SEC
+                    )
+
+                _processor_ready = True
+
+    return _span_processor
+
+
+def shutdown_tracing():
+
+    global _span_processor, _processor_ready
+
+    with _processor_lock:
+        processor, _span_processor = _span_processor, None
+        _processor_ready = False
+
+    if processor is not None:
+        processor.shutdown()
@@ -0,0 +1,607 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+import numpy as np # type: ignore
+from config import settings
+from logger import logger
+from services.checkpoint_store import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    item_id TEXT PRIMARY KEY,
+    space TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    document_name TEXT,
+    ref_id INTEGER,
+    text TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vectors_document ON vectors (document_id);
+CREATE INDEX IF NOT EXISTS idx_vectors_space ON vectors (space);
+"""
+
+KINDS = ("section", "chunk")
+
+# Deleted rows are compacted away once they are half of a large matrix
+COMPACT_MIN_ROWS = 1024
+
+# IVF training: sample per list, Lloyd iterations, assignment batch size
+TRAIN_POINTS_PER_LIST = 32
+KMEANS_ITERATIONS = 10
+ASSIGN_BATCH = 8192
+
+QUERY_LATENCY_WINDOW = 1000
+
+# Documents re-read per query when syncing writes from other processes
+SYNC_BATCH = 500
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-10)
+
+# EXACT INDEX
+
+class FlatIndex:
+    """
+    Exact cosine search: unit vectors in a growable matrix, scored with
+    one matrix-vector product per query. Deletes leave tombstones that are
+    compacted away once they make up half of the matrix.
+    """
+
+    engine = "flat"
+
+    def __init__(self, dim: int):
+
+        self.dim = dim
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._ids = []
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _reserve(self, size: int):
+
+        if size <= len(self._vectors):
+            return
+
+        capacity = max(size, 2 * len(self._vectors), 64)
+
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+
+        self._vectors, self._alive = vectors, alive
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> np.ndarray:
+
+        self.remove([i for i in ids if i in self._rows])
+
+        rows = np.arange(self._size, self._size + len(ids))
+        self._reserve(self._size + len(ids))
+
+        self._vectors[rows] = _normalize(vectors)
+        self._alive[rows] = True
+        self._ids.extend(ids)
+        self._rows.update(zip(ids, rows.tolist()))
+        self._size += len(ids)
+
+        return rows
+
+    def remove(self, ids: Sequence[str]):
+
+        rows = [self._rows.pop(i) for i in ids if i in self._rows]
+        self._alive[rows] = False
+
+        if self._size >= COMPACT_MIN_ROWS and len(self._rows) < self._size / 2:
+            self._compact()
+
+    def _compact(self):
+
+        live = np.flatnonzero(self._alive[:self._size])
+
+        self._vectors = self._vectors[live].copy()
+        self._alive = np.ones(len(live), dtype=bool)
+        self._ids = [self._ids[r] for r in live]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._size = len(live)
+
+    def live_items(self) -> Tuple[List[str], np.ndarray]:
+
+        live = np.flatnonzero(self._alive[:self._size])
+        return [self._ids[r] for r in live], self._vectors[live]
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+
+        # Score the contiguous matrix, then drop deleted rows
+        rows = np.flatnonzero(self._alive[:self._size])
+        scores = self._vectors[:self._size] @ query
+
+        return self._top(rows, scores[rows], k)
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+
+        if not len(rows):
+            return []
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(self._ids[rows[i]], float(scores[i])) for i in top]
+
+    def stats(self) -> Dict:
+        return {"engine": self.engine, "vectors": len(self), "rows": self._size}
+
+# APPROXIMATE INDEX
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, rng) -> np.ndarray:
+
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        filled = np.bincount(labels, minlength=k) > 0
+
+        # Empty lists keep their previous centroid
+        centroids[filled] = _normalize(sums[filled])
+
+    return centroids
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index: vectors are bucketed under their nearest k-means
+    centroid (about sqrt(n) lists) and a query scores only the vectors of
+    the VECTOR_INDEX_NPROBE lists nearest to it. Inserts go straight into
+    their list; the centroids are retrained when the index has doubled or
+    halved since the last training.
+    """
+
+    engine = "ivf"
+
+    def __init__(self, dim: int, nlist: int = None, nprobe: int = None):
+
+        super().__init__(dim)
+        self.nlist = nlist or settings.VECTOR_INDEX_NLIST
+        self.nprobe = nprobe or settings.VECTOR_INDEX_NPROBE
+        self._centroids = None
+        self._lists = []
+        self._trained_size = 0
+        self.build_sec = 0.0
+
+    def train(self):
+
+        start = time.perf_counter()
+        live = np.flatnonzero(self._alive[:self._size])
+
+        if not len(live):
+            self._centroids, self._lists = None, []
+            return
+
+        nlist = min(self.nlist or max(1, int(np.sqrt(len(live)))), len(live))
+        rng = np.random.default_rng(0)
+
+        sample_size = nlist * TRAIN_POINTS_PER_LIST
+        sample = live if len(live) <= sample_size else rng.choice(live, sample_size, replace=False)
+
+        self._centroids = _spherical_kmeans(self._vectors[sample], nlist, rng)
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._assign(live)
+
+        self._trained_size = len(live)
+        self.build_sec = time.perf_counter() - start
+
+        logger.info(f"IVF index trained: {len(live)} vectors, {nlist} lists in {self.build_sec:.2f}s")
+
+    def _assign(self, rows: np.ndarray):
+
+        labels = np.concatenate([
+            np.argmax(self._vectors[rows[i:i + ASSIGN_BATCH]] @ self._centroids.T, axis=1)
+            for i in range(0, len(rows), ASSIGN_BATCH)
+        ])
+
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(self._lists) + 1))
+
+        for label in range(len(self._lists)):
+            members = rows[order[bounds[label]:bounds[label + 1]]]
+
+            if len(members):
+                self._lists[label] = np.concatenate([self._lists[label], members])
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> np.ndarray:
+
+        rows = super().add(ids, vectors)
+
+        if self._centroids is None or len(self) > 2 * self._trained_size:
+            self.train()
+        elif len(rows):
+            self._assign(rows)
+
+        return rows
+
+    def remove(self, ids: Sequence[str]):
+
+        super().remove(ids)
+
+        if len(self) < self._trained_size / 2:
+            self.train()
+
+    def _compact(self):
+
+        # Row numbers change, so the lists are rebuilt
+        super()._compact()
+        self.train()
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+
+        if self._centroids is None:
+            return super().search(query, k)
+
+        probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        rows = np.concatenate([self._lists[p] for p in probes])
+        rows = rows[self._alive[rows]]
+
+        return self._top(rows, self._vectors[rows] @ query, k)
+
+    def stats(self) -> Dict:
+
+        return {
+            **super().stats(),
+            "lists": len(self._lists),
+            "nprobe": self.nprobe,
+            "build_sec": round(self.build_sec, 3)
+        }
+
+# PERSISTENT INDEX
+
+def embedding_space() -> str:
+    """
+    Vectors are only comparable within one embedding backend and model;
+    each space is indexed separately.
+    """
+
+    from services.embedding_backends import get_embedding_backend
+
+    name = get_embedding_backend().name
+    model = settings.EMBED_MODEL_ID if name == "bedrock" else f"{name}-{settings.EMBED_LOCAL_DIM}"
+
+    return f"{name}:{model}"
+
+
+def document_id_for(document_data: Dict) -> str:
+
+    # Same content -> same id, so summarizing a document again replaces it
+    return fingerprint(document_data.get("text", ""))[:16]
+
+
+class VectorIndex:
+    """
+    Chunk and section embeddings of every summarized document, persisted
+    in SQLite and served from an in-memory index per kind: exact (flat)
+    until VECTOR_INDEX_IVF_THRESHOLD vectors, IVF above.
+
+    Every write is recorded in index_log, and other processes (job
+    workers) writing the same database are picked up incrementally on the
+    next query.
+    """
+
+    def __init__(self, path: str = None):
+
+        self.path = path or settings.VECTOR_INDEX_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._lock = threading.RLock()
+        self._space = None
+        self._seq = 0
+        self._indexes = {}
+        self._items = {}
+        self._documents = {}
+        self._query_ms = deque(maxlen=QUERY_LATENCY_WINDOW)
+        self.load_sec = None
+
+    @contextmanager
+    def _connection(self):
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # LOADING
+
+    def load(self):
+        """
+        Builds the in-memory indexes from the database; later calls only
+        apply what changed since.
+        """
+
+        with self._lock:
+            if self._space is not None:
+                self.sync()
+                return
+
+            start = time.perf_counter()
+            self._space = embedding_space()
+
+            with self._connection() as conn:
+                conn.execute("BEGIN")
+                self._seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM index_log").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT item_id, kind, document_id, document_name, ref_id, text, vector "
+                    "FROM vectors WHERE space = ? ORDER BY created_at",
+                    (self._space,)
+                ).fetchall()
+                conn.execute("COMMIT")
+
+            self._apply_rows(rows)
+            self.load_sec = time.perf_counter() - start
+
+            logger.info(f"Vector index loaded: {len(rows)} vectors in {self.load_sec:.2f}s")
+
+    def sync(self):
+
+        with self._lock:
+            with self._connection() as conn:
+                changed = conn.execute(
+                    "SELECT seq, document_id FROM index_log WHERE seq > ? ORDER BY seq",
+                    (self._seq,)
+                ).fetchall()
+
+                if not changed:
+                    return
+
+                documents = sorted({document_id for _, document_id in changed})
+                rows = []
+
+                # Stay under SQLite's bound-parameter limit
+                for i in range(0, len(documents), SYNC_BATCH):
+                    batch = documents[i:i + SYNC_BATCH]
+                    rows.extend(conn.execute(
+                        f"SELECT item_id, kind, document_id, document_name, ref_id, text, vector "
+                        f"FROM vectors WHERE space = ? AND document_id IN ({','.join('?' * len(batch))}) "
+                        f"ORDER BY created_at",
+                        (self._space, *batch)
+                    ).fetchall())
+
+            for document_id in documents:
+                self._drop_document(document_id)
+
+            self._apply_rows(rows)
+            self._seq = changed[-1][0]
+
+    def _apply_rows(self, rows: List[Tuple]):
+
+        by_kind = {}
+
+        for item_id, kind, document_id, document_name, ref_id, text, vector in rows:
+            by_kind.setdefault(kind, ([], []))
+            by_kind[kind][0].append(item_id)
+            by_kind[kind][1].append(np.frombuffer(vector, dtype=np.float32))
+
+            self._items[item_id] = {
+                "document_id": document_id,
+                "document_name": document_name,
+                "kind": kind,
+                "ref_id": ref_id,
+                "text": text
+            }
+            self._documents.setdefault(document_id, []).append(item_id)
+
+        for kind, (ids, vectors) in by_kind.items():
+            self._add(kind, ids, np.vstack(vectors))
+
+    def _add(self, kind: str, ids: List[str], vectors: np.ndarray):
+
+        index = self._indexes.get(kind)
+
+        if index is None:
+            index = self._indexes[kind] = FlatIndex(vectors.shape[1])
+
+        index.add(ids, vectors)
+
+        # Large enough for approximate search: move the vectors to an IVF index
+        if index.engine == "flat" and len(index) >= settings.VECTOR_INDEX_IVF_THRESHOLD:
+            ivf = IVFIndex(index.dim)
+            ivf.add(*index.live_items())
+            self._indexes[kind] = ivf
+
+    def _drop_document(self, document_id: str):
+
+        item_ids = self._documents.pop(document_id, [])
+
+        for kind, index in self._indexes.items():
+            index.remove([i for i in item_ids if self._items[i]["kind"] == kind])
+
+        for item_id in item_ids:
+            del self._items[item_id]
+
+    # WRITES
+
+    def add_document(self, document_id: str, document_name: str, items: List[Dict]) -> Dict:
+        """
+        Replaces the document's vectors with `items` ({"kind", "ref_id",
+        "text", "vector"} each).
+        """
+
+        start = time.perf_counter()
+        self.load()
+
+        now = time.time()
+        rows = [
+            (
+                f"{document_id}:{item['kind']}:{item['ref_id']}",
+                self._space,
+                item["kind"],
+                document_id,
+                document_name,
+                item["ref_id"],
+                item["text"],
+                _normalize(item["vector"]).tobytes(),
+                now
+            )
+            for item in items
+        ]
+
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM vectors WHERE document_id = ?", (document_id,))
+            conn.executemany("INSERT INTO vectors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO index_log (document_id, created_at) VALUES (?, ?)", (document_id, now))
+            conn.execute("COMMIT")
+
+        self.sync()
+
+        return {
+            "document_id": document_id,
+            "indexed_sections": sum(1 for i in items if i["kind"] == "section"),
+            "indexed_chunks": sum(1 for i in items if i["kind"] == "chunk"),
+            "insert_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def delete_document(self, document_id: str) -> int:
+
+        self.load()
+
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute("DELETE FROM vectors WHERE document_id = ?", (document_id,)).rowcount
+            conn.execute("INSERT INTO index_log (document_id, created_at) VALUES (?, ?)", (document_id, time.time()))
+            conn.execute("COMMIT")
+
+        self.sync()
+        return deleted
+
+    # QUERIES
+
+    def search(self, query_vector, k: int = 10, kind: str = "section") -> List[Dict]:
+
+        self.load()
+
+        with self._lock:
+            start = time.perf_counter()
+            index = self._indexes.get(kind)
+            query = _normalize(query_vector)
+
+            if index is None or not len(index):
+                hits = []
+            elif query.shape[-1] != index.dim:
+                raise ValueError(f"Query has {query.shape[-1]} dimensions, index has {index.dim}")
+            else:
+                hits = index.search(query, k)
+
+            self._query_ms.append((time.perf_counter() - start) * 1000)
+
+            return [
+                {
+                    "score": round(score, 4),
+                    "document_id": self._items[item_id]["document_id"],
+                    "document_name": self._items[item_id]["document_name"],
+                    f"{kind}_id": self._items[item_id]["ref_id"],
+                    "text": self._items[item_id]["text"]
+                }
+                for item_id, score in hits
+            ]
+
+    def stats(self) -> Dict:
+
+        self.load()
+
+        with self._lock:
+            latencies = sorted(self._query_ms)
+
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+            return {
+                "space": self._space,
+                "documents": len(self._documents),
+                "indexes": {kind: index.stats() for kind, index in self._indexes.items()},
+                "load_sec": round(self.load_sec, 3) if self.load_sec is not None else None,
+                "query_ms": {
+                    "count": len(latencies),
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "max": round(latencies[-1], 3) if latencies else None
+                }
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex()
+
+    return _index
+
+# DOCUMENT ITEMS
+
+def document_items(chunk_summaries: List[Dict], chunk_embeddings: Dict, section_summaries: List[Dict], semantic_sections: List[Dict]) -> List[Dict]:
+    """
+    Index entries of one summarized document. Chunks reuse the embeddings
+    computed for clustering; a section's vector is the mean of its chunks'
+    vectors, so indexing costs no extra embedding calls.
+    """
+
+    summaries = {c["chunk_id"]: c for c in chunk_summaries}
+    items = []
+
+    for chunk_id, vector in chunk_embeddings.items():
+        items.append({
+            "kind": "chunk",
+            "ref_id": chunk_id,
+            "text": summaries.get(chunk_id, {}).get("summary", ""),
+            "vector": vector
+        })
+
+    section_texts = {s["section_id"]: s.get("section_summary", "") for s in section_summaries}
+
+    for section in semantic_sections:
+        vectors = [chunk_embeddings[c] for c in section["covered_chunk_ids"] if c in chunk_embeddings]
+
+        if not vectors or not section_texts.get(section["section_id"]):
+            continue
+
+        items.append({
+            "kind": "section",
+            "ref_id": section["section_id"],
+            "text": section_texts[section["section_id"]],
+            "vector": _normalize(np.mean(_normalize(np.array(vectors)), axis=0))
+        })
+
+    return items